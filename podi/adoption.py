@@ -0,0 +1,472 @@
+# region
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from podi import fit_cache
+
+# endregion
+
+
+# Adoption curve families. Each takes years since the start of the projection x
+# and parameters a, b, c, d, where c is the saturation level and d the starting
+# level of the curve.
+
+
+def linear(x, a, b, c, d):
+    return a * x + d
+
+
+def logistic(x, a, b, c, d):
+    return c / (1 + np.exp(-a * (x - b))) + d
+
+
+def gompertz(x, a, b, c, d):
+    return c * np.exp(-np.exp(-a * (x - b))) + d
+
+
+def bass(x, a, b, c, d):
+    # a is the coefficient of innovation, b the coefficient of imitation
+    return (
+        c * (1 - np.exp(-(a + b) * x)) / (1 + (b / a) * np.exp(-(a + b) * x))
+        + d
+    )
+
+
+curves = {
+    "linear": linear,
+    "logistic": logistic,
+    "gompertz": gompertz,
+    "bass": bass,
+}
+
+
+def evaluate(model, x, parameters):
+    """
+    Evaluate the curve family model over x (T,) for each row of parameters
+    (..., 4), returning an array of shape (..., T).
+    """
+    parameters = np.asarray(parameters, dtype=float)
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        return curves[model](
+            x, *np.moveaxis(parameters[..., np.newaxis], -2, 0)
+        )
+
+
+def interpolate(y):
+    """
+    Linearly interpolate the NaNs in each row of a 2D array. Trailing NaNs take
+    the last valid value and leading NaNs are left as-is, which matches
+    pandas' DataFrame.interpolate(method="linear").
+    """
+    y = np.array(y, dtype=float)
+    cols = np.arange(y.shape[1])
+    valid = ~np.isnan(y)
+
+    # Position of the preceding and following valid value for every element
+    preceding = np.maximum.accumulate(np.where(valid, cols, -1), axis=1)
+    following = np.minimum.accumulate(
+        np.where(valid, cols, y.shape[1])[:, ::-1], axis=1
+    )[:, ::-1]
+
+    rows = np.arange(y.shape[0])[:, np.newaxis]
+    y_prev = np.where(preceding >= 0, y[rows, preceding.clip(min=0)], np.nan)
+    y_next = np.where(
+        following < y.shape[1],
+        y[rows, following.clip(max=y.shape[1] - 1)],
+        y_prev,
+    )
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = np.where(
+            following > preceding,
+            (cols - preceding) / (following - preceding),
+            0,
+        )
+
+    return np.where(valid, y, y_prev + weight * (y_next - y_prev))
+
+
+def differential_evolution(
+    func,
+    bounds,
+    seed=3,
+    popsize=15,
+    mutation=(0, 1),
+    recombination=0.7,
+    tol=0.01,
+    maxiter=1000,
+):
+    """
+    Minimize N independent problems at once using the 'best1bin' strategy of
+    scipy.optimize.differential_evolution, with dithered mutation, latin
+    hypercube initialization and no polishing.
+
+    func(parameters, rows) must return the energies of an (len(rows), P, D)
+    array of candidate parameters for the problems in `rows`. bounds has shape
+    (N, D, 2). Each problem stops evolving once its population has converged.
+    Trial vectors for a whole generation are built and evaluated together
+    (scipy's updating="deferred").
+
+    Each problem draws from its own generator, seeded with seed[i] if seed is
+    a sequence of N seeds, or with [seed, i] if it is an int, so the result
+    of a problem doesn't depend on the other problems it is solved with.
+    """
+    bounds = np.asarray(bounds, dtype=float)
+    lower = bounds[..., 0]
+    width = bounds[..., 1] - bounds[..., 0]
+    n, d = lower.shape
+    p = max(5, popsize * d)
+
+    if np.ndim(seed) == 0:
+        seed = [[seed, i] for i in range(n)]
+    generators = [np.random.default_rng(row_seed) for row_seed in seed]
+
+    def draw(rows, *shape):
+        # Uniform random numbers of the given shape for each of rows, each
+        # from the generator of its problem
+        return np.stack(
+            [generators[row].random(shape) for row in rows]
+        ).reshape(len(rows), *shape)
+
+    def scale(trial, rows):
+        return lower[rows, np.newaxis] + trial * width[rows, np.newaxis]
+
+    # Latin hypercube initialization, permuted independently for each
+    # parameter of each problem
+    all_rows = np.arange(n)
+    initial = draw(all_rows, 2, p, d)
+    population = (initial[:, 0] + np.arange(p)[:, None]) / p
+    population = np.take_along_axis(
+        population, np.argsort(initial[:, 1], axis=1), axis=1
+    )
+
+    energies = func(scale(population, all_rows), all_rows)
+    candidates = np.arange(p)
+    active = np.ones(n, dtype=bool)
+
+    for _ in range(maxiter):
+        rows = np.flatnonzero(active)
+        if rows.size == 0:
+            break
+        m = rows.size
+
+        pop = population[rows]
+        energy = energies[rows]
+        best = pop[np.arange(m), energy.argmin(axis=1)]
+
+        # All the random numbers of this generation: r0, r1 and the crossover
+        # parameter for each candidate, the mutation factor, and the crossover
+        # and resampled values for each parameter of each candidate
+        random = draw(rows, 3 * p + 1 + 2 * p * d)
+        r0, r1, forced = (random[:, i * p : (i + 1) * p] for i in range(3))
+        dither = random[:, 3 * p]
+        crossover, resample = (
+            random[:, 3 * p + 1 :].reshape(m, 2, p, d).swapaxes(0, 1)
+        )
+
+        # Pick two distinct population members r0, r1 that are also distinct
+        # from the candidate being mutated
+        r0 = (r0 * (p - 1)).astype(int)
+        r0 += r0 >= candidates
+        r1 = (r1 * (p - 2)).astype(int)
+        r1 += r1 >= np.minimum(candidates, r0)
+        r1 += r1 >= np.maximum(candidates, r0)
+
+        bprime = best[:, np.newaxis] + (
+            mutation[0] + dither * (mutation[1] - mutation[0])
+        )[:, np.newaxis, np.newaxis] * (
+            np.take_along_axis(pop, r0[..., np.newaxis], axis=1)
+            - np.take_along_axis(pop, r1[..., np.newaxis], axis=1)
+        )
+
+        # Binomial crossover, with at least one parameter taken from bprime
+        crossovers = crossover < recombination
+        crossovers[
+            np.arange(m)[:, np.newaxis],
+            candidates,
+            (forced * d).astype(int),
+        ] = True
+        trial = np.where(crossovers, bprime, pop)
+
+        # Resample any parameters that fall outside of [0, 1)
+        outside = (trial < 0) | (trial > 1)
+        trial[outside] = resample[outside]
+
+        trial_energy = func(scale(trial, rows), rows)
+        accept = trial_energy <= energy
+
+        population[rows] = np.where(accept[..., np.newaxis], trial, pop)
+        energies[rows] = np.where(accept, trial_energy, energy)
+
+        converged = np.std(energies[rows], axis=1) <= tol * np.abs(
+            np.mean(energies[rows], axis=1)
+        )
+        active[rows[converged]] = False
+
+    best = population[all_rows, energies.argmin(axis=1)]
+
+    return lower + best * width
+
+
+def fit(x_data, y_data, bounds, model="logistic", seed=3, cache=True):
+    """
+    Fit the curve family model to each row of y_data (N, T) over x_data (T,)
+    by minimizing the sum of squared error within bounds (N, 4, 2) for the
+    parameters (a, b, c, d). Returns the fitted parameters as an (N, 4) array.
+
+    With cache=True, rows that have been fitted before with the same model,
+    x_data, bounds and seed are read from podi.fit_cache, and only the
+    remaining rows are fitted. Each row is fitted with a generator seeded
+    from its key (a hash of its inputs and seed), so its parameters don't
+    depend on the other rows it is fitted with, or on which rows were cached.
+    """
+    y_data = np.asarray(y_data, dtype=float)
+    bounds = np.asarray(bounds, dtype=float)
+    keys = fit_cache.keys(model, x_data, y_data, bounds, seed)
+
+    if cache:
+        found = fit_cache.get(keys)
+        missing = [i for i, key in enumerate(keys) if key not in found]
+
+        parameters = np.empty((len(y_data), bounds.shape[1]))
+        for i, key in enumerate(keys):
+            if key in found:
+                parameters[i] = found[key]
+
+        if missing:
+            parameters[missing] = fit(
+                x_data,
+                y_data[missing],
+                bounds[missing],
+                model=model,
+                seed=seed,
+                cache=False,
+            )
+            fit_cache.put([keys[i] for i in missing], parameters[missing])
+
+        return parameters
+
+    def sum_of_squared_error(parameters, rows):
+        y = evaluate(model, x_data, parameters)
+        return np.nan_to_num(
+            np.sum((y_data[rows, np.newaxis] - y) ** 2.0, axis=-1),
+            nan=np.inf,
+        )
+
+    return differential_evolution(
+        sum_of_squared_error,
+        bounds,
+        seed=[int(key[:16], 16) for key in keys],
+    )
+
+
+def search_bounds(parameters, d):
+    # Stack search bounds for parameters (a, b, c, d) of each row of a
+    # DataFrame of parameters, where c is fixed at the saturation point and d
+    # at the given starting level(s)
+    d = np.broadcast_to(d, (len(parameters),))
+
+    return np.stack(
+        [
+            parameters[["parameter a min", "parameter a max"]].to_numpy(),
+            parameters[["parameter b min", "parameter b max"]].to_numpy(),
+            parameters[["saturation point", "saturation point"]].to_numpy(),
+            np.stack([d, d], axis=1),
+        ],
+        axis=1,
+    ).astype(float)
+
+
+def project_demand(
+    parameters,
+    data_end_year,
+    saturation_year,
+    proj_end_year,
+    model="logistic",
+):
+    """
+    Project an adoption curve from zero in data_end_year to the saturation
+    point in saturation_year, through proj_end_year, for each row of
+    parameters. parameters has columns 'parameter a min', 'parameter a max',
+    'parameter b min', 'parameter b max' and 'saturation point'. With
+    model="linear" (baseline scenarios) the projections are linear. Returns a
+    DataFrame with the index of parameters and a column for each year.
+    """
+    parameters = parameters.apply(pd.to_numeric)
+
+    # Create x array (year) and y array (linear scale from zero to saturation value)
+    x_data = np.arange(0, proj_end_year - data_end_year + 1, 1)
+    y_data = np.full((len(parameters), len(x_data)), np.NaN)
+    y_data[:, 0] = 0
+    y_data[:, saturation_year - data_end_year] = parameters[
+        "saturation point"
+    ].to_numpy()
+    y_data = interpolate(y_data)
+
+    # Generate genetic_parameters. For baseline scenarios, projections are linear
+    if model == "linear":
+        y = linear(
+            x_data,
+            np.clip(
+                (y_data[:, -1:] - y_data[:, :1]) / len(x_data), 0.00001, 0.0018
+            ),
+            0,
+            0,
+            y_data[:, :1],
+        )
+    else:
+        y = evaluate(
+            model,
+            x_data,
+            fit(
+                x_data,
+                y_data,
+                search_bounds(parameters, 0),
+                model=model,
+                seed=3,
+            ),
+        )
+
+    return pd.DataFrame(
+        y,
+        index=parameters.index,
+        columns=np.arange(data_end_year, proj_end_year + 1, 1),
+    )
+
+
+def project_supply(
+    input_data,
+    parameters,
+    saturation_date,
+    output_end_date,
+    model="logistic",
+):
+    """
+    Continue the historical adoption in each row of input_data through
+    output_end_date, along a curve fitted to its last 11 years and the
+    saturation point reached in saturation_date. parameters has a row of
+    search bounds for each row of input_data (see project_demand()). With
+    model="linear", the projections are linear.
+    """
+    # Rows share the same timeseries columns (missing values have been filled
+    # with zero), so the window used to fit the curves is common to every row
+    parameters = parameters.apply(pd.to_numeric)
+    last_valid_index = input_data.columns[-1]
+
+    # Take 10 years prior data to fit logistic function
+    x_data = np.arange(0, output_end_date - last_valid_index + 11, 1)
+    y_data = np.full((len(input_data), len(x_data)), np.NaN)
+    y_data[:, :11] = input_data.loc[
+        :, last_valid_index - 10 : last_valid_index
+    ].to_numpy()
+    y_data[:, saturation_date - last_valid_index] = parameters[
+        "saturation point"
+    ].to_numpy()
+
+    # Handle cases where saturation point is below current value, by making
+    # saturation point equidistant from current value but in positive direction
+    below = y_data[:, 10] > y_data[:, -1]
+    y_data[below, -1] = y_data[below, 10] + abs(
+        y_data[below, -1] - y_data[below, 10]
+    )
+
+    y_data = interpolate(y_data)
+
+    # Generate genetic_parameters. For baseline scenarios, projections are linear
+    if model == "linear":
+        y = linear(
+            x_data,
+            np.clip(
+                (y_data[:, -1:] - y_data[:, :1]) / len(x_data), 0.00001, 0.04
+            ),
+            0,
+            0,
+            y_data[:, 10:11],
+        )
+    else:
+        y = evaluate(
+            model,
+            np.arange(0, 500, 1),
+            fit(
+                x_data,
+                y_data,
+                search_bounds(parameters, y_data[:, 10]),
+                model=model,
+                seed=3,
+            ),
+        )
+
+    # Rejoin with input data at point where projection curve results in smooth
+    # growth, by taking the first points of each curve that are at or above
+    # the last historical value
+    keep = y >= input_data.to_numpy()[:, -1:]
+    proj_length = output_end_date - last_valid_index
+    y = np.take_along_axis(
+        y,
+        np.argsort(~keep, axis=1, kind="stable")[:, :proj_length],
+        axis=1,
+    )
+    y[keep.sum(axis=1)[:, np.newaxis] <= np.arange(proj_length)] = np.NaN
+
+    return pd.DataFrame(
+        data=np.concatenate([input_data.to_numpy(), y], axis=1),
+        index=input_data.index,
+        columns=np.arange(input_data.columns[0], output_end_date + 1, 1),
+    )
+
+
+def apply_chunks(df, function, columns, checkpoint=None, chunksize=100):
+    """
+    Apply function to df in chunks of rows and collect the (rows, columns)
+    arrays or DataFrames it returns into a DataFrame with the index of df and
+    the given columns.
+
+    If checkpoint is the path of a .npz file, the results so far are saved to
+    it after each chunk. A run that was interrupted then resumes after the
+    last saved chunk. The file is removed once all rows are done, and should
+    be deleted by hand if the inputs change before a resumed run.
+    """
+    keys = np.array(
+        [
+            "|".join(map(str, name if isinstance(name, tuple) else (name,)))
+            for name in df.index
+        ]
+    )
+
+    done = {}
+    if checkpoint is not None and os.path.exists(checkpoint):
+        with np.load(checkpoint) as saved:
+            done = dict(zip(saved["keys"], saved["values"]))
+
+    remaining = np.flatnonzero([key not in done for key in keys])
+    step = len(remaining) if checkpoint is None else chunksize
+
+    for i in range(0, len(remaining), max(step, 1)):
+        result = np.asarray(
+            function(df.iloc[remaining[i : i + step]]), dtype=float
+        )
+        done.update(zip(keys[remaining[i : i + step]], result))
+
+        if checkpoint is not None:
+            os.makedirs(os.path.dirname(checkpoint) or ".", exist_ok=True)
+            with open(checkpoint + ".tmp", "wb") as file:
+                np.savez(
+                    file,
+                    keys=np.array(list(done.keys())),
+                    values=np.array(list(done.values()), dtype=float),
+                )
+            os.replace(checkpoint + ".tmp", checkpoint)
+
+    if checkpoint is not None and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+
+    return pd.DataFrame(
+        np.array([done[key] for key in keys], dtype=float).reshape(
+            len(keys), len(columns)
+        ),
+        index=df.index,
+        columns=columns,
+    )
@@ -3,9 +3,15 @@
 import numpy as np
 import pandas as pd
 import pyam
-from pandarallel import pandarallel
 
-pandarallel.initialize(progress_bar=True)
+from podi import (
+    analogs,
+    broadcast,
+    executor,
+    piecewise,
+    projection,
+    tagging,
+)
 
 # endregion
 
@@ -42,8 +48,10 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
     )
 
     # Create a 'variable' column that concatenates the 'Subvertical' and 'Metric' columns
-    afolu_historical["variable"] = afolu_historical.parallel_apply(
-        lambda x: "|".join([x["Subvertical"], x["Metric"]]), axis=1
+    afolu_historical["variable"] = afolu_historical.pipe(
+        executor.apply,
+        lambda x: "|".join([x["Subvertical"], x["Metric"]]),
+        axis=1,
     )
     afolu_historical.drop(columns=["Subvertical", "Metric"], inplace=True)
 
@@ -59,132 +67,13 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
     # Create a timeseries of maximum extent of each subvertical
     # region
 
-    # Define a function that takes piecewise functions as input and outputs a continuous
-    # timeseries (this is used for input data provided for (1) maximum extent, and (2)
-    # average mitigation potential flux)
-    def piecewise_to_continuous(variable):
-        # Load the 'Max Extent' tab of TNC's 'Positive Disruption NCS Verticals' google
-        # spreadsheet
-        name = (
-            pd.read_csv("podi/data/TNC/max_extent.csv")
-            .drop(columns=["Region Group", "Region"])
-            .rename(
-                columns={
-                    "ISO": "region",
-                    "Model": "model",
-                    "Scenario": "scenario",
-                    "Unit": "unit",
-                }
-            )
-            .replace("Pathway", scenario)
-        )
-
-        # Create a 'variable' column that concatenates the 'Subvertical' and 'Metric'
-        # columns
-        name["variable"] = name.parallel_apply(
-            lambda x: "|".join([x["Subvertical"], x["Metric"]]), axis=1
-        )
-        name.drop(columns=["Subvertical", "Metric"], inplace=True)
-
-        # Filter for rows that have 'variable' (either 'Max extent' or 'Avg mitigation
-        # potential flux')
-        name = name[name["variable"].str.contains(variable)]
-
-        # If Value 1 is 'NA', set to 0
-        name["Value 1"] = np.where(name["Value 1"].isna(), 0, name["Value 1"])
-
-        # If Value 2 is 'NA', set to Value 1
-        name["Value 2"] = np.where(
-            name["Value 2"].isna(), name["Value 1"], name["Value 2"]
-        )
-
-        # If Value 3 is 'NA', set to Value 2
-        name["Value 3"] = np.where(
-            name["Value 3"].isna(), name["Value 2"], name["Value 3"]
-        )
-
-        # If Duration 1 is 'NA' or longer than proj_end_year -
-        # afolu_historical.columns[0], set to proj_end_year - afolu_historical.columns[0]
-        name["Duration 1 (Years)"] = np.where(
-            (
-                (name["Duration 1 (Years)"].isna())
-                | (
-                    name["Duration 1 (Years)"]
-                    > proj_end_year - afolu_historical.columns[0]
-                )
-            ),
-            proj_end_year - afolu_historical.columns[0],
-            name["Duration 1 (Years)"],
-        )
-
-        # If Duration 2 is 'NA', set to Duration 1
-        name["Duration 2 (Years)"] = np.where(
-            (name["Duration 2 (Years)"].isna()),
-            name["Duration 1 (Years)"],
-            name["Duration 2 (Years)"],
-        )
-
-        # If Duration 3 is 'NA', set to Duration 2
-        name["Duration 3 (Years)"] = np.where(
-            (name["Duration 3 (Years)"].isna()),
-            name["Duration 2 (Years)"],
-            name["Duration 3 (Years)"],
-        )
-
-        # Create dataframe with timeseries columns
-        name = pd.DataFrame(
-            index=[
-                name["model"],
-                name["scenario"],
-                name["region"],
-                name["variable"],
-                name["unit"],
-                name["Value 1"],
-                name["Duration 1 (Years)"],
-                name["Value 2"],
-                name["Duration 2 (Years)"],
-                name["Value 3"],
-                name["Duration 3 (Years)"],
-            ],
-            columns=np.arange(
-                afolu_historical.columns[0], proj_end_year + 1, 1
-            ),
-            dtype=float,
-        )
-
-        # Define a function that places values in each timeseries for the durations
-        # specified, and interpolates
-        def rep(x):
-            x0 = x
-            x0.loc[afolu_historical.columns[0]] = x.name[5]
-            x0.loc[afolu_historical.columns[0] + x.name[6]] = x.name[7]
-            x0.loc[
-                min(
-                    afolu_historical.columns[0] + x.name[6] + x.name[8],
-                    proj_end_year - afolu_historical.columns[0],
-                )
-            ] = x.name[9]
-            x0.interpolate(axis=0, limit_area="inside", inplace=True)
-            x.update(x0)
-            return x
-
-        name.update(name.parallel_apply(rep, axis=1))
-
-        # Drop 'Value' and 'Duration' columns now that the timeseries have been created
-        name = name.droplevel(
-            [
-                "Value 1",
-                "Duration 1 (Years)",
-                "Value 2",
-                "Duration 2 (Years)",
-                "Value 3",
-                "Duration 3 (Years)",
-            ]
-        ).fillna(0)
-
-        return name
-
-    max_extent = piecewise_to_continuous("Max extent")
+    max_extent = piecewise.continuous(
+        "podi/data/TNC/max_extent.csv",
+        "Max extent",
+        scenario,
+        afolu_historical.columns[0],
+        proj_end_year,
+    )
 
     # Shift Improved Forest Management's start year to 2018, and give all years prior to
     # 2018 the value in 2018
@@ -198,7 +87,8 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
                 ).values
             ].loc[:, 2018:]
             * 0
-        ).parallel_apply(
+        ).pipe(
+            executor.apply,
             lambda x: x
             + (
                 max_extent[
@@ -226,7 +116,8 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
                 ).values
             ].loc[:, :2018]
             * 0
-        ).parallel_apply(
+        ).pipe(
+            executor.apply,
             lambda x: x
             + (
                 max_extent[
@@ -293,7 +184,8 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
                 ]
             )
             .set_index(pyam.IAMC_IDX)
-            .parallel_apply(
+            .pipe(
+                executor.apply,
                 lambda x: x.fillna(1 - x["Initial Loss Rate (%)"])
                 .cumprod()
                 .drop(index=["Initial Loss Rate (%)", "Initial Extent (Mha)"]),
@@ -318,7 +210,7 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
             ).values
         ]
         .loc[:, :data_end_year]
-        .parallel_apply(lambda x: x * 0)
+        .pipe(executor.apply, lambda x: x * 0)
     )
 
     # Calculate max extent for afolu_new_markets_historical
@@ -338,32 +230,8 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
     )
 
     # Take the slope of the last two values, use it to extrapolate from last_valid_index to proj_end_year
-    def extrapolate_row(row, proj_end_year):
-        # Get the last two valid indices
-        last_valid_idx = row.last_valid_index()
-        penultimate_valid_idx = row.loc[:last_valid_idx].dropna().index[-2]
-
-        # Calculate the slope
-        slope = (row[last_valid_idx] - row[penultimate_valid_idx]) / (
-            last_valid_idx - penultimate_valid_idx
-        )
-
-        # Create new index range till proj_end_year
-        new_index = pd.RangeIndex(start=last_valid_idx, stop=proj_end_year + 1)
-
-        # Extrapolate the values based on slope
-        extrapolated_values = pd.Series(
-            data=row[last_valid_idx] + slope * (new_index - last_valid_idx),
-            index=new_index,
-        )
-
-        # Return the original row and the extrapolated values concatenated together
-        return row.combine_first(extrapolated_values)
-
-    max_extent_new_markets_historical = (
-        max_extent_new_markets_historical.apply(
-            extrapolate_row, axis=1, args=(proj_end_year,)
-        )
+    max_extent_new_markets_historical = projection.project(
+        max_extent_new_markets_historical, "linear", end=proj_end_year
     )
 
     # Combine max extents
@@ -386,6 +254,20 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
         index={"Biochar|Max extent": "Biochar as Ag Soil Amendment|Max extent"}
     )
 
+    # Key max_extent by the scenario, region and 'Observed adoption' variable of
+    # the rows it bounds, with a copy for the 'baseline' scenario, so that it
+    # can be aligned onto afolu_historical and afolu_output as whole arrays
+    max_extent_aligned = max_extent.droplevel(["model", "unit"]).rename(
+        index=lambda x: x.replace("Max extent", "Observed adoption"),
+        level="variable",
+    )
+    max_extent_aligned = pd.concat(
+        [
+            max_extent_aligned,
+            max_extent_aligned.rename(index={scenario: "baseline"}, level=0),
+        ]
+    )
+
     afolu_historical.reset_index(inplace=True)
     afolu_historical.loc[
         afolu_historical.variable == "Biochar|Observed adoption", "variable"
@@ -430,16 +312,16 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
     # Management, since its historical adoption is already reported in Percent adoption.
 
     # Divide afolu_historical by max_extent
-    afolu_historical = afolu_historical.parallel_apply(
-        lambda x: x.divide(
-            max_extent.loc[
-                slice(None),
-                [x.name[1]],
-                [x.name[2]],
-                [x.name[3].replace("Observed adoption", "Max extent")],
-            ]
-        ).squeeze(),
-        axis=1,
+    afolu_historical = afolu_historical.reindex(
+        columns=afolu_historical.columns.union(max_extent_aligned.columns)
+    )
+    afolu_historical = (
+        afolu_historical
+        / broadcast.align(
+            max_extent_aligned,
+            afolu_historical.index,
+            ["scenario", "region", "variable"],
+        ).reindex(columns=afolu_historical.columns)
     ).clip(upper=1)
 
     # Make Avoided subverticals all zeros until data_end_year
@@ -546,7 +428,8 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
             ]
         )
         .set_index("Analog name")
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x[afolu_analogs.columns[0:]]
             .fillna(x["Rate of Improvement"])
             .cumsum(),
@@ -595,45 +478,9 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
     # their modeled adoption curve than the NCS pathways to which they are being
     # compared)
 
-    def rep(x):
-        x0 = x
-        if x0.isna().all():
-            x0.iloc[-1] = 0
-        x0 = (
-            afolu_analogs.loc[x.name[5]][
-                afolu_analogs.loc[x.name[5]]
-                >= min(max(x0.loc[x0.last_valid_index()], 1e-5), 1)
-            ]
-            .iloc[: proj_end_year - x0.last_valid_index()]
-            .reset_index()
-            .set_index(
-                np.arange(x0.last_valid_index() + 1, proj_end_year + 1, 1)
-            )
-            .drop(columns=["index"])
-            .squeeze()
-            .rename(x.name)
-        )
-
-        x = x.combine_first(x0)
-
-        if x.first_valid_index() > data_start_year:
-            x1 = (
-                afolu_analogs.loc[x.name[5]][
-                    afolu_analogs.loc[x.name[5]]
-                    <= min(max(x.loc[x.first_valid_index()], 1e-5), 1)
-                ]
-                .tail(x.first_valid_index() - x.index[0])
-                .reset_index()
-                .set_index(np.arange(x.index[0], x.first_valid_index(), 1))
-                .drop(columns=["index"])
-                .squeeze()
-                .rename(x.name)
-            )
-            x = x.combine_first(x1)
-
-        return x
-
-    afolu_output = pd.DataFrame(data=afolu_output.parallel_apply(rep, axis=1))
+    afolu_output = analogs.splice(
+        afolu_output, afolu_analogs, data_start_year, proj_end_year
+    )
     afolu_output = afolu_output.droplevel("Analog Name")
 
     # endregion
@@ -650,56 +497,37 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
     )
     afolu_baseline.set_index(pyam.IAMC_IDX, inplace=True)
 
-    # Estimate 'baseline' scenario NCS subvertical growth
-    def rep(x):
-        x0 = pd.Series(
-            data=max(
-                0,
-                afolu_output.loc[
-                    x.name[0], scenario, x.name[2], x.name[3], x.name[4]
-                ].loc[x.last_valid_index()]
-                - afolu_output.loc[
-                    x.name[0], scenario, x.name[2], x.name[3], x.name[4]
-                ].loc[x.last_valid_index() - 1],
-            ),
-            index=np.arange(x.last_valid_index() + 1, proj_end_year + 1, 1),
-            name=x.name,
-        )
-        x0 = pd.concat(
-            [
-                afolu_output.loc[
-                    x.name[0], scenario, x.name[2], x.name[3], x.name[4]
-                ].loc[: x.last_valid_index() - 1],
-                pd.concat(
-                    [
-                        pd.Series(
-                            data=afolu_output.loc[
-                                x.name[0],
-                                scenario,
-                                x.name[2],
-                                x.name[3],
-                                x.name[4],
-                            ].loc[x.last_valid_index()],
-                            index=[x.last_valid_index()],
-                            name=x.name,
-                        ),
-                        x0,
-                    ]
-                ).cumsum(),
-            ]
-        )
-
-        x = x.combine_first(x0).rename(
-            afolu_output.loc[
-                x.name[0], scenario, x.name[2], x.name[3], x.name[4]
-            ].name
-        )
+    # Estimate 'baseline' scenario NCS subvertical growth, by continuing the
+    # pathway's adoption from the last historical year at its most recent
+    # (non-negative) annual change
+    afolu_pathway = broadcast.align(
+        afolu_output.xs(scenario, level="scenario"),
+        afolu_baseline.index,
+        ["model", "region", "variable", "unit"],
+    )
+    columns = afolu_baseline.columns.union(afolu_pathway.columns)
+    afolu_baseline = afolu_baseline.reindex(columns=columns)
+    afolu_pathway = afolu_pathway.reindex(columns=columns)
+
+    last_valid_index = projection.last_valid(afolu_baseline)
+    rows = np.arange(len(afolu_pathway))
+    position = columns.get_indexer(last_valid_index)
+    growth = np.fmax(
+        afolu_pathway.to_numpy()[rows, position]
+        - afolu_pathway.to_numpy()[rows, position - 1],
+        0,
+    )
 
-        return x
+    afolu_pathway = projection.project(
+        afolu_pathway.where(
+            columns.to_numpy() <= last_valid_index[:, np.newaxis],
+            np.broadcast_to(growth[:, np.newaxis], afolu_pathway.shape),
+        ),
+        "cumsum",
+        start=last_valid_index,
+    )
 
-    afolu_baseline = pd.DataFrame(
-        data=afolu_baseline.parallel_apply(rep, axis=1)
-    ).clip(upper=1)
+    afolu_baseline = afolu_baseline.combine_first(afolu_pathway).clip(upper=1)
 
     # endregion
 
@@ -710,21 +538,16 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
     # Multiply afolu_ouput by the estimated maximum extent to get afolu_output in units
     # of land area & forest volume
 
-    afolu_output = afolu_output.parallel_apply(
-        lambda x: x.multiply(
-            pd.concat(
-                [
-                    max_extent,
-                    max_extent.rename(index={scenario: "baseline"}, level=1),
-                ]
-            ).loc[
-                slice(None),
-                [x.name[1]],
-                [x.name[2]],
-                [x.name[3].replace("Observed adoption", "Max extent")],
-            ]
-        ).squeeze(),
-        axis=1,
+    afolu_output = afolu_output.reindex(
+        columns=afolu_output.columns.union(max_extent_aligned.columns)
+    )
+    afolu_output = (
+        afolu_output
+        * broadcast.align(
+            max_extent_aligned,
+            afolu_output.index,
+            ["scenario", "region", "variable"],
+        ).reindex(columns=afolu_output.columns)
     ).fillna(0)
 
     # endregion
@@ -762,65 +585,11 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
         )
         each["flow_short"] = each["flow_long"]
 
-        def addsector(x):
-            if x["flow_long"] in [
-                "Biochar as Ag Soil Amendment",
-                "Biochar for Carbon Removal & Sequestration",
-                "Biochar for Water Treatment",
-                "Biochar as Activated Carbon",
-                "Biochar for Construction Materials",
-                "Cropland Soil Health",
-                "Nitrogen Fertilizer Management",
-                "Improved Rice",
-                "Optimal Intensity",
-                "Agroforestry",
-            ]:
-                return "Agriculture"
-            elif x["flow_long"] in [
-                "Improved Forest Management",
-                "Natural Regeneration",
-                "Avoided Coastal Impacts",
-                "Avoided Forest Conversion",
-                "Avoided Peat Impacts",
-                "Coastal Restoration",
-                "Peat Restoration",
-            ]:
-                return "Forests & Wetlands"
-
-        each["sector"] = each.parallel_apply(lambda x: addsector(x), axis=1)
+        each["sector"] = tagging.tag("afolu_sector", each["flow_long"])
 
         each["flow_category"] = "AFOLU Emissions"
 
-        def addgas(x):
-            if x["flow_long"] in [
-                "Biochar as Ag Soil Amendment",
-                "Biochar for Carbon Removal & Sequestration",
-                "Biochar for Water Treatment",
-                "Biochar as Activated Carbon",
-                "Biochar for Construction Materials",
-                "Cropland Soil Health",
-                "Optimal Intensity",
-                "Agroforestry",
-                "Improved Forest Management",
-                "Natural Regeneration",
-                "Avoided Coastal Impacts",
-                "Avoided Forest Conversion",
-                "Avoided Peat Impacts",
-                "Coastal Restoration",
-                "Peat Restoration",
-            ]:
-                return "CO2 (from AFOLU)"
-            if x["flow_long"] in [
-                "Improved Rice",
-            ]:
-                return "CH4 (from AFOLU)"
-            if x["flow_long"] in [
-                "Improved Rice",
-                "Nitrogen Fertilizer Management",
-            ]:
-                return "N2O (from AFOLU)"
-
-        each["product_long"] = each.parallel_apply(lambda x: addgas(x), axis=1)
+        each["product_long"] = tagging.tag("afolu_gas", each["flow_long"])
         each["product_short"] = each["product_long"]
 
         each = (
@@ -880,7 +649,11 @@ def afolu(scenario, data_start_year, data_end_year, proj_end_year):
         output[0].to_parquet(
             f"podi/data/{output[1]}.parquet", compression="brotli"
         )
+        output[0].columns = output[0].columns.astype(int)
 
     # endregion
 
-    return
+    return {
+        "afolu_historical": afolu_historical,
+        "afolu_output": afolu_output,
+    }
@@ -0,0 +1,108 @@
+# region
+
+import numpy as np
+import pandas as pd
+
+from podi import projection
+
+# endregion
+
+# Splice historical analog adoption curves onto the historical adoption of the
+# rows of a frame, for all rows at once. The curves are gathered once into a
+# matrix with a row for the analog of each row, and the values spliced onto
+# each row are found with one searchsorted over the running count of curve
+# values past the row's threshold, rather than by filtering, reindexing and
+# combine_first on each row's analog.
+
+
+def nth_true(mask, n):
+    """
+    Return the column position of the n-th (from 0) True value in each row of
+    mask, for each column of n, an array with a row for each row of mask.
+    Positions of values past the number of True values in the row are -1.
+    """
+    rows, columns = mask.shape
+    counts = np.cumsum(mask, axis=1)
+
+    # Offset the counts of each row past those of the rows before it, so that
+    # the counts of all rows are one sorted array
+    offsets = np.arange(rows)[:, np.newaxis] * (columns + 1)
+    found = np.searchsorted(
+        (counts + offsets).ravel(), (n + 1 + offsets).ravel()
+    ).reshape(n.shape)
+
+    return np.where(
+        (n >= 0) & (n < counts[:, -1:]),
+        found - np.arange(rows)[:, np.newaxis] * columns,
+        -1,
+    )
+
+
+def splice(df, analogs, data_start_year, proj_end_year, level="Analog Name"):
+    """
+    Extend each row of df, a DataFrame of historical adoption with year
+    columns, with the adoption curve in analogs of the analog named by the
+    row's level of the index.
+
+    Forward, the values of the curve that are at or above the row's last
+    valid value (bounded to [1e-5, 1]) are spliced, in order, onto the years
+    after it, through proj_end_year. Backward, if the row starts after
+    data_start_year, the last of the curve values that are at or below its
+    first valid value are spliced onto the years before it. Rows that are
+    all NaN start from 0 in their last year. Years that the curve has too
+    few values for stay NaN.
+    """
+    codes = analogs.index.get_indexer(df.index.get_level_values(level))
+    if (codes < 0).any():
+        raise KeyError(
+            "Analogs not found: "
+            f"{list(df.index.get_level_values(level)[codes < 0].unique())}"
+        )
+    curves = analogs.to_numpy(dtype=float)[codes]
+
+    df = df.astype(float)
+    df.loc[df.isna().all(axis=1).values, df.columns[-1]] = 0
+    df = df.reindex(
+        columns=df.columns.union(
+            pd.RangeIndex(df.columns[0], proj_end_year + 1)
+        )
+    )
+    years = df.columns.to_numpy()
+    values = df.to_numpy()
+    rows = np.arange(len(df))
+
+    def fill(values, mask, n, gaps):
+        # Fill the gaps of values with the n-th curve value of mask
+        positions = nth_true(mask, np.where(gaps, n, -1))
+        return np.where(
+            gaps & (positions >= 0) & np.isnan(values),
+            curves[rows[:, np.newaxis], positions],
+            values,
+        )
+
+    # Splice the curve after the last valid value of each row
+    last = projection.last_valid(df)
+    threshold = np.clip(values[rows, df.columns.get_indexer(last)], 1e-5, 1)
+    values = fill(
+        values,
+        curves >= threshold[:, np.newaxis],
+        years[np.newaxis, :] - last[:, np.newaxis] - 1,
+        (years[np.newaxis, :] > last[:, np.newaxis])
+        & (years[np.newaxis, :] <= proj_end_year),
+    )
+    df = pd.DataFrame(values, index=df.index, columns=df.columns)
+
+    # Splice the end of the curve before the first valid value of each row
+    first = projection.first_valid(df)
+    threshold = np.clip(values[rows, df.columns.get_indexer(first)], 1e-5, 1)
+    mask = curves <= threshold[:, np.newaxis]
+    values = fill(
+        values,
+        mask,
+        mask.sum(axis=1)[:, np.newaxis]
+        - (first[:, np.newaxis] - years[np.newaxis, :]),
+        (years[np.newaxis, :] < first[:, np.newaxis])
+        & (first[:, np.newaxis] > data_start_year),
+    )
+
+    return pd.DataFrame(values, index=df.index, columns=df.columns)
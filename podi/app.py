@@ -1,13 +1,16 @@
 import itertools
+import json
 import os
+import threading
+from collections import OrderedDict
 
 import dash
 import dash_bootstrap_components as dbc
-import dask.dataframe as dd
 import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import pyarrow as pa
 from dash import Input, Output, State, ctx, dcc, html
 
 from furl import furl
@@ -28,7 +31,6 @@ app = dash.Dash(
 server = app.server
 
 # define data
-data = {}
 default_values = {}
 
 REGION_NAMES = {
@@ -626,10 +628,125 @@ data_controls_default = {
 }
 
 
+# Explorer datasets are loaded once per process, in the form used by the
+# callbacks, and shared read-only by all threads. If data/<model_output>.arrow
+# exists (see save_arrow_datasets), it is memory-mapped instead of reading the
+# parquet file, so that gunicorn workers share one copy of its pages.
+datasets = {}
+datasets_lock = threading.Lock()
+
+
+def get_data_path():
+    expanded_home_path = os.path.expanduser(
+        "~/positive-disruption/podi/data/explorer/"
+    )
+    if os.path.isdir(expanded_home_path):
+        return expanded_home_path
+    elif os.path.isdir("data/"):
+        return "data/"
+    else:
+        raise FileNotFoundError("Data directory not found")
+
+
+def read_dataset(model_output):
+    years = [str(i) for i in range(data_start_year, proj_end_year + 1)]
+    arrow_path = os.path.join(get_data_path(), model_output + ".arrow")
+
+    # year columns of arrow files have no nulls, so they are used in place
+    # from the mapped file, and are read-only
+    if os.path.isfile(arrow_path):
+        table = pa.ipc.open_file(pa.memory_map(arrow_path)).read_all()
+        df = table.to_pandas(split_blocks=True)
+        df.set_index(
+            [col for col in df.columns if col not in years], inplace=True
+        )
+        df.attrs["units"] = json.loads(table.schema.metadata[b"units"])
+
+        return df
+
+    df = pd.read_parquet(
+        os.path.join(get_data_path(), model_output + ".parquet")
+    )
+    index_dtypes = {k: "category" for k in df.index.names}
+    column_dtypes = {j: "float32" for j in df.columns}
+    dtypes = {**index_dtypes, **column_dtypes}
+    df = df.reset_index().astype(dtypes)
+
+    # store unit label for use in graph axis label
+    units = df["unit"].unique().tolist()
+
+    # set index to the levels in data_controls_dropdowns, and keep only the
+    # columns from data_start_year to proj_end_year
+    df.set_index(
+        [
+            col
+            for col in df.columns
+            if col not in years
+            and col in data_controls_dropdowns[model_output]
+        ],
+        inplace=True,
+    )
+    df = df[[col for col in df.columns if col in years]]
+
+    # make the values read-only, so that a callback can't change them for
+    # the others
+    values = df.to_numpy()
+    values.flags.writeable = False
+    df = pd.DataFrame(values, index=df.index, columns=df.columns)
+    df.attrs["units"] = units
+
+    return df
+
+
+def get_dataset(model_output):
+    with datasets_lock:
+        if model_output not in datasets:
+            datasets[model_output] = read_dataset(model_output)
+
+        return datasets[model_output]
+
+
+def save_arrow_datasets():
+    # Write each loaded explorer dataset as an Arrow IPC file next to its
+    # parquet file. NaN is kept as a value rather than a null, so that the
+    # year columns can be mapped without copying.
+    for name, df in list(datasets.items()):
+        table = pa.Table.from_arrays(
+            [
+                pa.array(df.index.get_level_values(level))
+                for level in df.index.names
+            ]
+            + [pa.array(df[col].to_numpy()) for col in df.columns],
+            names=[*df.index.names, *df.columns],
+        ).replace_schema_metadata(
+            {"units": json.dumps(df.attrs["units"])}
+        )
+
+        with pa.OSFile(
+            os.path.join(get_data_path(), name + ".arrow"), "wb"
+        ) as file:
+            with pa.ipc.new_file(file, table.schema) as writer:
+                writer.write_table(table)
+
+
+# load the datasets that are available when the app starts, so that callbacks
+# don't have to
+for name in model_output:
+    try:
+        get_dataset(name)
+    except FileNotFoundError:
+        pass
+
+
 # make layout
 app.layout = html.Div(
     [
         dcc.Location(id='url', refresh=False),
+        # the args of the URL the session was opened with, and the URL whose
+        # args were last applied to the controls. They are kept in the
+        # browser, since the args differ between sessions.
+        dcc.Store(id='url_args'),
+        dcc.Store(id='url_args_loaded'),
         html.Meta(
             charSet="utf-8",
         ),
@@ -1088,27 +1205,27 @@ app.layout = html.Div(
     },
 )
 
-@app.callback(Output("model_output", "value"),
+@app.callback([Output("model_output", "value"), Output("url_args", "data")],
               Input('url', 'href'))
 def get_url(href: str):
     f = furl(href)
-    data['initial_load'] = True
-    data['args'] = {}
-    data['args']['origin'] = f.origin
+    args = {}
+    args['href'] = href
+    args['origin'] = f.origin
 
     for key in f.args.keys():
         if ';' in f.args[key]:
-            data['args'][key] = f.args[key].split(';')
+            args[key] = f.args[key].split(';')
         else:
             if (key == 'groupby'):
-                data['args'][key] = [f.args[key]]
+                args[key] = [f.args[key]]
             else:
-                data['args'][key] = f.args[key]
+                args[key] = f.args[key]
 
     if 'model_output' in f.args.keys():
-        return f.args['model_output']
+        return (f.args['model_output'], args)
     else:
-        return "energy_output_supply"
+        return ("energy_output_supply", args)
 
 # given an input value for model_output, create lists for data_controls and graph_controls. unused_data_controls is needed to store the unused data controls in a hidden div
 @app.callback(
@@ -1116,18 +1233,27 @@ def get_url(href: str):
         Output("date_range", "value"),
         Output("data_controls", "children"),
         Output("graph_controls", "children"),
+        Output("url_args_loaded", "data"),
     ],
     inputs=[Input("model_output", "value")],
+    state=[State("url_args", "data"), State("url_args_loaded", "data")],
     prevent_initial_call=True,
 )
 def set_data_and_chart_control_options(
-    model_output, all_possible_index_names=all_possible_index_names
+    model_output,
+    args,
+    loaded_href,
+    all_possible_index_names=all_possible_index_names,
 ):
-    
+    # the URL args set the controls only the first time they are made after
+    # the URL is loaded
+    args = args or {}
+    initial_load = args.get('href') != loaded_href
+
     graph_output_dropdown_values = graph_output_dropdown_values_all[model_output]
-    if data['initial_load'] and ('graph_output' in data['args'].keys()):
-        if data['args']['graph_output'] in graph_output_dropdown_values:
-            graph_output_dropdown_values_default = data['args']['graph_output']
+    if initial_load and ('graph_output' in args.keys()):
+        if args['graph_output'] in graph_output_dropdown_values:
+            graph_output_dropdown_values_default = args['graph_output']
         else:
             graph_output_dropdown_values_default = (
                 graph_output_dropdown_values_default_all[model_output]
@@ -1138,9 +1264,9 @@ def set_data_and_chart_control_options(
         )
 
     group_by_dropdown_values = group_by_dropdown_values_all[model_output]
-    if data['initial_load'] and ('groupby' in data['args'].keys()):
+    if initial_load and ('groupby' in args.keys()):
         valid_inputs = []
-        for groupby_key in data['args']['groupby']:
+        for groupby_key in args['groupby']:
             filtered = list(filter(lambda x: x['value'] == groupby_key, group_by_dropdown_values))
             if len(filtered) == 1:
                 valid_inputs.append(groupby_key)
@@ -1164,29 +1290,29 @@ def set_data_and_chart_control_options(
     ]
 
     y_axis_type_dropdown_values = y_axis_type_dropdown_values_all[model_output]
-    if data['initial_load'] and ('yaxis_type' in data['args'].keys()):
-        if data['args']['yaxis_type'] in y_axis_type_dropdown_values:
-            y_axis_type_dropdown_default = data['args']['yaxis_type']
+    if initial_load and ('yaxis_type' in args.keys()):
+        if args['yaxis_type'] in y_axis_type_dropdown_values:
+            y_axis_type_dropdown_default = args['yaxis_type']
         else:
             y_axis_type_dropdown_default = y_axis_type_dropdown_default_all[model_output]
     else :
         y_axis_type_dropdown_default = y_axis_type_dropdown_default_all[model_output]
 
     units_dropdown_values = units_dropdown_values_all[model_output]
-    if data['initial_load'] and ('units' in data['args'].keys()):
-        filtered = list(filter(lambda x: x['value'] == data['args']['units'], units_dropdown_values))
+    if initial_load and ('units' in args.keys()):
+        filtered = list(filter(lambda x: x['value'] == args['units'], units_dropdown_values))
         if len(filtered) == 1:
-            units_dropdown_default = data['args']['units']
+            units_dropdown_default = args['units']
         else:
             units_dropdown_default = units_dropdown_default_all[model_output]
     else:
         units_dropdown_default = units_dropdown_default_all[model_output]
 
     graph_type_dropdown_values = graph_type_dropdown_values_all[model_output]
-    if data['initial_load'] and ('graph_type' in data['args'].keys()):
-        filtered = list(filter(lambda x: x['value'] == data['args']['graph_type'], graph_type_dropdown_values))
+    if initial_load and ('graph_type' in args.keys()):
+        filtered = list(filter(lambda x: x['value'] == args['graph_type'], graph_type_dropdown_values))
         if len(filtered) == 1:
-            graph_type_dropdown_default = data['args']['graph_type']
+            graph_type_dropdown_default = args['graph_type']
         else:
             graph_type_dropdown_default = graph_type_dropdown_default_all[model_output]
     else:
@@ -1198,23 +1324,7 @@ def set_data_and_chart_control_options(
     else:
         df_index_custom_default = {}
 
-    # read model_output data
-    expanded_home_path = os.path.expanduser("~/positive-disruption/podi/data/")
-    if os.path.isdir(expanded_home_path):
-        data_path = expanded_home_path
-    elif os.path.isdir("data/"):
-        data_path = "data/"
-    else:
-        raise FileNotFoundError("Data directory not found")
-
-    df = pd.read_parquet(os.path.join(data_path, model_output + ".parquet"))
-    index_dtypes = {k: "category" for k in df.index.names}
-    column_dtypes = {j: "float32" for j in df.columns}
-    dtypes = {**index_dtypes, **column_dtypes}
-    df = df.reset_index().astype(dtypes)
-
-    # store unit label for use in graph axis label
-    data["units"] = df["unit"].unique().tolist()
+    df = get_dataset(model_output)
 
     # define data_controls_dropdowns that should allow for multi-selection
     data_controls_dropdowns_multiselect = {
@@ -1251,44 +1361,6 @@ def set_data_and_chart_control_options(
         "units": "Select the unit to view",
     }
 
-    # drop the columns that are numerical and not in the range of data_start_year to proj_end_year
-    df.drop(
-        columns=[
-            col
-            for col in df.columns
-            if col.isdigit()
-            and int(col) not in range(data_start_year, proj_end_year + 1)
-        ],
-        inplace=True,
-    )
-
-    # set index
-    df.set_index(
-        df.columns[
-            (
-                ~df.columns.isin(
-                    str(f"{i}")
-                    for i in range(data_start_year, proj_end_year + 1)
-                )
-            )
-            & (df.columns.isin(data_controls_dropdowns[model_output]))
-        ].tolist(),
-        inplace=True,
-    )
-
-    # drop unused columns (at this point all columns that are not numerical)
-    df.drop(
-        columns=df.columns[
-            ~df.columns.isin(
-                str(f"{i}") for i in range(data_start_year, proj_end_year + 1)
-            )
-        ].tolist(),
-        inplace=True,
-    )
-
-    # set global dataframe
-    data["df"] = df
-
     # define list of data controls, labels, and tooltips
     div_elements = []
 
@@ -1296,21 +1368,21 @@ def set_data_and_chart_control_options(
         # if df_index_custom_default is defined and level is in
         # df_index_custom_default, use df_index_custom_default[level] as
         # default_value
-        if data['initial_load'] and (level in data['args'].keys()):
-            default_value = data['args'][level]
+        if initial_load and (level in args.keys()):
+            default_value = args[level]
         elif level not in df.index.names:
             default_value = []
         elif df_index_custom_default and level in df_index_custom_default:
             default_value = df_index_custom_default[level]
         elif data_controls_dropdowns_multiselect[level]:
-            default_value = df.reset_index()[level].unique().tolist()
+            default_value = df.index.unique(level=level).tolist()
         else:
-            default_value = df.reset_index()[level].unique().tolist()[-1]
+            default_value = df.index.unique(level=level).tolist()[-1]
 
         values = (
             []
             if level not in df.index.names
-            else df.reset_index()[level].unique().tolist()
+            else df.index.unique(level=level).tolist()
         )
         display = "none" if level not in df.index.names else "block"
 
@@ -1519,14 +1591,12 @@ def set_data_and_chart_control_options(
         ),
     )
 
-    if 'date_range' in data['args'].keys():
-        date_range = [int(date) for date in data['args']['date_range']]
+    if 'date_range' in args.keys():
+        date_range = [int(date) for date in args['date_range']]
     else:
         date_range = [data_start_year, proj_end_year]
 
-    data['initial_load'] = False
-
-    return (date_range, data_controls, graph_controls)
+    return (date_range, data_controls, graph_controls, args.get('href'))
 
 
 """
@@ -1549,23 +1619,8 @@ def update_data_controls(
     *index_values,
 ):
 
-    # read model_output data
-    expanded_home_path = os.path.expanduser("~/positive-disruption/podi/data/")
-    if os.path.isdir(expanded_home_path):
-        data_path = expanded_home_path
-    elif os.path.isdir("data/"):
-        data_path = "data/"
-    else:
-        raise FileNotFoundError("Data directory not found")
-
-    df = pd.read_parquet(
-        os.path.join(data_path, model_output + ".parquet")
-    )
-    index_dtypes = {k: "category" for k in df.index.names}
-    column_dtypes = {j: "float32" for j in df.columns}
-    dtypes = {**index_dtypes, **column_dtypes}
-    df = df.reset_index().astype(dtypes)
-
+    # get model_output data, indexed by its data controls
+    df = get_dataset(model_output)
 
     # define tooltip descriptions of data controls and graph_controls dropdowns
     tooltip_dict = {
@@ -1585,41 +1640,6 @@ def update_data_controls(
         "graph-output": "Select the graph output to view",
     }
 
-    # drop the columns that are numerical and not in the range of data_start_year to proj_end_year
-    df.drop(
-        columns=[
-            col
-            for col in df.columns
-            if col.isdigit()
-            and int(col) not in range(data_start_year, proj_end_year + 1)
-        ],
-        inplace=True,
-    )
-
-    # set index
-    df.set_index(
-        df.columns[
-            (
-                ~df.columns.isin(
-                    str(f"{i}")
-                    for i in range(data_start_year, proj_end_year + 1)
-                )
-            )
-            & (df.columns.isin(data_controls_dropdowns[model_output]))
-        ].tolist(),
-        inplace=True,
-    )
-
-    # drop unused columns (at this point all columns that are not numerical)
-    df.drop(
-        columns=df.columns[
-            ~df.columns.isin(
-                str(f"{i}") for i in range(data_start_year, proj_end_year + 1)
-            )
-        ].tolist(),
-        inplace=True,
-    )
-
     # filter df based on index_values. Retain the old behavior, use `series.index.isin(sequence, level=1)` if `index_values` is a list of lists
     # drop empty arrays from index_values
     index_values = [x for x in index_values if x]
@@ -1729,7 +1749,8 @@ def update_data_controls(
 @app.callback(
     Output("share-url", "children"),
     inputs=[Input("share-tooltip", "is_open")],
-    state=[State("model_output", "value"),
+    state=[State("url_args", "data"),
+        State("model_output", "value"),
         State("date_range", "value"),
         State("graph_output", "value"),
         State("group_by_dropdown_values", "value"),
@@ -1740,7 +1761,7 @@ def update_data_controls(
     ],
     prevent_initial_call=True,
 )
-def get_sharing_url(btn_share, model_output, date_range, graph_output, groupby, yaxis_type, graph_type, units, *states):
+def get_sharing_url(btn_share, args, model_output, date_range, graph_output, groupby, yaxis_type, graph_type, units, *states):
     query = '?'
     for (param, value) in [("model_output", model_output), ("date_range", date_range),
                            ("graph_output", graph_output), ("groupby", groupby), 
@@ -1763,7 +1784,7 @@ def get_sharing_url(btn_share, model_output, date_range, graph_output, groupby,
         if values != '':
             query += label + '=' + values + "&"
 
-    return (data['args']['origin'] + query).replace(" ", "%20").strip("&")
+    return (args['origin'] + query).replace(" ", "%20").strip("&")
 
 for level in all_possible_index_names:
 
@@ -1790,14 +1811,16 @@ for level in all_possible_index_names:
     @app.callback(
         Output(f"{level}", "options"),
         Input(f"{level}-search-box", "value"),
+        State("model_output", "value"),
         prevent_initial_call=True,
     )
-    def update_checklist_values(search_value):
+    def update_checklist_values(search_value, model_output):
         this_level = ctx.triggered_id.split("-")[0]
+        df = get_dataset(model_output)
         values = (
             []
-            if this_level not in data["df"].index.names
-            else data["df"].reset_index()[this_level].unique().tolist()
+            if this_level not in df.index.names
+            else df.index.unique(level=this_level).tolist()
         )
         options = [
             {"label": i, "value": i}
@@ -1818,6 +1841,83 @@ for level in all_possible_index_names:
         return ""
 
 
+# Rollup cubes and figures are cached per model_output, since the explorer
+# datasets don't change while the app runs. A cube is a dataset summed over
+# the levels that a view neither filters nor groups by, so that most views
+# only need to aggregate a small frame. Figures are kept in an LRU keyed on the
+# normalized inputs of update_output_graph. Both are shared by all threads.
+cubes = {}
+level_values = {}
+figure_cache = OrderedDict()
+figure_cache_size = 256
+cache_lock = threading.Lock()
+
+
+def normalize_input(value):
+    # Make a callback input hashable, ignoring the order of multi-selections
+    if isinstance(value, (list, tuple)):
+        return tuple(sorted(value, key=str))
+    return value
+
+
+def get_level_values(model_output, df, level):
+    key = (model_output, level)
+    with cache_lock:
+        if key in level_values:
+            return level_values[key]
+
+    values = set(df.index.unique(level=level))
+    with cache_lock:
+        level_values[key] = values
+
+    return values
+
+
+def get_cube(model_output, df, levels):
+    key = (model_output, tuple(levels))
+    with cache_lock:
+        if key in cubes:
+            return cubes[key]
+
+    cube = df.groupby(level=list(levels), observed=True).sum()
+    with cache_lock:
+        cubes[key] = cube
+
+    return cube
+
+
+def filter_frame(df, filters):
+    mask = np.ones(len(df), dtype=bool)
+    for name, values in filters.items():
+        if name in df.index.names:
+            mask &= df.index.get_level_values(name).isin(values)
+
+    return df[mask]
+
+
+def query_cube(model_output, df, filters, group_by, date_range):
+    # Keep only the levels that are grouped by or filtered to a subset of their
+    # values, and sum over the rest
+    levels = [
+        name
+        for name in df.index.names
+        if name in group_by
+        or name in filters
+        and not get_level_values(model_output, df, name).issubset(
+            filters[name]
+        )
+    ]
+    cube = get_cube(model_output, df, levels)
+
+    return (
+        filter_frame(cube, filters)
+        .groupby(level=group_by, observed=True)
+        .sum()
+        .loc[:, str(date_range[0]) : str(date_range[1])]
+        .T.fillna(0)
+    )
+
+
 # update graph
 @app.callback(
     output=[Output("output_graph", "figure")],
@@ -1843,6 +1943,51 @@ def update_output_graph(
     graph_type,
     units,
     *index_values,
+):
+    key = (
+        model_output,
+        normalize_input(date_range),
+        graph_output,
+        normalize_input(group_by_dropdown_values),
+        yaxis_type,
+        graph_type,
+        units,
+        tuple(normalize_input(value) for value in index_values),
+    )
+
+    with cache_lock:
+        if key in figure_cache:
+            figure_cache.move_to_end(key)
+            return (figure_cache[key],)
+
+    (fig,) = build_output_graph(
+        model_output,
+        date_range,
+        graph_output,
+        group_by_dropdown_values,
+        yaxis_type,
+        graph_type,
+        units,
+        *index_values,
+    )
+
+    with cache_lock:
+        figure_cache[key] = fig
+        if len(figure_cache) > figure_cache_size:
+            figure_cache.popitem(last=False)
+
+    return (fig,)
+
+
+def build_output_graph(
+    model_output,
+    date_range,
+    graph_output,
+    group_by_dropdown_values,
+    yaxis_type,
+    graph_type,
+    units,
+    *index_values,
 ):
     # define dictionaries used for graph formatting
     stack_type = {"none": None, "tonexty": "1"}
@@ -1920,16 +2065,7 @@ def update_output_graph(
     # drop empty index_values
     index_values = [value for value in index_values if value]
 
-    # read model_output data
-    expanded_home_path = os.path.expanduser("~/positive-disruption/podi/data/")
-    if os.path.isdir(expanded_home_path):
-        data_path = expanded_home_path
-    elif os.path.isdir("data/"):
-        data_path = "data/"
-    else:
-        raise FileNotFoundError("Data directory not found")
-
-    df = data["df"]
+    df = get_dataset(model_output)
 
     # remove index values at locations where df.index.names is not in data_controls_dropdowns[model_output]
     index_values = [
@@ -1938,11 +2074,12 @@ def update_output_graph(
         if name in data_controls_dropdowns[model_output]
     ]
 
-    # check if df.loc[tuple([*index_values])] raises a KeyError, and if so, return an empty figure
-    try:
-        df.loc[tuple([*index_values])]
-    except KeyError:
-        return (no_data_fig,)
+    # filter each level of df by a list of values, so that single selections
+    # don't drop the level
+    filters = {
+        name: value if isinstance(value, list) else [value]
+        for value, name in zip(index_values, df.index.names)
+    }
 
     # prevent error if group_by_dropdown_values is empty
     if not group_by_dropdown_values:
@@ -1970,32 +2107,16 @@ def update_output_graph(
             ),
         )
 
-    filtered_df = df.loc[tuple([*index_values])]
-    df = df.loc[tuple([*index_values])]
+    # if a group-by level is not in df, return an empty figure
+    if not set(group_by_dropdown_values).issubset(df.index.names):
+        return (no_data_fig,)
+
+    filtered_df = query_cube(
+        model_output, df, filters, group_by_dropdown_values, date_range
+    )
 
     # update units based on units dropdown
     filtered_df = filtered_df * units_dict[units]
-    df = df * units_dict[units]
-
-    # check if filtered_df.loc[tuple([*index_values])] raises a KeyError, and if so, return an empty figure
-    try:
-        # Resetting the index
-        df_reset = filtered_df.reset_index()
-
-        # Now apply the Dask operations
-        ddf = dd.from_pandas(df_reset, npartitions=16)
-
-        filtered_df = (
-            (
-                ddf.groupby(group_by_dropdown_values)
-                .sum(numeric_only=True)
-                .loc[:, str(date_range[0]) : str(date_range[1])]
-            )
-            .compute()
-            .T.fillna(0)
-        )
-    except KeyError:
-        return (no_data_fig,)
 
     # check if filtered_df raises an error
     if filtered_df.empty:
@@ -2822,6 +2943,10 @@ def update_output_graph(
             fig.update_yaxes(title="% of Final Year Value")
 
     elif graph_output == "Emissions Mitigated":
+        # this graph compares scenarios before grouping, so it needs the
+        # filtered data rather than the cube
+        df = filter_frame(df, filters) * units_dict[units]
+
         # prevent confusing output if two scenarios are not selected
         # make index_values a list if it is not already
         if not isinstance(index_values[1], list):
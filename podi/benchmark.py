@@ -0,0 +1,614 @@
+# region
+
+import argparse
+import gc
+import glob
+import importlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from podi import iea, pipeline, profiler
+
+# endregion
+
+# Time the stages and the data explorer callbacks on synthetic data, at
+# multiples of the shipped region counts, so that performance regressions show
+# up without the licensed IEA data. Synthetic frames have the index labels of
+# the shipped outputs (podi/data/*.parquet, or the CSVs in podi/data/output),
+# with each region copied scale times under a suffixed name, and random values.
+# Each scale runs in a copy of podi/data in a temporary directory, since the
+# stages read and write podi/data relative to the working directory. In the
+# copy, region_categories.csv has the same region copies, and the IEA World
+# Energy Balances dataset is synthetic. Other inputs keep their shipped
+# regions, so region copies have no data in them.
+#
+# Run with `python -m podi.benchmark` (or `make benchmark`). Results are added
+# to results_path with the commit they were run at. Targets that raise, and
+# timings slower than the last run at another commit by more than tolerance,
+# are reported, and make the run exit with status 1.
+
+results_path = "cache/benchmark.json"
+scales = [1, 10, 100]
+tolerance = 0.2
+seed = 0
+
+config = {
+    "model": "PD22",
+    "scenario": "pathway",
+    "data_start_year": 1990,
+    "data_end_year": 2020,
+    "proj_end_year": 2100,
+    "climate_ensemble": False,
+    "energy_sharded": False,
+}
+
+# Sources of the index labels of each synthetic frame, in order of preference
+templates = {
+    "energy_output": [
+        "podi/data/energy_output.parquet",
+        "podi/data/output/energy/*.csv",
+    ],
+    "afolu_output": [
+        "podi/data/afolu_output.parquet",
+        "podi/data/output/afolu/*.csv",
+    ],
+    "emissions_output": [
+        "podi/data/emissions_output.parquet",
+        "podi/data/output/emissions/*.csv",
+    ],
+    "emissions_output_co2e": [
+        "podi/data/emissions_output_co2e.parquet",
+        "podi/data/output/emissions_co2e/*.csv",
+    ],
+    "climate_output_concentration": [
+        "podi/data/climate_output_concentration.parquet"
+    ],
+    "climate_output_forcing": ["podi/data/climate_output_forcing.parquet"],
+    "climate_output_temperature": [
+        "podi/data/climate_output_temperature.parquet"
+    ],
+    "technology_adoption_output": [
+        "podi/data/technology_adoption_output.parquet"
+    ],
+}
+
+# Data explorer datasets, by the synthetic frame they are made from and the
+# flow categories they keep (all if None), as in main.py
+explorer_datasets = {
+    "energy_output_supply": (
+        "energy_output",
+        ["Electricity output", "Heat output"],
+    ),
+    "energy_output_demand": (
+        "energy_output",
+        [
+            "Final consumption",
+            "Transformation processes",
+            "Energy industry own use and Losses",
+        ],
+    ),
+    "emissions_output_co2e": ("emissions_output_co2e", None),
+    "climate_output_concentration": ("climate_output_concentration", None),
+    "climate_output_temperature": ("climate_output_temperature", None),
+    "technology_adoption_output": ("technology_adoption_output", None),
+}
+
+index_names = [
+    "model",
+    "scenario",
+    "region",
+    "sector",
+    "product_category",
+    "product_long",
+    "product_short",
+    "flow_category",
+    "flow_long",
+    "flow_short",
+    "unit",
+]
+
+
+def load_template(name):
+    """
+    Return the unique index labels of the first existing source of name in
+    templates, or None if there is none.
+    """
+    for pattern in templates[name]:
+        paths = sorted(glob.glob(pattern))
+        if not paths:
+            continue
+
+        if pattern.endswith(".parquet"):
+            index = pd.read_parquet(paths[0], columns=[]).index
+        else:
+            # Some output CSVs are totals without a region, which are left out
+            index = pd.MultiIndex.from_frame(
+                pd.concat(
+                    [
+                        pd.read_csv(path, usecols=index_names)
+                        for path in paths
+                        if set(index_names).issubset(
+                            pd.read_csv(path, nrows=0).columns
+                        )
+                    ]
+                )[index_names]
+            )
+
+        return index.unique().remove_unused_levels()
+
+    return None
+
+
+def suffix(labels, copy):
+    # The labels of a copy of regions. Copy 0 keeps the shipped names.
+    labels = pd.Index(labels.astype(str))
+    if copy == 0:
+        return labels
+    return labels + f"_{copy}"
+
+
+def scale_index(index, scale, level="region"):
+    """
+    Return index with its rows repeated for scale copies of the labels of
+    level.
+    """
+    position = index.names.index(level)
+    labels = index.levels[position]
+
+    levels = list(index.levels)
+    levels[position] = pd.Index(
+        np.concatenate([suffix(labels, copy) for copy in range(scale)])
+    )
+
+    codes = [np.tile(np.asarray(c), scale) for c in index.codes]
+    region_codes = np.asarray(index.codes[position])
+    codes[position] = np.concatenate(
+        [
+            np.where(region_codes >= 0, region_codes + copy * len(labels), -1)
+            for copy in range(scale)
+        ]
+    )
+
+    return pd.MultiIndex(
+        levels=levels, codes=codes, names=index.names, verify_integrity=False
+    )
+
+
+def synthetic_frame(index, scale, columns, rng):
+    """
+    Return a frame with the rows of index for scale copies of its regions,
+    the years in columns, and random values.
+    """
+    index = scale_index(index, scale)
+
+    return pd.DataFrame(
+        rng.random((len(index), len(columns))),
+        index=index,
+        columns=columns,
+    )
+
+
+class Frames(dict):
+    """
+    Synthetic frames by name, for scale copies of the regions of their
+    templates. Frames are made the first time they are used, and are None if
+    their template is missing. Each frame has its own random seed, so that it
+    doesn't depend on the order they are used in.
+    """
+
+    def __init__(self, templates, scale):
+        super().__init__()
+        self.templates = templates
+        self.scale = scale
+
+    def __missing__(self, name):
+        index = self.templates[name]
+        if index is None:
+            self[name] = None
+        else:
+            self[name] = synthetic_frame(
+                index,
+                self.scale,
+                list(
+                    range(
+                        config["data_start_year"], config["proj_end_year"] + 1
+                    )
+                ),
+                np.random.default_rng(
+                    [seed, self.scale, list(self.templates).index(name)]
+                ),
+            )
+
+        return self[name]
+
+
+def scale_region_categories(path, scale):
+    # Add copies of each region with suffixed names in every column but
+    # 'EIA Region', which groups regions
+    regions = pd.read_csv(path)
+
+    copies = [regions]
+    for copy in range(1, scale):
+        renamed = regions.copy()
+        for column in regions.columns.drop("EIA Region", errors="ignore"):
+            renamed[column] = regions[column].where(
+                regions[column].isna(),
+                regions[column].astype(str) + f"_{copy}",
+            )
+        copies.append(renamed)
+
+    pd.concat(copies).to_csv(path, index=False)
+
+
+def write_iea(energy_output, data_start_year, data_end_year, rng):
+    """
+    Write a synthetic IEA World Energy Balances dataset, in the form written
+    by iea.convert_iea_to_parquet, with the historical rows of energy_output
+    and random values. Product and flow definitions are written from the
+    labels of energy_output if they are missing.
+    """
+    os.makedirs("podi/data/IEA/Other", exist_ok=True)
+    if os.path.exists(iea.iea_dataset):
+        shutil.rmtree(iea.iea_dataset)
+
+    labels = energy_output.index.to_frame(index=False)
+    rows = labels.loc[
+        labels["scenario"] == "baseline",
+        ["region", "product_short", "flow_short", "unit"],
+    ].drop_duplicates()
+    years = np.arange(data_start_year, data_end_year + 1)
+
+    # Write 100 regions at a time, so that the long table of all regions is
+    # never built at once
+    regions = rows["region"].unique()
+    for i, chunk in enumerate(
+        np.array_split(regions, max(len(regions) // 100, 1))
+    ):
+        chunk_rows = rows[rows["region"].isin(chunk)]
+        long = chunk_rows.loc[chunk_rows.index.repeat(len(years))].assign(
+            year=np.tile(years, len(chunk_rows)),
+            value=rng.random(len(chunk_rows) * len(years)) * 1000,
+        )
+        ds.write_dataset(
+            pa.Table.from_pandas(long[iea.names], preserve_index=False),
+            iea.iea_dataset,
+            format="parquet",
+            partitioning=["region"],
+            partitioning_flavor="hive",
+            basename_template=f"part-{i}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+    pd.Series(regions, name="region").str.upper().to_csv(
+        "podi/data/IEA/Regions.txt", index=False
+    )
+
+    for path, columns in [
+        (
+            "podi/data/IEA/Other/IEA_Product_Definitions.csv",
+            ["product_category", "product_long", "product_short"],
+        ),
+        (
+            "podi/data/IEA/Other/IEA_Flow_Definitions.csv",
+            ["flow_category", "flow_long", "flow_short"],
+        ),
+    ]:
+        if not os.path.exists(path):
+            labels[columns].drop_duplicates(columns[-1]).to_csv(
+                path, index=False
+            )
+
+
+def ignore_outputs(directory, names):
+    # Leave out the shipped output CSVs, and the IEA source files other than
+    # the definitions, when copying podi/data
+    if os.path.basename(directory) == "data":
+        return [name for name in names if name == "output"]
+    if os.path.basename(directory) == "IEA":
+        return [name for name in names if name != "Other"]
+    return []
+
+
+@contextmanager
+def sandbox(frames):
+    """
+    Run in a temporary copy of podi/data with inputs scaled to frames.scale,
+    and the data explorer datasets made from frames in data/.
+    """
+    cwd = os.getcwd()
+    directory = tempfile.mkdtemp(prefix="podi-benchmark-")
+    try:
+        shutil.copytree(
+            "podi/data",
+            os.path.join(directory, "podi/data"),
+            ignore=ignore_outputs,
+        )
+        os.makedirs(os.path.join(directory, "cache"))
+        os.makedirs(os.path.join(directory, "data"))
+        os.chdir(directory)
+
+        scale_region_categories(
+            "podi/data/region_categories.csv", frames.scale
+        )
+        if frames["energy_output"] is not None:
+            write_iea(
+                frames["energy_output"],
+                config["data_start_year"],
+                config["data_end_year"],
+                np.random.default_rng([seed, frames.scale]),
+            )
+
+        for name, (source, flow_categories) in explorer_datasets.items():
+            df = frames[source]
+            if df is None:
+                continue
+            if flow_categories is not None:
+                df = df[
+                    df.index.get_level_values("flow_category").isin(
+                        flow_categories
+                    )
+                ]
+            df = df.set_axis(df.columns.astype(str), axis=1)
+            df.to_parquet(f"data/{name}.parquet")
+
+        yield directory
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def measure(target, function, *args, **kwargs):
+    """
+    Call function and return a record of its wall time and peak RSS, and of
+    the error it raised and its traceback, if any.
+    """
+    gc.collect()
+    profiler.reset_peak()
+    start = time.perf_counter()
+    try:
+        function(*args, **kwargs)
+        error = None
+        trace = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        trace = traceback.format_exc()
+
+    return {
+        "target": target,
+        "seconds": time.perf_counter() - start,
+        "peak_rss": profiler.rss()[1],
+        "error": error,
+        "traceback": trace,
+    }
+
+
+def benchmark_stages(frames, names):
+    # Run each stage on synthetic outputs of the stages it depends on, rather
+    # than on the outputs of the previous stage, so that a stage that fails
+    # doesn't stop the others
+    records = []
+    for name in names:
+        stage = pipeline.stages[name]
+
+        missing = [a for a in stage["upstream"] if frames[a] is None]
+        if missing:
+            records.append(
+                {"target": name, "error": f"No template for {missing}"}
+            )
+            continue
+
+        records.append(
+            measure(
+                name,
+                stage["function"],
+                **{key: config[key] for key in stage["parameters"]},
+                **{a: frames[a] for a in stage["upstream"]},
+            )
+        )
+
+    return records
+
+
+def benchmark_app():
+    # Import the data explorer in the sandbox, so that it loads the datasets
+    # in data/, then time a graph of each dataset with all values selected,
+    # the same graph from the cache, and a graph without one region
+    home = os.environ.get("HOME")
+    os.environ["HOME"] = os.getcwd()
+    sys.modules.pop("podi.app", None)
+    try:
+        records = [measure("app: load", importlib.import_module, "podi.app")]
+        app = sys.modules.get("podi.app")
+        if app is None:
+            return records
+
+        for name in app.datasets:
+            df = app.get_dataset(name)
+            values = [list(df.index.unique(level=n)) for n in df.index.names]
+            arguments = [
+                None,
+                name,
+                [config["data_start_year"], config["proj_end_year"]],
+                app.graph_output_dropdown_values_default_all[name],
+                app.group_by_dropdown_values_default_all[name],
+                app.y_axis_type_dropdown_default_all[name],
+                app.graph_type_dropdown_default_all[name],
+                app.units_dropdown_default_all[name],
+            ]
+
+            records.append(
+                measure(
+                    f"app: {name}",
+                    app.update_output_graph,
+                    *arguments,
+                    *values,
+                )
+            )
+            records.append(
+                measure(
+                    f"app: {name} (cached)",
+                    app.update_output_graph,
+                    *arguments,
+                    *values,
+                )
+            )
+
+            region = df.index.names.index("region")
+            values[region] = values[region][1:] or values[region]
+            records.append(
+                measure(
+                    f"app: {name} (filtered)",
+                    app.update_output_graph,
+                    *arguments,
+                    *values,
+                )
+            )
+
+        return records
+    finally:
+        sys.modules.pop("podi.app", None)
+        if home is None:
+            os.environ.pop("HOME", None)
+        else:
+            os.environ["HOME"] = home
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(records, previous, commit, tolerance=tolerance):
+    """
+    Return the records that failed, and those that are slower by more than
+    tolerance than the last record in previous of the same target and scale
+    from another commit.
+    """
+    last = {
+        (record["target"], record["scale"]): record
+        for record in previous
+        if record["commit"] != commit and not record.get("error")
+    }
+
+    regressions = []
+    for record in records:
+        key = (record["target"], record["scale"])
+        if record.get("error"):
+            regressions.append(record)
+        elif key in last and record["seconds"] > last[key]["seconds"] * (
+            1 + tolerance
+        ):
+            regressions.append(
+                {**record, "previous_seconds": last[key]["seconds"]}
+            )
+
+    return regressions
+
+
+def run(scales=scales, targets=None, path=results_path):
+    """
+    Benchmark targets (stage names and 'app', all by default) at each of
+    scales, and add the results to path. Returns the results and the
+    failures and regressions found by compare().
+    """
+    targets = targets or [*pipeline.stages, "app"]
+    path = os.path.abspath(path)
+    commit = get_commit()
+    timestamp = datetime.now(timezone.utc).isoformat()
+
+    template_indexes = {name: load_template(name) for name in templates}
+
+    records = []
+    for scale in scales:
+        print(f"scale {scale}: making synthetic data")
+        frames = Frames(template_indexes, scale)
+
+        with sandbox(frames):
+            scale_records = benchmark_stages(
+                frames, [t for t in targets if t in pipeline.stages]
+            )
+            if "app" in targets:
+                scale_records += benchmark_app()
+
+        rows = {name: len(df) for name, df in frames.items() if df is not None}
+        for record in scale_records:
+            record.update(
+                commit=commit, timestamp=timestamp, scale=scale, rows=rows
+            )
+            if record.get("error"):
+                result = record["error"]
+            else:
+                result = (
+                    f"{record['seconds']:.2f} s, "
+                    f"{record['peak_rss'] / 1e6:.0f} MB peak RSS"
+                )
+            print(f"scale {scale}: {record['target']}: {result}")
+        records += scale_records
+
+        del frames
+        gc.collect()
+
+    previous = []
+    if os.path.exists(path):
+        with open(path) as file:
+            previous = json.load(file)
+
+    regressions = compare(records, previous, commit)
+    for record in regressions:
+        if record.get("error"):
+            print(
+                f"failure: scale {record['scale']}: {record['target']}: "
+                f"{record['error']}"
+            )
+            if record.get("traceback"):
+                print(record["traceback"])
+        else:
+            print(
+                f"regression: scale {record['scale']}: {record['target']}: "
+                f"{record['seconds']:.2f} s, "
+                f"was {record['previous_seconds']:.2f} s"
+            )
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(previous + records, file, indent=2)
+
+    return records, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time the stages and data explorer on synthetic data"
+    )
+    parser.add_argument("--scales", type=int, nargs="+", default=scales)
+    parser.add_argument(
+        "--targets",
+        nargs="+",
+        choices=[*pipeline.stages, "app"],
+        help="stage names and/or app (all by default)",
+    )
+    parser.add_argument("--results", default=results_path)
+    args = parser.parse_args()
+
+    _, regressions = run(args.scales, args.targets, args.results)
+    sys.exit(1 if regressions else 0)
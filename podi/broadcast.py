@@ -0,0 +1,53 @@
+# region
+
+import numpy as np
+import pandas as pd
+
+# endregion
+
+# Align tables of ratios/factors onto the rows of a larger frame by a subset of
+# its index levels, so they can be applied as whole arrays instead of looking
+# up each row with .loc in parallel_apply.
+
+
+def align(ratios, index, levels):
+    """
+    Reindex the rows of ratios onto index, matching the levels of ratios'
+    index, in order, with the given levels (names or positions) of index.
+    Rows of index without a match are NaN. If ratios has duplicate keys, the
+    first is used.
+    """
+    ratios = ratios[~ratios.index.duplicated()]
+
+    keys = [index.get_level_values(level) for level in levels]
+    if len(keys) == 1:
+        keys = pd.Index(keys[0])
+    else:
+        keys = pd.MultiIndex.from_arrays(keys)
+
+    aligned = ratios.reindex(keys)
+    aligned.index = index
+
+    return aligned
+
+
+def multiply(df, ratios, levels):
+    """
+    Multiply each row of df by the row of ratios that matches it on levels.
+    ratios is either a DataFrame with the same columns as df, or a Series with
+    one value per row that is applied to all columns of df. The dtype of df
+    is kept if it is floating, e.g. float32 stays float32.
+    """
+    aligned = align(ratios, df.index, levels)
+    dtype = np.result_type(*df.dtypes, np.float32)
+
+    if isinstance(aligned, pd.Series):
+        values = aligned.to_numpy(dtype=dtype)[:, np.newaxis]
+    else:
+        values = aligned.reindex(columns=df.columns).to_numpy(dtype=dtype)
+
+    return pd.DataFrame(
+        df.to_numpy(dtype=dtype) * values,
+        index=df.index,
+        columns=df.columns,
+    )
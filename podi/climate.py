@@ -1,13 +1,353 @@
 # region
 
+import os
+
 import fair
+import numpy as np
 import pandas as pd
 from fair import FAIR
 from fair.interface import fill, initialise
 from fair.io import read_properties
 
+from podi import units
+
 # endregion
 
+# Climate configs for the FaIR runs, by config name. All scenarios are run
+# with all configs of a run in a single FAIR instance.
+climate_configs = {
+    "default": {
+        "ocean_heat_transfer": [0.6, 1.3, 1.0],
+        "ocean_heat_capacity": [5, 15, 80],
+        "deep_ocean_efficacy": 1.29,
+    },
+}
+
+climate_configs_co2e = {
+    "high": {
+        "ocean_heat_transfer": [0.6, 1.3, 1.0],
+        "ocean_heat_capacity": [5, 15, 80],
+        "deep_ocean_efficacy": 1.29,
+    },
+    "central": {
+        "ocean_heat_transfer": [1.1, 1.6, 0.9],
+        "ocean_heat_capacity": [8, 14, 100],
+        "deep_ocean_efficacy": 1.1,
+    },
+    "low": {
+        "ocean_heat_transfer": [1.7, 2.0, 1.1],
+        "ocean_heat_capacity": [6, 11, 75],
+        "deep_ocean_efficacy": 0.8,
+    },
+}
+
+
+# Calibrated FaIR parameter ensemble, with a row for each config, used when
+# climate() is run with climate_ensemble. Configs are run ensemble_chunksize
+# at a time, and the surface temperature is reduced to ensemble_percentiles.
+ensemble_path = "podi/data/external/calibrated_constrained_parameters.csv"
+ensemble_chunksize = 100
+ensemble_percentiles = [5, 17, 50, 83, 95]
+
+# Columns of the ensemble for each climate config. Configs are run with
+# internal variability, from the seed of each config, as they were calibrated.
+ensemble_parameters = {
+    "ocean_heat_capacity": ["clim_c1", "clim_c2", "clim_c3"],
+    "ocean_heat_transfer": ["clim_kappa1", "clim_kappa2", "clim_kappa3"],
+    "deep_ocean_efficacy": ["clim_epsilon"],
+    "gamma_autocorrelation": ["clim_gamma"],
+    "sigma_eta": ["clim_sigma_eta"],
+    "sigma_xi": ["clim_sigma_xi"],
+    "forcing_4co2": ["clim_F_4xCO2"],
+    "seed": ["seed"],
+}
+
+# Columns of the ensemble for each species config and specie (None for
+# configs that are not by specie). Columns of species that are not in a run
+# are not used.
+ensemble_species_parameters = {
+    ("iirf_0", "CO2"): "cc_r0",
+    ("iirf_airborne", "CO2"): "cc_rA",
+    ("iirf_uptake", "CO2"): "cc_rU",
+    ("iirf_temperature", "CO2"): "cc_rT",
+    ("baseline_concentration", "CO2"): "cc_co2_concentration_1750",
+    ("aci_scale", None): "aci_beta",
+    ("aci_shape", "Sulfur"): "aci_shape_so2",
+    ("aci_shape", "BC"): "aci_shape_bc",
+    ("aci_shape", "OC"): "aci_shape_oc",
+    **{
+        ("erfari_radiative_efficiency", specie): f"ari_{specie}"
+        for specie in [
+            "BC",
+            "CH4",
+            "N2O",
+            "NH3",
+            "NOx",
+            "OC",
+            "Sulfur",
+            "VOC",
+            "Equivalent effective stratospheric chlorine",
+        ]
+    },
+    **{
+        ("ozone_radiative_efficiency", specie): f"o3_{specie}"
+        for specie in [
+            "CH4",
+            "N2O",
+            "Equivalent effective stratospheric chlorine",
+            "CO",
+            "VOC",
+            "NOx",
+        ]
+    },
+    ("forcing_scale", "CO2"): "fscale_CO2",
+    ("forcing_scale", "CH4"): "fscale_CH4",
+    ("forcing_scale", "N2O"): "fscale_N2O",
+    ("forcing_scale", "Stratospheric water vapour"): "fscale_stratH2O",
+    ("forcing_scale", "Contrails"): "fscale_contrails",
+    (
+        "forcing_scale",
+        "Light absorbing particles on snow and ice",
+    ): "fscale_lapsi",
+    ("forcing_scale", "Land use"): "fscale_landuse",
+    ("forcing_scale", "Volcanic"): "fscale_volcanic",
+    ("forcing_scale", "Ozone"): "fscale_o3",
+    **{
+        ("forcing_scale", specie): "fscale_minorGHG"
+        for specie in [
+            "CFC-11",
+            "CFC-12",
+            "CFC-113",
+            "CFC-114",
+            "CFC-115",
+            "HCFC-22",
+            "HCFC-141b",
+            "HCFC-142b",
+            "CCl4",
+            "CHCl3",
+            "CH2Cl2",
+            "CH3Cl",
+            "CH3CCl3",
+            "CH3Br",
+            "Halon-1211",
+            "Halon-1301",
+            "Halon-2402",
+            "CF4",
+            "C2F6",
+            "C3F8",
+            "c-C4F8",
+            "C4F10",
+            "C5F12",
+            "C6F14",
+            "C7F16",
+            "C8F18",
+            "NF3",
+            "SF6",
+            "SO2F2",
+            "HFC-125",
+            "HFC-134a",
+            "HFC-143a",
+            "HFC-152a",
+            "HFC-227ea",
+            "HFC-23",
+            "HFC-236fa",
+            "HFC-245fa",
+            "HFC-32",
+            "HFC-365mfc",
+            "HFC-4310mee",
+        ]
+    },
+}
+
+# Columns of the ensemble that scale solar forcing, which the runs don't
+# have, so they are not used
+ensemble_unused = ["fscale_solar_amplitude", "fscale_solar_trend"]
+
+
+def fill_emissions(f, emissions, species, data_end_year):
+    """
+    Fill the emissions of species in f for all of its scenarios and configs
+    at once, from emissions, a DataFrame indexed by scenario and
+    product_short with a column for each year. Missing emissions are 0.
+    """
+    values = (
+        emissions.reindex(pd.MultiIndex.from_product([f.scenarios, species]))
+        .loc[:, data_end_year + 1 :]
+        .fillna(0)
+        .to_numpy()
+        .reshape(len(f.scenarios), len(species), -1)
+        .transpose(2, 0, 1)
+    )
+
+    f.emissions.loc[dict(specie=species)] = np.broadcast_to(
+        values[:, :, np.newaxis, :],
+        (values.shape[0], len(f.scenarios), len(f.configs), len(species)),
+    )
+
+
+def fill_climate_configs(f, configs):
+    for config, values in configs.items():
+        for name, value in values.items():
+            fill(f.climate_configs[name], value, config=config)
+
+
+def fill_species_configs(f, configs):
+    # Fill the species configs of each config, by (name, specie), skipping
+    # species that are not in f
+    for config, values in configs.items():
+        for (name, specie), value in values.items():
+            if specie is None:
+                fill(f.species_configs[name], value, config=config)
+            elif specie in f.species:
+                fill(
+                    f.species_configs[name],
+                    value,
+                    config=config,
+                    specie=specie,
+                )
+
+
+def run_fair(
+    emissions_output_fair,
+    configs,
+    initial_concentration,
+    data_end_year,
+    proj_end_year,
+    species_configs=None,
+):
+    """
+    Run FaIR from data_end_year to proj_end_year for all scenarios of
+    emissions_output_fair, a DataFrame indexed by scenario and product_short,
+    with each of configs. initial_concentration holds the CO2, CH4 and N2O
+    concentrations at data_end_year. species_configs optionally holds the
+    species configs of each config that differ from the defaults, by (name,
+    specie). Returns the FAIR instance.
+    """
+    f = FAIR()
+    f.define_time(data_end_year, proj_end_year, 1)
+    f.define_scenarios(
+        emissions_output_fair.index.unique(level="scenario").tolist()
+    )
+    f.define_configs(list(configs))
+    species, properties = read_properties()
+    species = list(
+        set(species)
+        & set(emissions_output_fair.index.unique(level="product_short"))
+    ) + list(["CO2"])
+    properties = {k: v for k, v in properties.items() if k in species}
+    f.define_species(species, properties)
+    f.ghg_method = "myhre1998"
+    f.allocate()
+
+    # Fill emissions with emissions from Emissions module
+    fill_emissions(
+        f,
+        emissions_output_fair,
+        [specie for specie in f.species if specie != "CO2"],
+        data_end_year,
+    )
+
+    # Define first timestep
+    for specie in ["CO2", "CH4", "N2O"]:
+        initialise(
+            f.concentration, initial_concentration[specie], specie=specie
+        )
+    initialise(f.temperature, 1.14)
+
+    # Fill climate configs
+    fill_climate_configs(f, configs)
+
+    # Fill species configs with default values, then those of each config
+    FAIR.fill_species_configs(f)
+    fill_species_configs(f, species_configs or {})
+
+    # Run
+    f.run()
+
+    return f
+
+
+def run_ensemble(
+    emissions_output_fair,
+    initial_concentration,
+    data_end_year,
+    proj_end_year,
+):
+    """
+    Run FaIR for all scenarios of emissions_output_fair with each config of
+    the calibrated parameter ensemble in ensemble_path, ensemble_chunksize
+    configs at a time. Returns the surface temperature as an array with
+    dimensions (timebounds, scenario, config), and the timebounds and
+    scenarios. Only the temperature of each chunk is kept, so memory for the
+    other outputs of FaIR is bounded by the chunk size.
+
+    The temperature of all configs is kept until the end, since the
+    percentiles over the ensemble can't be combined from percentiles of each
+    chunk. Its memory grows with timebounds x scenarios x configs, e.g. about
+    3 MB for 81 years, 5 scenarios and 1001 configs, which is small next to
+    a single FaIR run of a chunk.
+    """
+    parameters = pd.read_csv(ensemble_path, index_col=0)
+
+    # Columns that aren't mapped to a config would silently be left at the
+    # defaults, so they are rejected
+    unknown = parameters.columns.difference(
+        [
+            *[c for columns in ensemble_parameters.values() for c in columns],
+            *ensemble_species_parameters.values(),
+            *ensemble_unused,
+        ]
+    )
+    if len(unknown) > 0:
+        raise ValueError(
+            f"Columns of {ensemble_path} with no FaIR config: {list(unknown)}"
+        )
+
+    temperature = []
+    for start in range(0, len(parameters), ensemble_chunksize):
+        rows = parameters.iloc[start : start + ensemble_chunksize]
+        configs = {
+            str(config): {
+                **{
+                    name: (
+                        row[columns].tolist()
+                        if len(columns) > 1
+                        else row[columns[0]]
+                    )
+                    for name, columns in ensemble_parameters.items()
+                    if set(columns).issubset(row.index)
+                },
+                "stochastic_run": "seed" in row.index,
+                "use_seed": "seed" in row.index,
+            }
+            for config, row in rows.iterrows()
+        }
+        species_configs = {
+            str(config): {
+                key: row[column]
+                for key, column in ensemble_species_parameters.items()
+                if column in row.index
+            }
+            for config, row in rows.iterrows()
+        }
+
+        f = run_fair(
+            emissions_output_fair,
+            configs,
+            initial_concentration,
+            data_end_year,
+            proj_end_year,
+            species_configs,
+        )
+
+        temperature.append(
+            f.temperature.sel(layer=0)
+            .transpose("timebounds", "scenario", "config")
+            .to_numpy()
+        )
+
+    return np.concatenate(temperature, axis=2), f.timebounds, f.scenarios
+
 
 def climate(
     model,
@@ -17,7 +357,18 @@ def climate(
     data_start_year,
     data_end_year,
     proj_end_year,
+    climate_ensemble=False,
 ):
+    # The parameter ensemble isn't shipped, so check for it before the other
+    # runs rather than after them
+    if climate_ensemble and not os.path.exists(ensemble_path):
+        raise FileNotFoundError(
+            f"{ensemble_path} not found. Download the calibrated, constrained "
+            "parameter set (calibrated_constrained_parameters.csv) of the "
+            "fair-calibrate release for the installed version of FaIR, and "
+            f"save it as {ensemble_path}, or set climate_ensemble to False"
+        )
+
     ########################
     # LOAD HISTORICAL DATA #
     ########################
@@ -207,17 +558,8 @@ def climate(
     ].sort_index()
 
     # Convert units from emissions_output to assumed units for FAIR model input
-    emissions_output = emissions_output.parallel_apply(
-        lambda x: x.multiply(
-            pd.read_csv(
-                "podi/data/climate_unit_conversions.csv",
-                usecols=["value", "gas"],
-            )
-            .set_index("gas")
-            .loc[x.name[6]]
-            .values[0]
-        ),
-        axis=1,
+    emissions_output = units.convert(
+        emissions_output, units.climate_unit_conversions()
     )
 
     # endregion
@@ -228,144 +570,106 @@ def climate(
 
     # region
 
-    # Run the climate model for each scenario
-
-    climate_output_concentration = pd.DataFrame()
-    climate_output_forcing = pd.DataFrame()
-    climate_output_temperature = pd.DataFrame()
-
-    for scenario in emissions_output.reset_index().scenario.unique():
-        # Format for input into FAIR
-        emissions_output_fair = (
-            emissions_output.loc[slice(None), scenario, :]
-            .groupby(["product_short"], observed=True)
-            .sum(numeric_only=True)
-            .T.fillna(0)
-            .rename_axis("year")
-        )
+    # Run the climate model for all scenarios at once
 
-        f = FAIR()
-        f.define_time(data_end_year, proj_end_year, 1)
-        f.define_scenarios([scenario])
-        f.define_configs(["default"])
-        species, properties = read_properties()
-        species = list(
-            set(species) & set(emissions_output_fair.columns.tolist())
-        ) + list(["CO2"])
-        properties = {k: v for k, v in properties.items() if k in species}
-        f.define_species(species, properties)
-        f.ghg_method = "myhre1998"
-        f.allocate()
-
-        # Fill emissions with emissions from Emissions module
-        for config in f.configs:
-            for specie in list(
-                (
-                    pd.DataFrame(f.species)[
-                        ~pd.DataFrame(f.species).isin(["CO2"])
-                    ].dropna()
-                )[0]
-            ):
-                fill(
-                    f.emissions,
-                    emissions_output_fair.loc[int(data_end_year + 1) :][
-                        specie
-                    ].values,
-                    scenario=scenario,
-                    config=config,
-                    specie=specie,
-                )
-
-        # Define first timestep
-
-        initialise(
-            f.concentration,
-            climate_historical_concentration["CO2"].loc[data_end_year],
-            specie="CO2",
-        )
-        initialise(
-            f.concentration,
-            climate_historical_concentration["CH4"].loc[data_end_year],
-            specie="CH4",
-        )
-        initialise(
-            f.concentration,
-            climate_historical_concentration["N2O"].loc[data_end_year],
-            specie="N2O",
-        )
-        initialise(f.temperature, 1.14)
+    # Format for input into FAIR
+    emissions_output_fair = (
+        emissions_output.groupby(["scenario", "product_short"], observed=True)
+        .sum(numeric_only=True)
+        .fillna(0)
+    )
 
-        # Fill climate configs
-        fill(
-            f.climate_configs["ocean_heat_transfer"],
-            [0.6, 1.3, 1.0],
-            config="default",
-        )
-        fill(
-            f.climate_configs["ocean_heat_capacity"],
-            [5, 15, 80],
-            config="default",
-        )
-        fill(f.climate_configs["deep_ocean_efficacy"], 1.29, config="default")
+    f = run_fair(
+        emissions_output_fair,
+        climate_configs,
+        climate_historical_concentration.loc[data_end_year],
+        data_end_year,
+        proj_end_year,
+    )
 
-        # Fill species configs with default values
-        FAIR.fill_species_configs(f)
+    # Write to DataFrame
+    climate_output_concentration = (
+        f.concentration.to_dataframe(name="Concentration")
+        .unstack(level=0)
+        .droplevel(level=0, axis=1)
+    )
+    climate_output_concentration.columns = (
+        climate_output_concentration.columns.astype(int)
+    )
+    climate_output_concentration.columns.name = None
+    climate_output_concentration.index.set_names(
+        "product_long", level=2, inplace=True
+    )
 
-        # Run
-        f.run()
+    climate_output_forcing = (
+        f.forcing.to_dataframe(name="Forcing")
+        .unstack(level=0)
+        .droplevel(level=0, axis=1)
+    )
+    climate_output_forcing.columns = climate_output_forcing.columns.astype(int)
+    climate_output_forcing.columns.name = None
+    climate_output_forcing.index.set_names(
+        "product_long", level=2, inplace=True
+    )
 
-        # Write to DataFrame
-        climate_output_concentration_temp = (
-            f.concentration.to_dataframe(name="Concentration")
-            .unstack(level=0)
-            .droplevel(level=0, axis=1)
-        )
-        climate_output_concentration_temp.columns = (
-            climate_output_concentration_temp.columns.astype(int)
-        )
-        climate_output_concentration_temp.columns.name = None
-        climate_output_concentration_temp.index.set_names(
-            "product_long", level=2, inplace=True
-        )
+    climate_output_temperature = (
+        f.temperature.to_dataframe(name="Temperature")
+        .unstack(level=0)
+        .droplevel(level=0, axis=1)
+    )
+    climate_output_temperature.columns = (
+        climate_output_temperature.columns.astype(int)
+    )
+    climate_output_temperature.columns.name = None
+    climate_output_temperature = climate_output_temperature[
+        (climate_output_temperature.reset_index().layer == 0).values
+    ]
+    climate_output_temperature.index.set_names(
+        "product_long", level=2, inplace=True
+    )
 
-        climate_output_forcing_temp = (
-            f.forcing.to_dataframe(name="Forcing")
-            .unstack(level=0)
-            .droplevel(level=0, axis=1)
-        )
-        climate_output_forcing_temp.columns = (
-            climate_output_forcing_temp.columns.astype(int)
-        )
-        climate_output_forcing_temp.columns.name = None
-        climate_output_forcing_temp.index.set_names(
-            "product_long", level=2, inplace=True
+    # Run the calibrated parameter ensemble, and reduce its temperature to
+    # percentiles per scenario and year. As for climate_output_temperature,
+    # each run is shifted to start from the last historical temperature.
+    if climate_ensemble:
+        temperature, timebounds, scenarios = run_ensemble(
+            emissions_output_fair,
+            climate_historical_concentration.loc[data_end_year],
+            data_end_year,
+            proj_end_year,
         )
 
-        climate_output_temperature_temp = (
-            f.temperature.to_dataframe(name="Temperature")
-            .unstack(level=0)
-            .droplevel(level=0, axis=1)
-        )
-        climate_output_temperature_temp.columns = (
-            climate_output_temperature_temp.columns.astype(int)
-        )
-        climate_output_temperature_temp.columns.name = None
-        climate_output_temperature_temp = climate_output_temperature_temp[
-            (climate_output_temperature_temp.reset_index().layer == 0).values
-        ]
-        climate_output_temperature_temp.index.set_names(
-            "product_long", level=2, inplace=True
+        temperature = temperature[timebounds >= data_end_year + 3] + abs(
+            climate_historical_temperature["All"].iloc[-1]
+            - temperature[timebounds == data_end_year + 2]
         )
 
-        climate_output_concentration = pd.concat(
-            [climate_output_concentration_temp, climate_output_concentration]
-        )
-        climate_output_forcing = pd.concat(
-            [climate_output_forcing_temp, climate_output_forcing]
-        )
-        climate_output_temperature = pd.concat(
-            [climate_output_temperature_temp, climate_output_temperature]
-        )
+        climate_output_temperature_ensemble = pd.DataFrame(
+            np.percentile(temperature, ensemble_percentiles, axis=2)
+            .transpose(2, 0, 1)
+            .reshape(-1, temperature.shape[0]),
+            index=pd.MultiIndex.from_product(
+                [
+                    ["PD22"],
+                    scenarios,
+                    ["world"],
+                    ["Temperature change"],
+                    ["All"],
+                    ["C"],
+                    ensemble_percentiles,
+                ],
+                names=[
+                    "model",
+                    "scenario",
+                    "region",
+                    "variable",
+                    "gas",
+                    "unit",
+                    "percentile",
+                ],
+            ),
+            columns=timebounds[timebounds >= data_end_year + 3].astype(int),
+        ).astype("float32")
 
     # Create version of climate_output_concentration with units CO2e
     # region
@@ -378,152 +682,84 @@ def climate(
     )
 
     # Convert units from emissions_output_co2e_fair to assumed units for FAIR model input
-    emissions_output_co2e_fair = emissions_output_co2e_fair.parallel_apply(
-        lambda x: x.multiply(
-            pd.read_csv(
-                "podi/data/climate_unit_conversions.csv",
-                usecols=["value", "gas"],
-            )
-            .set_index("gas")
-            .loc[x.name[6]]
-            .values[0]
-        ),
-        axis=1,
+    emissions_output_co2e_fair = units.convert(
+        emissions_output_co2e_fair, units.climate_unit_conversions()
     )
 
-    # Convert units from emissions_output to assumed units for FAIR model input
-    emissions_output_co2e_fair = emissions_output_co2e_fair.groupby(
-        ["model", "scenario", "product_short"], observed=True
-    ).sum(numeric_only=True)
-
-    climate_output_concentration_co2e = pd.DataFrame()
-    climate_output_forcing_co2e = pd.DataFrame()
-
-    for scenario in emissions_output_co2e_fair.reset_index().scenario.unique():
-        # Format for input into FAIR
-        emissions_output_co2e_fair2 = (
-            emissions_output_co2e_fair.loc[slice(None), scenario, :]
-            .groupby(["product_short"], observed=True)
-            .sum(numeric_only=True)
-            .T.fillna(0)
-            .rename_axis("year")
+    # Format for input into FAIR
+    emissions_output_co2e_fair = (
+        emissions_output_co2e_fair.groupby(
+            ["scenario", "product_short"], observed=True
         )
+        .sum(numeric_only=True)
+        .fillna(0)
+    )
 
-        f = FAIR()
-        f.define_time(data_end_year, proj_end_year, 1)
-        f.define_scenarios([scenario])
-        f.define_configs(["high", "central", "low"])
-        species = list(["CO2"])
-        properties = {
-            "CO2": {
-                "type": "co2",
-                "input_mode": "emissions",
-                "greenhouse_gas": True,
-                "aerosol_chemistry_from_emissions": False,
-                "aerosol_chemistry_from_concentration": False,
-            }
+    f = FAIR()
+    f.define_time(data_end_year, proj_end_year, 1)
+    f.define_scenarios(
+        emissions_output_co2e_fair.index.unique(level="scenario").tolist()
+    )
+    f.define_configs(list(climate_configs_co2e))
+    species = list(["CO2"])
+    properties = {
+        "CO2": {
+            "type": "co2",
+            "input_mode": "emissions",
+            "greenhouse_gas": True,
+            "aerosol_chemistry_from_emissions": False,
+            "aerosol_chemistry_from_concentration": False,
         }
-        f.define_species(species, properties)
-        f.ghg_method = "leach2021"
-        f.ch4_method = "leach2021"
-        f.allocate()
-
-        # Fill emissions with emissions from Emissions module
-        for config in f.configs:
-            for specie in list(["CO2"]):
-                fill(
-                    f.emissions,
-                    emissions_output_co2e_fair2.loc[int(data_end_year + 1) :][
-                        specie
-                    ].values,
-                    scenario=scenario,
-                    config=config,
-                    specie=specie,
-                )
+    }
+    f.define_species(species, properties)
+    f.ghg_method = "leach2021"
+    f.ch4_method = "leach2021"
+    f.allocate()
 
-        # Define first timestep
-        initialise(f.forcing, 0)
-        initialise(f.temperature, 0)
-        initialise(f.cumulative_emissions, 0)
-        initialise(f.airborne_emissions, 0)
-
-        # Fill climate configs
-        fill(
-            f.climate_configs["ocean_heat_transfer"],
-            [0.6, 1.3, 1.0],
-            config="high",
-        )
-        fill(
-            f.climate_configs["ocean_heat_capacity"],
-            [5, 15, 80],
-            config="high",
-        )
-        fill(f.climate_configs["deep_ocean_efficacy"], 1.29, config="high")
+    # Fill emissions with emissions from Emissions module
+    fill_emissions(f, emissions_output_co2e_fair, ["CO2"], data_end_year)
 
-        fill(
-            f.climate_configs["ocean_heat_transfer"],
-            [1.1, 1.6, 0.9],
-            config="central",
-        )
-        fill(
-            f.climate_configs["ocean_heat_capacity"],
-            [8, 14, 100],
-            config="central",
-        )
-        fill(f.climate_configs["deep_ocean_efficacy"], 1.1, config="central")
-
-        fill(
-            f.climate_configs["ocean_heat_transfer"],
-            [1.7, 2.0, 1.1],
-            config="low",
-        )
-        fill(
-            f.climate_configs["ocean_heat_capacity"], [6, 11, 75], config="low"
-        )
-        fill(f.climate_configs["deep_ocean_efficacy"], 0.8, config="low")
+    # Define first timestep
+    initialise(f.forcing, 0)
+    initialise(f.temperature, 0)
+    initialise(f.cumulative_emissions, 0)
+    initialise(f.airborne_emissions, 0)
 
-        # Fill species configs with default values
-        FAIR.fill_species_configs(f)
+    # Fill climate configs
+    fill_climate_configs(f, climate_configs_co2e)
 
-        # Run
-        f.run()
+    # Fill species configs with default values
+    FAIR.fill_species_configs(f)
 
-        # Write to DataFrame
-        climate_output_concentration_co2e_temp = (
-            f.concentration.to_dataframe(name="Concentration")
-            .unstack(level=0)
-            .droplevel(level=0, axis=1)
-        )
-        climate_output_concentration_co2e_temp.columns = (
-            climate_output_concentration_co2e_temp.columns.astype(int)
-        )
-        climate_output_concentration_co2e_temp.columns.name = None
-        climate_output_concentration_co2e_temp.index.set_names(
-            "product_long", level=2, inplace=True
-        )
+    # Run
+    f.run()
 
-        climate_output_forcing_co2e_temp = (
-            f.forcing.to_dataframe(name="Forcing")
-            .unstack(level=0)
-            .droplevel(level=0, axis=1)
-        )
-        climate_output_forcing_co2e_temp.columns = (
-            climate_output_forcing_co2e_temp.columns.astype(int)
-        )
-        climate_output_forcing_co2e_temp.columns.name = None
-        climate_output_forcing_co2e_temp.index.set_names(
-            "product_long", level=2, inplace=True
-        )
+    # Write to DataFrame
+    climate_output_concentration_co2e = (
+        f.concentration.to_dataframe(name="Concentration")
+        .unstack(level=0)
+        .droplevel(level=0, axis=1)
+    )
+    climate_output_concentration_co2e.columns = (
+        climate_output_concentration_co2e.columns.astype(int)
+    )
+    climate_output_concentration_co2e.columns.name = None
+    climate_output_concentration_co2e.index.set_names(
+        "product_long", level=2, inplace=True
+    )
 
-        climate_output_concentration_co2e = pd.concat(
-            [
-                climate_output_concentration_co2e_temp,
-                climate_output_concentration_co2e,
-            ]
-        )
-        climate_output_forcing_co2e = pd.concat(
-            [climate_output_forcing_co2e_temp, climate_output_forcing_co2e]
-        )
+    climate_output_forcing_co2e = (
+        f.forcing.to_dataframe(name="Forcing")
+        .unstack(level=0)
+        .droplevel(level=0, axis=1)
+    )
+    climate_output_forcing_co2e.columns = (
+        climate_output_forcing_co2e.columns.astype(int)
+    )
+    climate_output_forcing_co2e.columns.name = None
+    climate_output_forcing_co2e.index.set_names(
+        "product_long", level=2, inplace=True
+    )
 
     # endregion
 
@@ -815,12 +1051,35 @@ def climate(
             "climate_output_concentration_co2e",
         ),
         (climate_output_forcing_co2e, "climate_output_forcing_co2e"),
-    ]:
+    ] + (
+        [
+            (
+                climate_output_temperature_ensemble,
+                "climate_output_temperature_ensemble",
+            )
+        ]
+        if climate_ensemble
+        else []
+    ):
         output[0].columns = output[0].columns.astype(str)
         output[0].to_parquet(
             "podi/data/" + output[1] + ".parquet", compression="brotli"
         )
+        output[0].columns = output[0].columns.astype(int)
 
     # endregion
 
-    return
+    outputs = {
+        "climate_output_concentration": climate_output_concentration,
+        "climate_output_forcing": climate_output_forcing,
+        "climate_output_temperature": climate_output_temperature,
+        "climate_output_concentration_co2e": climate_output_concentration_co2e,
+        "climate_output_forcing_co2e": climate_output_forcing_co2e,
+    }
+
+    if climate_ensemble:
+        outputs[
+            "climate_output_temperature_ensemble"
+        ] = climate_output_temperature_ensemble
+
+    return outputs
@@ -0,0 +1,154 @@
+# region
+
+import numpy as np
+import pandas as pd
+
+# endregion
+
+# A compact representation of the timeseries frames passed between stages: each
+# index level is stored as integer codes into a table of its labels, and the
+# values as a dense matrix of the frame's dtype. Masks and group sums work on
+# the codes, so they don't need reset_index() or rebuilding the full index of
+# strings.
+
+
+class CodedFrame:
+    """
+    Rows of timeseries with integer-coded index levels. levels maps each
+    index level name to an Index of its labels, codes maps it to an array
+    with the position of each row's label in levels (-1 for NaN), and values
+    is an array of the timeseries, with a column for each of columns.
+    """
+
+    def __init__(self, levels, codes, values, columns):
+        self.levels = levels
+        self.codes = codes
+        self.values = values
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, df):
+        levels = {}
+        codes = {}
+        for name, level, level_codes in zip(
+            df.index.names, df.index.levels, df.index.codes
+        ):
+            levels[name] = level
+            codes[name] = np.asarray(level_codes)
+
+        return cls(levels, codes, df.to_numpy(), df.columns.copy())
+
+    def to_frame(self):
+        return pd.DataFrame(
+            self.values,
+            index=pd.MultiIndex(
+                levels=list(self.levels.values()),
+                codes=list(self.codes.values()),
+                names=self.names,
+                verify_integrity=False,
+            ),
+            columns=self.columns,
+        )
+
+    @property
+    def names(self):
+        return list(self.levels)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, mask):
+        return CodedFrame(
+            self.levels,
+            {name: codes[mask] for name, codes in self.codes.items()},
+            self.values[mask],
+            self.columns,
+        )
+
+    def isin(self, level, labels):
+        """
+        Return a boolean mask of the rows whose label of level is in labels.
+        """
+        positions = self.levels[level].get_indexer(labels)
+
+        return np.isin(self.codes[level], positions[positions >= 0])
+
+    def rename(self, level, mapping):
+        """
+        Relabel level with mapping, a dict of old to new labels. Rows whose
+        labels are merged by the mapping get the same code.
+        """
+        labels = self.levels[level].map(lambda x: mapping.get(x, x))
+        new_level = labels.unique().sort_values()
+
+        remap = np.append(new_level.get_indexer(labels), -1)
+
+        return CodedFrame(
+            {**self.levels, level: new_level},
+            {**self.codes, level: remap[self.codes[level]]},
+            self.values,
+            self.columns,
+        )
+
+    def groupby_sum(self, levels=None):
+        """
+        Sum the rows that have the same labels of levels (all levels by
+        default), ordered by their codes. NaN labels are a group of their
+        own. As in pandas, NaN values are skipped, so a group of all NaN
+        sums to 0.
+        """
+        levels = self.names if levels is None else list(levels)
+
+        # Find the groups as the unique rows of codes, which are sorted
+        groups, inverse = np.unique(
+            np.stack([self.codes[name] for name in levels], axis=1),
+            axis=0,
+            return_inverse=True,
+        )
+
+        # Sum the values of each group, with the rows ordered by group
+        order = np.argsort(inverse.ravel(), kind="stable")
+        starts = np.searchsorted(
+            inverse.ravel()[order], np.arange(len(groups))
+        )
+        values = (
+            np.add.reduceat(np.nan_to_num(self.values[order]), starts, axis=0)
+            if len(self) > 0
+            else self.values[:0]
+        )
+
+        return CodedFrame(
+            {name: self.levels[name] for name in levels},
+            {name: groups[:, i] for i, name in enumerate(levels)},
+            values,
+            self.columns,
+        )
+
+
+def concat(frames):
+    """
+    Stack CodedFrames with the same index level names and columns, merging
+    the label tables of each level.
+    """
+    levels = {}
+    codes = {}
+    for name in frames[0].names:
+        levels[name] = frames[0].levels[name]
+        for frame in frames[1:]:
+            levels[name] = levels[name].append(frame.levels[name]).unique()
+
+        codes[name] = np.concatenate(
+            [
+                np.append(levels[name].get_indexer(frame.levels[name]), -1)[
+                    frame.codes[name]
+                ]
+                for frame in frames
+            ]
+        )
+
+    return CodedFrame(
+        levels,
+        codes,
+        np.concatenate([frame.values for frame in frames]),
+        frames[0].columns,
+    )
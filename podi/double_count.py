@@ -0,0 +1,67 @@
+# region
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from podi import tagging, units
+
+# endregion
+
+# Remove emissions that are counted in more than one dataset (e.g. CO2 from
+# fuel combustion, which is in both CEDS and the energy module) with a mask
+# computed from the index once. Rows are matched to the dataset that already
+# counts them by a rule set of podi.tagging keyed on 'flow|gas', and what is
+# removed is reported in MtCO2e, so that it can be audited.
+
+
+def gas(index, level):
+    # Return the gas of each row of index, which is the value of level without
+    # qualifiers in parentheses, e.g. 'CO2' for 'CO2 (additional emissions)'
+    return tagging.on_unique(
+        index.get_level_values(level),
+        lambda x: x.str.replace(r"\s\(.*?\)", "", regex=True),
+    )
+
+
+def counted_in(index, rules, flow_level="flow_long", gas_level="product_long"):
+    """
+    Return the dataset that already counts each row of index, by the rule set
+    rules, as an array that is None for rows that aren't double counted.
+    """
+    return tagging.tag(
+        rules, index.get_level_values(flow_level), gas(index, gas_level)
+    )
+
+
+def remove(
+    df, rules, version, flow_level="flow_long", gas_level="product_long"
+):
+    """
+    Zero the rows of df, emissions in Mt of each gas, that are counted in
+    another dataset by the rule set rules. Returns df and a report of the
+    emissions removed from each flow and gas, in MtCO2e with the GWP values
+    of version, by year and the dataset that counts them.
+    """
+    counted = counted_in(df.index, rules, flow_level, gas_level)
+    zero = ~pd.isna(counted)
+
+    removed = units.convert(
+        df[zero],
+        units.gwp_factors(version),
+        level=gas_level,
+        keys=lambda x: re.sub(r"\s\(.*?\)", "", x),
+    )
+    groups = removed.groupby(
+        [
+            counted[zero],
+            removed.index.get_level_values(flow_level),
+            gas(removed.index, gas_level),
+        ]
+    )
+    report = groups.sum()
+    report.insert(0, "rows", groups.size())
+    report.index.names = ["counted_in", flow_level, "gas"]
+
+    return df.multiply(np.where(zero, 0, 1), axis=0), report
@@ -3,15 +3,22 @@
 import os
 import re
 
-import globalwarmingpotentials as gwp
 import numpy as np
 import pandas as pd
 import pyam
 from numpy import NaN
-from pandarallel import pandarallel
-from scipy.optimize import differential_evolution
 
-pandarallel.initialize(progress_bar=True)
+from podi import (
+    adoption,
+    broadcast,
+    double_count,
+    emissions_factors,
+    executor,
+    piecewise,
+    projection,
+    tagging,
+    units,
+)
 
 # endregion
 
@@ -39,55 +46,18 @@ def emissions(
     # produced on-site in Buildings/Industry is zero emissions since those emissions
     # are attributed to the Industrial sector.
 
-    # Load new df with index matching energy_output
-    emissions_factors = pd.DataFrame(
-        index=energy_output[
+    # Multiply energy by emission factors to get emissions estimates. Emission
+    # factors decrease by 1% per year from data_start_year to proj_end_year
+    # (see podi.emissions_factors.decay). Note that emission factors for
+    # non-energy use flows are set to 0
+    emissions_energy = emissions_factors.emissions(
+        energy_output[
             ~(
                 energy_output.reset_index().flow_category == "Non-energy use"
             ).values
-        ].index,
-        columns=energy_output.columns,
-    ).fillna(0)
-
-    # Load EFDB emissions factors to fill into emissions_factors df
-    emissions_factors_efdb = pd.read_csv(
-        "podi/data/external/emissions_factors_efdb.csv",
-        usecols=["product_long", "value"],
-    )
-
-    emissions_factors = emissions_factors.parallel_apply(
-        lambda x: x.add(
-            emissions_factors_efdb[
-                emissions_factors_efdb["product_long"] == x.name[5]
-            ].squeeze()["value"]
-        ),
-        axis=1,
-    )
-
-    # Have emissions factors decrease by 1% per year from data_end_year to proj_end_year
-    emissions_factors = emissions_factors.parallel_apply(
-        lambda x: x.subtract(
-            pd.Series(
-                (x[x.first_valid_index()] * 0.01)
-                * (
-                    np.arange(data_start_year, proj_end_year + 1)
-                    - data_start_year
-                ),
-                index=x.index,
-            ).rename(x.name)
-        ).clip(lower=0),
-        axis=1,
-    )
-
-    # Multiply energy by emission factors to get emissions estimates. Note that
-    # emission factors for non-energy use flows are set to 0
-    emissions_energy = energy_output[
-        ~(energy_output.reset_index().flow_category == "Non-energy use").values
-    ].parallel_apply(
-        lambda x: x.multiply(emissions_factors.loc[x.name])
-        .fillna(0)
-        .squeeze(),
-        axis=1,
+        ],
+        emissions_factors.load_efdb(),
+        data_start_year,
     )
 
     emissions_energy.index = emissions_energy.index.set_levels(
@@ -130,133 +100,12 @@ def emissions(
     # of each subvertical
     # region
 
-    # Define a function that takes piecewise functions as input and outputs a
-    # continuous timeseries (this is used for input data provided for (1) maximum
-    # extent, and (2) average mitigation potential flux)
-    def piecewise_to_continuous(variable):
-        # Load the 'Input Data' tab of TNC's 'Positive Disruption NCS Vectors'
-        # google spreadsheet
-        name = (
-            pd.read_csv("podi/data/TNC/flux.csv")
-            .drop(columns=["Region Group", "Region"])
-            .rename(
-                columns={
-                    "ISO": "region",
-                    "Model": "model",
-                    "Scenario": "scenario",
-                    "Unit": "unit",
-                }
-            )
-            .replace("Pathway", scenario)
-        )
-
-        # Create a 'variable' column that concatenates the 'Subvertical' and
-        # 'Metric' columns
-        name["variable"] = name.parallel_apply(
-            lambda x: "|".join([x["Subvertical"], x["Metric"]]), axis=1
-        )
-        name.drop(columns=["Subvertical", "Metric"], inplace=True)
-
-        # Filter for rows that have 'variable' (either 'Max extent' or 'Avg
-        # mitigation potential flux')
-        name = name[name["variable"].str.contains(variable)]
-
-        # If Value 1 is 'NA', set to 0
-        name["Value 1"] = np.where(name["Value 1"].isna(), 0, name["Value 1"])
-
-        # If Value 2 is 'NA', set to Value 1
-        name["Value 2"] = np.where(
-            name["Value 2"].isna(), name["Value 1"], name["Value 2"]
-        )
-
-        # If Value 3 is 'NA', set to Value 2
-        name["Value 3"] = np.where(
-            name["Value 3"].isna(), name["Value 2"], name["Value 3"]
-        )
-
-        # If Duration 1 is 'NA' or longer than proj_end_year -
-        # afolu_output.columns[0], set to proj_end_year - afolu_output.columns[0]
-        name["Duration 1 (Years)"] = np.where(
-            (
-                (name["Duration 1 (Years)"].isna())
-                | (
-                    name["Duration 1 (Years)"]
-                    > proj_end_year - int(afolu_output.columns[0])
-                )
-            ),
-            proj_end_year - int(afolu_output.columns[0]),
-            name["Duration 1 (Years)"],
-        )
-
-        # If Duration 2 is 'NA', set to Duration 1
-        name["Duration 2 (Years)"] = np.where(
-            (name["Duration 2 (Years)"].isna()),
-            name["Duration 1 (Years)"],
-            name["Duration 2 (Years)"],
-        )
-
-        # If Duration 3 is 'NA', set to Duration 2
-        name["Duration 3 (Years)"] = np.where(
-            (name["Duration 3 (Years)"].isna()),
-            name["Duration 2 (Years)"],
-            name["Duration 3 (Years)"],
-        )
-
-        # Create dataframe with timeseries columns
-        name = pd.DataFrame(
-            index=[
-                name["model"],
-                name["scenario"],
-                name["region"],
-                name["variable"],
-                name["unit"],
-                name["Value 1"],
-                name["Duration 1 (Years)"],
-                name["Value 2"],
-                name["Duration 2 (Years)"],
-                name["Value 3"],
-                name["Duration 3 (Years)"],
-            ],
-            columns=np.arange(
-                int(afolu_output.columns[0]), proj_end_year + 1, 1
-            ),
-            dtype=float,
-        )
-
-        # Define a function that places values in each timeseries for the
-        # durations specified, and interpolates
-        def rep(x):
-            x0 = x
-            x0.loc[int(afolu_output.columns[0])] = x.name[5]
-            x0.loc[int(afolu_output.columns[0]) + x.name[6]] = x.name[7]
-            x0.loc[
-                min(
-                    int(afolu_output.columns[0]) + x.name[6] + x.name[8],
-                    proj_end_year - int(afolu_output.columns[0]),
-                )
-            ] = x.name[9]
-            x0.interpolate(axis=0, limit_area="inside", inplace=True)
-            x.update(x0)
-            return x
-
-        name.update(name.parallel_apply(rep, axis=1))
-
-        # Drop 'Value' and 'Duration' columns now that the timeseries have been created
-        name = name.droplevel(
-            [
-                "Value 1",
-                "Duration 1 (Years)",
-                "Value 2",
-                "Duration 2 (Years)",
-                "Value 3",
-                "Duration 3 (Years)",
-            ]
-        ).fillna(0)
-
-        return name
-
-    flux = piecewise_to_continuous(
-        "Avg mitigation potential flux"
+    flux = piecewise.continuous(
+        "podi/data/TNC/flux.csv",
+        "Avg mitigation potential flux",
+        scenario,
+        int(afolu_output.columns[0]),
+        proj_end_year,
     ).sort_index()
 
     # Define the flux of 'Avoided Coastal Impacts' and 'Avoided Forest Conversion'
@@ -297,7 +146,8 @@ def emissions(
             ]
         )
         .set_index(pyam.IAMC_IDX)
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x[flux.columns[0:]].fillna(
                 x["Mitigation (MtCO2e/ha)"], limit=1
             ),
@@ -465,45 +315,13 @@ def emissions(
     emissions_afolu["scenario"] = "baseline"
 
     # Add Sector index
-    def addsector(x):
-        if x["flow_long"] in [
-            "Enteric Fermentation",
-            "Manure Management",
-            "Rice Cultivation",
-            "Synthetic Fertilizers",
-            "Manure applied to Soils",
-            "Manure left on Pasture",
-            "Crop Residues",
-            "Burning - Crop residues",
-        ]:
-            return "Agriculture"
-        elif x["flow_long"] in [
-            "Net Forest conversion",
-            "Forestland",
-            "Savanna fires",
-            "Fires in humid tropical forests",
-            "Forest fires",
-            "Fires in organic soils",
-            "Drained organic soils (CO2)",
-            "Drained organic soils (N2O)",
-        ]:
-            return "Forests & Wetlands"
-
-    emissions_afolu["sector"] = emissions_afolu.parallel_apply(
-        lambda x: addsector(x), axis=1
+    emissions_afolu["sector"] = tagging.tag(
+        "emissions_afolu_sector", emissions_afolu["flow_long"]
     )
 
     # Split Emissions and Gas into separate columns
-    def splitgas(x):
-        if x["product_category"] in ["Emissions (CO2)"]:
-            return "CO2 (from AFOLU)"
-        elif x["product_category"] in ["Emissions (CH4)"]:
-            return "CH4 (from AFOLU)"
-        elif x["product_category"] in ["Emissions (N2O)"]:
-            return "N2O (from AFOLU)"
-
-    emissions_afolu["product_long"] = emissions_afolu.parallel_apply(
-        lambda x: splitgas(x), axis=1
+    emissions_afolu["product_long"] = tagging.tag(
+        "emissions_afolu_gas", emissions_afolu["product_category"]
     )
 
     # replace "Drained organic soils (CO2)" and "Drained organic soils (N2O)" with "Drained organic soils"
@@ -575,7 +393,8 @@ def emissions(
     emissions_afolu.fillna(method="bfill", inplace=True)
 
     # Have emissions decrease by 1% per year from data_end_year to proj_end_year
-    emissions_afolu = emissions_afolu.parallel_apply(
+    emissions_afolu = emissions_afolu.pipe(
+        executor.apply,
         lambda x: x.subtract(
             pd.Series(
                 (x[x.first_valid_index()] * 0.01)
@@ -646,9 +465,8 @@ def emissions(
         :, data_start_year + 1 : proj_end_year
     ].columns:
         # Find new adoption in year, multiply by flux and a 'baseline' copy of flux
-        emissions_afolu_mitigated_year = afolu_output.droplevel(
-            "unit"
-        ).parallel_apply(
+        emissions_afolu_mitigated_year = afolu_output.droplevel("unit").pipe(
+            executor.apply,
             lambda x: max((x.loc[year] - x.loc[year - 1]), 0)
             * (
                 pd.concat(
@@ -743,30 +561,20 @@ def emissions(
         inplace=True,
     )
 
-    # Add missing GWP values to gwp
     # Choose version of GWP values
     version = "AR6GWP100"
     # Choose from ['SARGWP100', 'AR4GWP100', 'AR5GWP100', 'AR5CCFGWP100', 'AR6GWP100',
     # 'AR6GWP20', 'AR6GWP500', 'AR6GTP100']
 
-    gwp.data[version].update(
-        {
-            "CO2": 1,
-            "BC": 500,
-            "CO": 0,
-            "NH3": 0,
-            "NMVOC": 0,
-            "NOx": 0,
-            "OC": 0,
-            "SO2": 0,
-        }
-    )
+    # Versions of GWP values for emissions_output_co2e_metrics, which has
+    # emissions_output_co2e for each of them
+    gwp_versions = ["AR6GWP100", "AR6GWP20"]
 
-    emissions_afolu_mitigated = emissions_afolu_mitigated.parallel_apply(
-        lambda x: x.divide(
-            gwp.data[version][re.sub(r"\s\(.*?\)", "", x.name[5])]
-        ),
-        axis=1,
+    emissions_afolu_mitigated = units.convert(
+        emissions_afolu_mitigated,
+        1 / units.gwp_factors(version),
+        level="product_long",
+        keys=lambda x: re.sub(r"\s\(.*?\)", "", x),
     )
 
     emissions_afolu_mitigated.reset_index(inplace=True)
@@ -926,83 +734,8 @@ def emissions(
     )
 
     # Add Sector index
-    def addsector2(x):
-        if x["flow_long"] in [
-            "1A1a_Electricity-autoproducer",
-            "1A1a_Electricity-public",
-            "1A1a_Heat-production",
-            "1A1bc_Other-transformation",
-            "1B1_Fugitive-solid-fuels",
-            "1B2_Fugitive-petr",
-            "1B2b_Fugitive-NG-distr",
-            "1B2b_Fugitive-NG-prod",
-            "1B2d_Fugitive-other-energy",
-            "7A_Fossil-fuel-fires",
-        ]:
-            return "Electric Power"
-        elif x["flow_long"] in [
-            "1A3b_Road",
-            "1A3c_Rail",
-            "1A3di_Oil_Tanker_Loading",
-            "1A3dii_Domestic-navigation",
-            "1A3eii_Other-transp",
-            "1A3ai_International-aviation",
-            "1A3aii_Domestic-aviation",
-            "1A3di_International-shipping",
-        ]:
-            return "Transportation"
-        elif x["flow_long"] in ["1A4b_Residential"]:
-            return "Residential"
-        elif x["flow_long"] in ["1A4a_Commercial-institutional"]:
-            return "Commercial"
-        elif x["flow_long"] in [
-            "1A2a_Ind-Comb-Iron-steel",
-            "1A2b_Ind-Comb-Non-ferrous-metals",
-            "1A2c_Ind-Comb-Chemicals",
-            "1A2d_Ind-Comb-Pulp-paper",
-            "1A2e_Ind-Comb-Food-tobacco",
-            "1A2f_Ind-Comb-Non-metalic-minerals",
-            "1A2g_Ind-Comb-Construction",
-            "1A2g_Ind-Comb-machinery",
-            "1A2g_Ind-Comb-mining-quarying",
-            "1A2g_Ind-Comb-other",
-            "1A2g_Ind-Comb-textile-leather",
-            "1A2g_Ind-Comb-transpequip",
-            "1A2g_Ind-Comb-wood-products",
-            "1A4c_Agriculture-forestry-fishing",
-            "1A5_Other-unspecified",
-            "2A1_Cement-production",
-            "2A2_Lime-production",
-            "2Ax_Other-minerals",
-            "2B_Chemical-industry",
-            "2B2_Chemicals-Nitric-acid",
-            "2B3_Chemicals-Adipic-acid",
-            "2C_Metal-production",
-            "2D_Chemical-products-manufacture-processing",
-            "2D_Degreasing-Cleaning",
-            "2D_Other-product-use",
-            "2D_Paint-application",
-            "2H_Pulp-and-paper-food-beverage-wood",
-            "2L_Other-process-emissions",
-            "5A_Solid-waste-disposal",
-            "5C_Waste-combustion",
-            "5D_Wastewater-handling",
-            "5E_Other-waste-handling",
-            "6A_Other-in-total",
-            "7BC_Indirect-N2O-non-agricultural-N",
-        ]:
-            return "Industrial"
-        elif x["flow_long"] in [
-            "3B_Manure-management",
-            "3D_Rice-Cultivation",
-            "3D_Soil-emissions",
-            "3E_Enteric-fermentation",
-            "3I_Agriculture-other",
-        ]:
-            return "Agriculture"
-
-    emissions_additional["sector"] = emissions_additional.parallel_apply(
-        lambda x: addsector2(x), axis=1
+    emissions_additional["sector"] = tagging.tag(
+        "ceds_sector", emissions_additional["flow_long"]
     )
 
     emissions_additional = (
@@ -1060,55 +793,12 @@ def emissions(
     emissions_additional = emissions_additional.sort_index(axis=1)
     emissions_additional.fillna(method="ffill", axis=1, inplace=True)
 
-    # Drop double counted emissions
-    def remove_doublecount(x):
-        # Drop CO2 that was already estimated in energy module
-        if x.name[6] in [
-            "1A1a_Electricity-autoproducer",
-            "1A1a_Electricity-public",
-            "1A1a_Heat-production",
-            "1A1bc_Other-transformation",
-            "1A2a_Ind-Comb-Iron-steel",
-            "1A2b_Ind-Comb-Non-ferrous-metals",
-            "1A2c_Ind-Comb-Chemicals",
-            "1A2d_Ind-Comb-Pulp-paper",
-            "1A2e_Ind-Comb-Food-tobacco",
-            "1A2f_Ind-Comb-Non-metalic-minerals",
-            "1A2g_Ind-Comb-Construction",
-            "1A2g_Ind-Comb-machinery",
-            "1A2g_Ind-Comb-mining-quarying",
-            "1A2g_Ind-Comb-other",
-            "1A2g_Ind-Comb-textile-leather",
-            "1A2g_Ind-Comb-transpequip",
-            "1A2g_Ind-Comb-wood-products",
-            "1A3b_Road",
-            "1A3c_Rail",
-            "1A3aii_Domestic-aviation",
-            "1A3dii_Domestic-navigation",
-            "1A3eii_Other-transp",
-            "1A3ai_International-aviation",
-            "1A3di_International-shipping",
-            "1A4a_Commercial-institutional",
-            "1A4b_Residential",
-            "1A4c_Agriculture-forestry-fishing",
-            "1A5_Other-unspecified",
-        ] and re.sub(r"\s\(.*?\)", "", x.name[4]) in ["CO2"]:
-            x = x.multiply(0)
-
-        # Drop CO2, CH4, N2O that was already estimated in FAO historical data
-        if x.name[6] in [
-            "3B_Manure-management",
-            "3D_Rice-Cultivation",
-            "3D_Soil-emissions",
-            "3E_Enteric-fermentation",
-            "3I_Agriculture-other",
-        ] and re.sub(r"\s\(.*?\)", "", x.name[4]) in ["CO2", "CH4", "N2O"]:
-            x = x.multiply(0)
-
-        return x
-
-    emissions_additional = emissions_additional.parallel_apply(
-        lambda x: remove_doublecount(x), axis=1
+    # Drop double counted emissions: CO2 that was already estimated in the energy
+    # module, and CO2, CH4, N2O that was already estimated in FAO historical data.
+    # Keep a report of the emissions removed, in MtCO2e, which is saved with
+    # the outputs.
+    emissions_additional, double_count_report = double_count.remove(
+        emissions_additional, "ceds_double_count", version
     )
 
     # Get F-Gas data (Difference between EDGAR and FAIR: No HFC-41 or HFC-143, HFC-43-10-mee is HFC-4310mee)
@@ -1194,20 +884,8 @@ def emissions(
     emissions_additional_fgas["scenario"] = "baseline"
 
     # Add Sector index
-    def addsector3(x):
-        if x["flow_long"] in [
-            "Metal Industry",
-            "Other Product Manufacture and Use",
-            "Electronics Industry",
-            "Chemical Industry",
-            "Product Uses as Substitutes for Ozone Depleting Substances",
-        ]:
-            return "Industrial"
-
-    emissions_additional_fgas[
-        "sector"
-    ] = emissions_additional_fgas.parallel_apply(
-        lambda x: addsector3(x), axis=1
+    emissions_additional_fgas["sector"] = tagging.tag(
+        "edgar_sector", emissions_additional_fgas["flow_long"]
     )
 
     emissions_additional_fgas["flow_category"] = "Additional F-Gas Emissions"
@@ -1296,7 +974,8 @@ def emissions(
     )
 
     percent_change.update(
-        percent_change.parallel_apply(
+        percent_change.pipe(
+            executor.apply,
             lambda x: x.clip(
                 upper=percent_change.loc[x.name[0], "baseline", x.name[2]]
                 .squeeze()
@@ -1322,12 +1001,10 @@ def emissions(
         )
     )
 
-    emissions_additional.loc[
-        :, emissions_additional_last_valid_index:
-    ] = emissions_additional.loc[
-        :, emissions_additional_last_valid_index:
-    ].cumprod(
-        axis=1
+    emissions_additional = projection.project(
+        emissions_additional,
+        "cumprod",
+        start=emissions_additional_last_valid_index,
     )
 
     # Rename flow_long values
@@ -1585,7 +1262,8 @@ def emissions(
                 == "Road Transport"
             ).values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -1610,7 +1288,8 @@ def emissions(
                 == "Road Transport"
             ).values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -1631,7 +1310,8 @@ def emissions(
                 == "Road Transport"
             ).values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -1652,7 +1332,8 @@ def emissions(
                 == "Road Transport"
             ).values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -1690,7 +1371,8 @@ def emissions(
                 == "Rail Transport"
             ).values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -1711,7 +1393,8 @@ def emissions(
                 == "Rail Transport"
             ).values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -1769,1039 +1452,155 @@ def emissions(
         ].clip(lower=0)
     )
 
-    # Group modeled emissions into CO2e
+    # Group modeled emissions into CO2e. GWP values are applied after the
+    # reductions below, which scale emissions the same way for all versions.
     emissions_output_co2e = emissions_output.copy()
 
-    # Change gas names to match naming in gwp library
-    emissions_output_co2e = emissions_output_co2e.rename(
-        index={
-            "HCFC-141b": "HCFC141b",
-            "HCFC-142b": "HCFC142b",
-            "HFC-125": "HFC125",
-            "HFC-134a": "HFC134a",
-            "HFC-143a": "HFC143a",
-            "HFC-152a": "HFC152a",
-            "HFC-227ea": "HFC227ea",
-            "HFC-245fa": "HFC245fa",
-            "HFC-32": "HFC32",
-            "HFC-365mfc": "HFC365mfc",
-            "HFC-23": "HFC23",
-            "c-C4F8": "cC4F8",
-            "HFC-134": "HFC134",
-            "HFC-143": "HFC143",
-            "HFC-236fa": "HFC236fa",
-            "HFC-41": "HFC41",
-            "HFC-43-10-mee": "HFC4310mee",
-        }
-    )
-
-    emissions_output_co2e = emissions_output_co2e.parallel_apply(
-        lambda x: x.mul(gwp.data[version][x.name[6]]), axis=1
-    )
-
-    # Change back gas names to match original
-    emissions_output_co2e = emissions_output_co2e.rename(
-        index={
-            "HCFC141b": "HCFC-141b",
-            "HCFC142b": "HCFC-142b",
-            "HFC125": "HFC-125",
-            "HFC134a": "HFC-134a",
-            "HFC143a": "HFC-143a",
-            "HFC152a": "HFC-152a",
-            "HFC227ea": "HFC-227ea",
-            "HFC245fa": "HFC-245fa",
-            "HFC32": "HFC-32",
-            "HFC365mfc": "HFC-365mfc",
-            "HFC23": "HFC-23",
-            "cC4F8": "c-C4F8",
-            "HFC134": "HFC-134",
-            "HFC143": "HFC-143",
-            "HFC236fa": "HFC-236fa",
-            "HFC41": "HFC-41",
-            "HFC43-10-mee": "HFC-4310mee",
-        }
-    )
-
     # endregion
 
     # endregion
 
-    #################################
-    #  REDUCE ENTERIC FERMENTATION  #
-    #################################
+    ############################################
+    #  REDUCE ENTERIC FERMENTATION AND MANURE  #
+    ############################################
 
     # region
 
-    # Calculate reduction factors that scale down enteric fermentation over time
-
-    # Load saturation points for reduction ratios
-    ef_ratio = (
-        pd.DataFrame(
-            pd.read_csv(
-                "podi/data/tech_parameters_afolu.csv",
-            )
-        )
-        .set_index(["model", "scenario", "region", "variable"])
-        .loc[
-            slice(None),
-            "pathway",
-            slice(None),
-            [
-                "Enteric Fermentation|Floor",
-                "Enteric Fermentation|Max annual growth",
-                "Enteric Fermentation|parameter a max",
-                "Enteric Fermentation|parameter a min",
-                "Enteric Fermentation|parameter b max",
-                "Enteric Fermentation|parameter b min",
-                "Enteric Fermentation|saturation point",
-            ],
-        ]
-    )
-
-    parameters = ef_ratio
-
-    ef_ratio = ef_ratio[
-        ef_ratio.index.get_level_values(3) == "Enteric Fermentation|Floor"
-    ].sort_index()
-
-    # Clear afolu_adoption_curves.csv, and run adoption_projection_demand() to
-    # calculate logistics curves for afolu reduction ratios
-
-    # Clear afolu_adoption_curves.csv and afolu_ef_ratio.csv
-    if os.path.exists("podi/data/afolu_adoption_curves.csv"):
-        os.remove("podi/data/afolu_adoption_curves.csv")
-    if os.path.exists("podi/data/afolu_ef_ratios.csv"):
-        os.remove("podi/data/afolu_ef_ratios.csv")
-
-    def adoption_projection_demand(
-        parameters,
-        input_data,
-        scenario,
-        data_end_year,
-        saturation_year,
-        proj_end_year,
-    ):
-        def linear(x, a, b, c, d):
-            return a * x + d
-
-        def logistic(x, a, b, c, d):
-            return c / (1 + np.exp(-a * (x - b))) + d
-
-        # Create x array (year) and y array (linear scale from zero to saturation value)
-        x_data = np.arange(0, proj_end_year - data_end_year + 1, 1)
-        y_data = np.zeros((1, len(x_data)))
-        y_data[:] = np.NaN
-        y_data = y_data.squeeze().astype(float)
-        y_data[0] = 0
-        y_data[saturation_year - data_end_year] = parameters.loc[
-            "Enteric Fermentation|saturation point",
-        ].values[0]
-
-        y_data = np.array((pd.DataFrame(y_data).interpolate()).squeeze())
-
-        # Load search bounds for logistic function parameters
-        search_bounds = [
-            (
-                pd.to_numeric(
-                    parameters.loc[
-                        "Enteric Fermentation|parameter a min"
-                    ].value
-                ),
-                pd.to_numeric(
-                    parameters.loc[
-                        "Enteric Fermentation|parameter a max"
-                    ].value
-                ),
-            ),
-            (
-                pd.to_numeric(
-                    parameters.loc[
-                        "Enteric Fermentation|parameter b min"
-                    ].value
-                ),
-                pd.to_numeric(
-                    parameters.loc[
-                        "Enteric Fermentation|parameter b max"
-                    ].value
-                ),
-            ),
-            (
-                pd.to_numeric(
-                    parameters.loc[
-                        "Enteric Fermentation|saturation point"
-                    ].value
-                ),
-                pd.to_numeric(
-                    parameters.loc[
-                        "Enteric Fermentation|saturation point"
-                    ].value
-                ),
-            ),
-            (
-                0,
-                0,
-            ),
-        ]
-
-        # Define sum of squared error function
-        def sum_of_squared_error(parameters):
-            return np.sum((y_data - logistic(x_data, *parameters)) ** 2.0)
-
-        # Generate genetic_parameters. For baseline scenarios, projections are linear
-        if scenario == "baseline":
-            y = linear(
-                x_data,
-                min(
-                    0.0018,
-                    max(0.00001, ((y_data[-1] - y_data[0]) / len(y_data))),
-                ),
-                (y_data[-1]),
+    # Calculate reduction factors that scale down the emissions of each of these
+    # subverticals over time
+    def reduce_subvertical(subvertical):
+        # Load saturation points for reduction ratios
+        ef_ratio = (
+            pd.DataFrame(
+                pd.read_csv(
+                    "podi/data/tech_parameters_afolu.csv",
+                )
             )
-            genetic_parameters = [0, 0, 0, 0]
-        else:
-            genetic_parameters = differential_evolution(
-                sum_of_squared_error,
-                search_bounds,
-                seed=3,
-                polish=False,
-                updating="immediate",
-                mutation=(0, 1),
-            ).x
-
-        y = np.array(logistic(x_data, *genetic_parameters))
-
-        pd.concat(
-            [
-                pd.DataFrame(
-                    np.array(
-                        [
-                            input_data.name[0],
-                            input_data.name[1],
-                            input_data.name[2],
-                            input_data.name[3],
-                        ]
-                    )
-                ).T,
-                pd.DataFrame(y).T,
-            ],
-            axis=1,
-        ).to_csv(
-            "podi/data/afolu_adoption_curves.csv",
-            mode="a",
-            header=None,
-            index=False,
-        )
-
-        return
-
-    ef_ratio.apply(
-        lambda x: adoption_projection_demand(
-            parameters=parameters.loc[x.name[0], x.name[1], x.name[2]],
-            input_data=x,
-            scenario=scenario,
-            data_end_year=data_end_year + 1,
-            saturation_year=2043,
-            proj_end_year=proj_end_year,
-        ),
-        axis=1,
-    )
-
-    ef_ratios = (
-        pd.DataFrame(
-            pd.read_csv("podi/data/afolu_adoption_curves.csv", header=None)
-        )
-        .set_axis(
-            pd.concat(
+            .set_index(["model", "scenario", "region", "variable"])
+            .loc[
+                slice(None),
+                "pathway",
+                slice(None),
                 [
-                    pd.DataFrame(
-                        np.array(
-                            ["model", "scenario", "region", "product_short"]
-                        )
-                    ).T,
-                    pd.DataFrame(
-                        np.linspace(
-                            data_end_year + 1,
-                            proj_end_year,
-                            proj_end_year - data_end_year,
-                        ).astype(int)
-                    ).T,
+                    f"{subvertical}|{parameter}"
+                    for parameter in [
+                        "Floor",
+                        "Max annual growth",
+                        "parameter a max",
+                        "parameter a min",
+                        "parameter b max",
+                        "parameter b min",
+                        "saturation point",
+                    ]
                 ],
-                axis=1,
-            ).squeeze(),
-            axis=1,
-        )
-        .set_index(["model", "scenario", "region", "product_short"])
-    ).sort_index()
-
-    # Prepare df for multiplication with emissions
-    ef_ratios = ef_ratios.parallel_apply(
-        lambda x: 1 - (1 - x.max()) * (x - x.min()) / x.max(), axis=1
-    )
-
-    ef_ratios = (
-        pd.DataFrame(
-            1,
-            index=ef_ratios.index,
-            columns=np.arange(data_start_year, data_end_year + 1, 1),
-        )
-    ).join(ef_ratios)
-    ef_ratios = ef_ratios.loc[:, : emissions_output_co2e.columns[-1]]
-    ef_ratios = ef_ratios.sort_index()
-
-    ef_ratios.to_csv("podi/data/afolu_ef_ratios.csv")
-
-    ef_ratios.update(
-        ef_ratios.parallel_apply(
-            lambda x: 1 - (x.max() - x) / (x.max() - x.min()), axis=1
-        ).fillna(0)
-    )
-
-    emissions_output_co2e.update(
-        emissions_output_co2e[
-            (
-                 (
-                    emissions_output_co2e.reset_index().flow_long
-                    == "Enteric Fermentation"
-                )
-            ).values
-        ]
-        .loc[:, data_end_year:]
-        .parallel_apply(
-            lambda x: x.mul(ef_ratios.loc[:, data_end_year:].squeeze().values),
-            axis=1,
-        )
-    )
-
-    # endregion
-
-    ###################################
-    #  REDUCE MANURE LEFT ON PASTURE  #
-    ###################################
-
-    # region
-
-    # Calculate reduction factors that scale down Manure left on Pasture over time
-
-    # Load saturation points for reduction ratios
-    ef_ratio = (
-        pd.DataFrame(
-            pd.read_csv(
-                "podi/data/tech_parameters_afolu.csv",
-            )
+            ]
         )
-        .set_index(["model", "scenario", "region", "variable"])
-        .loc[
-            slice(None),
-            "pathway",
-            slice(None),
-            [
-                "Manure left on Pasture|Floor",
-                "Manure left on Pasture|Max annual growth",
-                "Manure left on Pasture|parameter a max",
-                "Manure left on Pasture|parameter a min",
-                "Manure left on Pasture|parameter b max",
-                "Manure left on Pasture|parameter b min",
-                "Manure left on Pasture|saturation point",
-            ],
-        ]
-    )
 
-    parameters = ef_ratio
+        parameters = ef_ratio
 
-    ef_ratio = ef_ratio[
-        ef_ratio.index.get_level_values(3) == "Manure left on Pasture|Floor"
-    ].sort_index()
+        ef_ratio = ef_ratio[
+            ef_ratio.index.get_level_values(3) == f"{subvertical}|Floor"
+        ].sort_index()
 
-    # Clear afolu_adoption_curves.csv, and run adoption_projection_demand() to
-    # calculate logistics curves for afolu reduction ratios
+        # Run adoption_projection_demand() to calculate logistics curves for
+        # afolu reduction ratios
 
-    # Clear afolu_adoption_curves.csv and afolu_ef_ratio.csv
-    if os.path.exists("podi/data/afolu_adoption_curves.csv"):
-        os.remove("podi/data/afolu_adoption_curves.csv")
-    if os.path.exists("podi/data/afolu_ef_ratios.csv"):
-        os.remove("podi/data/afolu_ef_ratios.csv")
+        # Clear afolu_ef_ratio.csv
+        if os.path.exists("podi/data/afolu_ef_ratios.csv"):
+            os.remove("podi/data/afolu_ef_ratios.csv")
 
-    def adoption_projection_demand(
-        parameters,
-        input_data,
-        scenario,
-        data_end_year,
-        saturation_year,
-        proj_end_year,
-    ):
-        def linear(x, a, b, c, d):
-            return a * x + d
-
-        def logistic(x, a, b, c, d):
-            return c / (1 + np.exp(-a * (x - b))) + d
-
-        # Create x array (year) and y array (linear scale from zero to saturation value)
-        x_data = np.arange(0, proj_end_year - data_end_year + 1, 1)
-        y_data = np.zeros((1, len(x_data)))
-        y_data[:] = np.NaN
-        y_data = y_data.squeeze().astype(float)
-        y_data[0] = 0
-        y_data[saturation_year - data_end_year] = parameters.loc[
-            "Manure left on Pasture|saturation point",
-        ].values[0]
-
-        y_data = np.array((pd.DataFrame(y_data).interpolate()).squeeze())
-
-        # Load search bounds for logistic function parameters
-        search_bounds = [
-            (
-                pd.to_numeric(
-                    parameters.loc[
-                        "Manure left on Pasture|parameter a min"
-                    ].value
+        ef_ratios = (
+            adoption.apply_chunks(
+                broadcast.align(
+                    parameters["value"]
+                    .unstack("variable")
+                    .rename(columns=lambda x: x.split("|")[-1]),
+                    ef_ratio.index,
+                    ["model", "scenario", "region"],
                 ),
-                pd.to_numeric(
-                    parameters.loc[
-                        "Manure left on Pasture|parameter a max"
-                    ].value
-                ),
-            ),
-            (
-                pd.to_numeric(
-                    parameters.loc[
-                        "Manure left on Pasture|parameter b min"
-                    ].value
-                ),
-                pd.to_numeric(
-                    parameters.loc[
-                        "Manure left on Pasture|parameter b max"
-                    ].value
-                ),
-            ),
-            (
-                pd.to_numeric(
-                    parameters.loc[
-                        "Manure left on Pasture|saturation point"
-                    ].value
-                ),
-                pd.to_numeric(
-                    parameters.loc[
-                        "Manure left on Pasture|saturation point"
-                    ].value
-                ),
-            ),
-            (
-                0,
-                0,
-            ),
-        ]
-
-        # Define sum of squared error function
-        def sum_of_squared_error(parameters):
-            return np.sum((y_data - logistic(x_data, *parameters)) ** 2.0)
-
-        # Generate genetic_parameters. For baseline scenarios, projections are linear
-        if scenario == "baseline":
-            y = linear(
-                x_data,
-                min(
-                    0.0018,
-                    max(0.00001, ((y_data[-1] - y_data[0]) / len(y_data))),
+                lambda x: adoption.project_demand(
+                    x,
+                    data_end_year=data_end_year + 1,
+                    saturation_year=2043,
+                    proj_end_year=proj_end_year,
+                    model="linear" if scenario == "baseline" else "logistic",
                 ),
-                (y_data[-1]),
+                columns=np.arange(data_end_year + 1, proj_end_year + 1, 1),
+                checkpoint="cache/afolu_curves_"
+                + subvertical.lower().replace(" ", "_")
+                + ".npz",
             )
-            genetic_parameters = [0, 0, 0, 0]
-        else:
-            genetic_parameters = differential_evolution(
-                sum_of_squared_error,
-                search_bounds,
-                seed=3,
-                polish=False,
-                updating="immediate",
-                mutation=(0, 1),
-            ).x
-
-        y = np.array(logistic(x_data, *genetic_parameters))
-
-        pd.concat(
-            [
-                pd.DataFrame(
-                    np.array(
-                        [
-                            input_data.name[0],
-                            input_data.name[1],
-                            input_data.name[2],
-                            input_data.name[3],
-                        ]
-                    )
-                ).T,
-                pd.DataFrame(y).T,
-            ],
-            axis=1,
-        ).to_csv(
-            "podi/data/afolu_adoption_curves.csv",
-            mode="a",
-            header=None,
-            index=False,
-        )
-
-        return
-
-    ef_ratio.apply(
-        lambda x: adoption_projection_demand(
-            parameters=parameters.loc[x.name[0], x.name[1], x.name[2]],
-            input_data=x,
-            scenario=scenario,
-            data_end_year=data_end_year + 1,
-            saturation_year=2043,
-            proj_end_year=proj_end_year,
-        ),
-        axis=1,
-    )
-
-    ef_ratios = (
-        pd.DataFrame(
-            pd.read_csv("podi/data/afolu_adoption_curves.csv", header=None)
-        )
-        .set_axis(
-            pd.concat(
-                [
-                    pd.DataFrame(
-                        np.array(
-                            ["model", "scenario", "region", "product_short"]
-                        )
-                    ).T,
-                    pd.DataFrame(
-                        np.linspace(
-                            data_end_year + 1,
-                            proj_end_year,
-                            proj_end_year - data_end_year,
-                        ).astype(int)
-                    ).T,
-                ],
-                axis=1,
-            ).squeeze(),
-            axis=1,
-        )
-        .set_index(["model", "scenario", "region", "product_short"])
-    ).sort_index()
-
-    # Prepare df for multiplication with emissions
-    ef_ratios = ef_ratios.parallel_apply(
-        lambda x: 1 - (1 - x.max()) * (x - x.min()) / x.max(), axis=1
-    )
-
-    ef_ratios = (
-        pd.DataFrame(
-            1,
-            index=ef_ratios.index,
-            columns=np.arange(data_start_year, data_end_year + 1, 1),
+            .rename_axis(index={"variable": "product_short"})
+            .sort_index()
         )
-    ).join(ef_ratios)
-    ef_ratios = ef_ratios.loc[:, : emissions_output_co2e.columns[-1]]
-    ef_ratios = ef_ratios.sort_index()
-
-    ef_ratios.to_csv("podi/data/afolu_ef_ratios.csv")
 
-    ef_ratios.update(
-        ef_ratios.parallel_apply(
-            lambda x: 1 - (x.max() - x) / (x.max() - x.min()), axis=1
-        ).fillna(0)
-    )
-
-    emissions_output_co2e.update(
-        emissions_output_co2e[
-            (
-                 (
-                    emissions_output_co2e.reset_index().flow_long
-                    == "Manure left on Pasture"
-                )
-            ).values
-        ]
-        .loc[:, data_end_year:]
-        .parallel_apply(
-            lambda x: x.mul(ef_ratios.loc[:, data_end_year:].squeeze().values),
+        # Prepare df for multiplication with emissions
+        ef_ratios = ef_ratios.pipe(
+            executor.apply,
+            lambda x: 1 - (1 - x.max()) * (x - x.min()) / x.max(),
             axis=1,
         )
-    )
-
-    # endregion
-
-    ##############################
-    #  REDUCE MANURE MANAGEMENT  #
-    ##############################
-
-    # region
-
-    # Calculate reduction factors that scale down Manure Management over time
 
-    # Load saturation points for reduction ratios
-    ef_ratio = (
-        pd.DataFrame(
-            pd.read_csv(
-                "podi/data/tech_parameters_afolu.csv",
+        ef_ratios = (
+            pd.DataFrame(
+                1,
+                index=ef_ratios.index,
+                columns=np.arange(data_start_year, data_end_year + 1, 1),
             )
-        )
-        .set_index(["model", "scenario", "region", "variable"])
-        .loc[
-            slice(None),
-            "pathway",
-            slice(None),
-            [
-                "Manure Management|Floor",
-                "Manure Management|Max annual growth",
-                "Manure Management|parameter a max",
-                "Manure Management|parameter a min",
-                "Manure Management|parameter b max",
-                "Manure Management|parameter b min",
-                "Manure Management|saturation point",
-            ],
-        ]
-    )
+        ).join(ef_ratios)
+        ef_ratios = ef_ratios.loc[:, : emissions_output_co2e.columns[-1]]
+        ef_ratios = ef_ratios.sort_index()
 
-    parameters = ef_ratio
+        ef_ratios.to_csv("podi/data/afolu_ef_ratios.csv")
 
-    ef_ratio = ef_ratio[
-        ef_ratio.index.get_level_values(3) == "Manure Management|Floor"
-    ].sort_index()
-
-    # Clear afolu_adoption_curves.csv, and run adoption_projection_demand() to
-    # calculate logistics curves for afolu reduction ratios
-
-    # Clear afolu_adoption_curves.csv and afolu_ef_ratio.csv
-    if os.path.exists("podi/data/afolu_adoption_curves.csv"):
-        os.remove("podi/data/afolu_adoption_curves.csv")
-    if os.path.exists("podi/data/afolu_ef_ratios.csv"):
-        os.remove("podi/data/afolu_ef_ratios.csv")
-
-    def adoption_projection_demand(
-        parameters,
-        input_data,
-        scenario,
-        data_end_year,
-        saturation_year,
-        proj_end_year,
-    ):
-        def linear(x, a, b, c, d):
-            return a * x + d
-
-        def logistic(x, a, b, c, d):
-            return c / (1 + np.exp(-a * (x - b))) + d
-
-        # Create x array (year) and y array (linear scale from zero to saturation value)
-        x_data = np.arange(0, proj_end_year - data_end_year + 1, 1)
-        y_data = np.zeros((1, len(x_data)))
-        y_data[:] = np.NaN
-        y_data = y_data.squeeze().astype(float)
-        y_data[0] = 0
-        y_data[saturation_year - data_end_year] = parameters.loc[
-            "Manure Management|saturation point",
-        ].values[0]
-
-        y_data = np.array((pd.DataFrame(y_data).interpolate()).squeeze())
-
-        # Load search bounds for logistic function parameters
-        search_bounds = [
-            (
-                pd.to_numeric(
-                    parameters.loc["Manure Management|parameter a min"].value
-                ),
-                pd.to_numeric(
-                    parameters.loc["Manure Management|parameter a max"].value
-                ),
-            ),
-            (
-                pd.to_numeric(
-                    parameters.loc["Manure Management|parameter b min"].value
-                ),
-                pd.to_numeric(
-                    parameters.loc["Manure Management|parameter b max"].value
-                ),
-            ),
-            (
-                pd.to_numeric(
-                    parameters.loc["Manure Management|saturation point"].value
-                ),
-                pd.to_numeric(
-                    parameters.loc["Manure Management|saturation point"].value
-                ),
-            ),
-            (
-                0,
-                0,
-            ),
-        ]
-
-        # Define sum of squared error function
-        def sum_of_squared_error(parameters):
-            return np.sum((y_data - logistic(x_data, *parameters)) ** 2.0)
-
-        # Generate genetic_parameters. For baseline scenarios, projections are linear
-        if scenario == "baseline":
-            y = linear(
-                x_data,
-                min(
-                    0.0018,
-                    max(0.00001, ((y_data[-1] - y_data[0]) / len(y_data))),
-                ),
-                (y_data[-1]),
-            )
-            genetic_parameters = [0, 0, 0, 0]
-        else:
-            genetic_parameters = differential_evolution(
-                sum_of_squared_error,
-                search_bounds,
-                seed=3,
-                polish=False,
-                updating="immediate",
-                mutation=(0, 1),
-            ).x
-
-        y = np.array(logistic(x_data, *genetic_parameters))
-
-        pd.concat(
-            [
-                pd.DataFrame(
-                    np.array(
-                        [
-                            input_data.name[0],
-                            input_data.name[1],
-                            input_data.name[2],
-                            input_data.name[3],
-                        ]
-                    )
-                ).T,
-                pd.DataFrame(y).T,
-            ],
-            axis=1,
-        ).to_csv(
-            "podi/data/afolu_adoption_curves.csv",
-            mode="a",
-            header=None,
-            index=False,
-        )
-
-        return
-
-    ef_ratio.apply(
-        lambda x: adoption_projection_demand(
-            parameters=parameters.loc[x.name[0], x.name[1], x.name[2]],
-            input_data=x,
-            scenario=scenario,
-            data_end_year=data_end_year + 1,
-            saturation_year=2043,
-            proj_end_year=proj_end_year,
-        ),
-        axis=1,
-    )
-
-    ef_ratios = (
-        pd.DataFrame(
-            pd.read_csv("podi/data/afolu_adoption_curves.csv", header=None)
-        )
-        .set_axis(
-            pd.concat(
-                [
-                    pd.DataFrame(
-                        np.array(
-                            ["model", "scenario", "region", "product_short"]
-                        )
-                    ).T,
-                    pd.DataFrame(
-                        np.linspace(
-                            data_end_year + 1,
-                            proj_end_year,
-                            proj_end_year - data_end_year,
-                        ).astype(int)
-                    ).T,
-                ],
+        ef_ratios.update(
+            ef_ratios.pipe(
+                executor.apply,
+                lambda x: 1 - (x.max() - x) / (x.max() - x.min()),
                 axis=1,
-            ).squeeze(),
-            axis=1,
+            ).fillna(0)
         )
-        .set_index(["model", "scenario", "region", "product_short"])
-    ).sort_index()
-
-    # Prepare df for multiplication with emissions
-    ef_ratios = ef_ratios.parallel_apply(
-        lambda x: 1 - (1 - x.max()) * (x - x.min()) / x.max(), axis=1
-    )
 
-    ef_ratios = (
-        pd.DataFrame(
-            1,
-            index=ef_ratios.index,
-            columns=np.arange(data_start_year, data_end_year + 1, 1),
-        )
-    ).join(ef_ratios)
-    ef_ratios = ef_ratios.loc[:, : emissions_output_co2e.columns[-1]]
-    ef_ratios = ef_ratios.sort_index()
-
-    ef_ratios.to_csv("podi/data/afolu_ef_ratios.csv")
-
-    ef_ratios.update(
-        ef_ratios.parallel_apply(
-            lambda x: 1 - (x.max() - x) / (x.max() - x.min()), axis=1
-        ).fillna(0)
-    )
-
-    emissions_output_co2e.update(
-        emissions_output_co2e[
-            (
-                 (
+        emissions_output_co2e.update(
+            emissions_output_co2e[
+                (
                     emissions_output_co2e.reset_index().flow_long
-                    == "Manure Management"
-                )
-            ).values
-        ]
-        .loc[:, data_end_year:]
-        .parallel_apply(
-            lambda x: x.mul(ef_ratios.loc[:, data_end_year:].squeeze().values),
-            axis=1,
-        )
-    )
-
-    # endregion
-
-    ####################################
-    #  REDUCE MANURE APPLIED TO SOILS  #
-    ####################################
-
-    # region
-
-    # Calculate reduction factors that scale down Manure applied to Soils over time
-
-    # Load saturation points for reduction ratios
-    ef_ratio = (
-        pd.DataFrame(
-            pd.read_csv(
-                "podi/data/tech_parameters_afolu.csv",
-            )
-        )
-        .set_index(["model", "scenario", "region", "variable"])
-        .loc[
-            slice(None),
-            "pathway",
-            slice(None),
-            [
-                "Manure applied to Soils|Floor",
-                "Manure applied to Soils|Max annual growth",
-                "Manure applied to Soils|parameter a max",
-                "Manure applied to Soils|parameter a min",
-                "Manure applied to Soils|parameter b max",
-                "Manure applied to Soils|parameter b min",
-                "Manure applied to Soils|saturation point",
-            ],
-        ]
-    )
-
-    parameters = ef_ratio
-
-    ef_ratio = ef_ratio[
-        ef_ratio.index.get_level_values(3) == "Manure applied to Soils|Floor"
-    ].sort_index()
-
-    # Clear afolu_adoption_curves.csv, and run adoption_projection_demand() to
-    # calculate logistics curves for afolu reduction ratios
-
-    # Clear afolu_adoption_curves.csv and afolu_ef_ratio.csv
-    if os.path.exists("podi/data/afolu_adoption_curves.csv"):
-        os.remove("podi/data/afolu_adoption_curves.csv")
-    if os.path.exists("podi/data/afolu_ef_ratios.csv"):
-        os.remove("podi/data/afolu_ef_ratios.csv")
-
-    def adoption_projection_demand(
-        parameters,
-        input_data,
-        scenario,
-        data_end_year,
-        saturation_year,
-        proj_end_year,
-    ):
-        def linear(x, a, b, c, d):
-            return a * x + d
-
-        def logistic(x, a, b, c, d):
-            return c / (1 + np.exp(-a * (x - b))) + d
-
-        # Create x array (year) and y array (linear scale from zero to saturation value)
-        x_data = np.arange(0, proj_end_year - data_end_year + 1, 1)
-        y_data = np.zeros((1, len(x_data)))
-        y_data[:] = np.NaN
-        y_data = y_data.squeeze().astype(float)
-        y_data[0] = 0
-        y_data[saturation_year - data_end_year] = parameters.loc[
-            "Manure applied to Soils|saturation point",
-        ].values[0]
-
-        y_data = np.array((pd.DataFrame(y_data).interpolate()).squeeze())
-
-        # Load search bounds for logistic function parameters
-        search_bounds = [
-            (
-                pd.to_numeric(
-                    parameters.loc[
-                        "Manure applied to Soils|parameter a min"
-                    ].value
-                ),
-                pd.to_numeric(
-                    parameters.loc[
-                        "Manure applied to Soils|parameter a max"
-                    ].value
-                ),
-            ),
-            (
-                pd.to_numeric(
-                    parameters.loc[
-                        "Manure applied to Soils|parameter b min"
-                    ].value
-                ),
-                pd.to_numeric(
-                    parameters.loc[
-                        "Manure applied to Soils|parameter b max"
-                    ].value
-                ),
-            ),
-            (
-                pd.to_numeric(
-                    parameters.loc[
-                        "Manure applied to Soils|saturation point"
-                    ].value
-                ),
-                pd.to_numeric(
-                    parameters.loc[
-                        "Manure applied to Soils|saturation point"
-                    ].value
-                ),
-            ),
-            (
-                0,
-                0,
-            ),
-        ]
-
-        # Define sum of squared error function
-        def sum_of_squared_error(parameters):
-            return np.sum((y_data - logistic(x_data, *parameters)) ** 2.0)
-
-        # Generate genetic_parameters. For baseline scenarios, projections are linear
-        if scenario == "baseline":
-            y = linear(
-                x_data,
-                min(
-                    0.0018,
-                    max(0.00001, ((y_data[-1] - y_data[0]) / len(y_data))),
+                    == subvertical
+                ).values
+            ]
+            .loc[:, data_end_year:]
+            .pipe(
+                executor.apply,
+                lambda x: x.mul(
+                    ef_ratios.loc[:, data_end_year:].squeeze().values
                 ),
-                (y_data[-1]),
+                axis=1,
             )
-            genetic_parameters = [0, 0, 0, 0]
-        else:
-            genetic_parameters = differential_evolution(
-                sum_of_squared_error,
-                search_bounds,
-                seed=3,
-                polish=False,
-                updating="immediate",
-                mutation=(0, 1),
-            ).x
-
-        y = np.array(logistic(x_data, *genetic_parameters))
-
-        pd.concat(
-            [
-                pd.DataFrame(
-                    np.array(
-                        [
-                            input_data.name[0],
-                            input_data.name[1],
-                            input_data.name[2],
-                            input_data.name[3],
-                        ]
-                    )
-                ).T,
-                pd.DataFrame(y).T,
-            ],
-            axis=1,
-        ).to_csv(
-            "podi/data/afolu_adoption_curves.csv",
-            mode="a",
-            header=None,
-            index=False,
         )
 
-        return
-
-    ef_ratio.apply(
-        lambda x: adoption_projection_demand(
-            parameters=parameters.loc[x.name[0], x.name[1], x.name[2]],
-            input_data=x,
-            scenario=scenario,
-            data_end_year=data_end_year + 1,
-            saturation_year=2043,
-            proj_end_year=proj_end_year,
-        ),
-        axis=1,
-    )
+    for subvertical in [
+        "Enteric Fermentation",
+        "Manure left on Pasture",
+        "Manure Management",
+        "Manure applied to Soils",
+    ]:
+        reduce_subvertical(subvertical)
 
-    ef_ratios = (
-        pd.DataFrame(
-            pd.read_csv("podi/data/afolu_adoption_curves.csv", header=None)
-        )
-        .set_axis(
-            pd.concat(
-                [
-                    pd.DataFrame(
-                        np.array(
-                            ["model", "scenario", "region", "product_short"]
-                        )
-                    ).T,
-                    pd.DataFrame(
-                        np.linspace(
-                            data_end_year + 1,
-                            proj_end_year,
-                            proj_end_year - data_end_year,
-                        ).astype(int)
-                    ).T,
-                ],
-                axis=1,
-            ).squeeze(),
-            axis=1,
-        )
-        .set_index(["model", "scenario", "region", "product_short"])
-    ).sort_index()
-
-    # Prepare df for multiplication with emissions
-    ef_ratios = ef_ratios.parallel_apply(
-        lambda x: 1 - (1 - x.max()) * (x - x.min()) / x.max(), axis=1
-    )
+    # endregion
 
-    ef_ratios = (
-        pd.DataFrame(
-            1,
-            index=ef_ratios.index,
-            columns=np.arange(data_start_year, data_end_year + 1, 1),
-        )
-    ).join(ef_ratios)
-    ef_ratios = ef_ratios.loc[:, : emissions_output_co2e.columns[-1]]
-    ef_ratios = ef_ratios.sort_index()
+    #####################
+    #  CONVERT TO CO2e  #
+    #####################
 
-    ef_ratios.to_csv("podi/data/afolu_ef_ratios.csv")
+    # region
 
-    ef_ratios.update(
-        ef_ratios.parallel_apply(
-            lambda x: 1 - (x.max() - x) / (x.max() - x.min()), axis=1
-        ).fillna(0)
+    # Convert to CO2e with all GWP versions in one multiply, and keep version
+    # as emissions_output_co2e
+    emissions_output_co2e_metrics = units.co2e(
+        emissions_output_co2e, list(dict.fromkeys([version, *gwp_versions]))
     )
-
-    emissions_output_co2e.update(
-        emissions_output_co2e[
-            (
-                (
-                    emissions_output_co2e.reset_index().flow_long
-                    == "Manure applied to Soils"
-                )
-            ).values
-        ]
-        .loc[:, data_end_year:]
-        .parallel_apply(
-            lambda x: x.mul(ef_ratios.loc[:, data_end_year:].squeeze().values),
-            axis=1,
-        )
+    emissions_output_co2e = emissions_output_co2e_metrics.xs(
+        version, level="metric"
     )
 
     # endregion
@@ -2818,6 +1617,7 @@ def emissions(
     emissions_output.sort_index().to_parquet(
         "podi/data/emissions_output.parquet", compression="brotli"
     )
+    emissions_output.columns = emissions_output.columns.astype(int)
 
     emissions_output_co2e.columns = emissions_output_co2e.columns.astype(str)
     for col in emissions_output_co2e.select_dtypes(include="float64").columns:
@@ -2827,7 +1627,33 @@ def emissions(
     emissions_output_co2e.sort_index().to_parquet(
         "podi/data/emissions_output_co2e.parquet", compression="brotli"
     )
+    emissions_output_co2e.columns = emissions_output_co2e.columns.astype(int)
+
+    emissions_output_co2e_metrics.columns = (
+        emissions_output_co2e_metrics.columns.astype(str)
+    )
+    emissions_output_co2e_metrics.astype("float32").sort_index().to_parquet(
+        "podi/data/emissions_output_co2e_metrics.parquet",
+        compression="brotli",
+    )
+    emissions_output_co2e_metrics.columns = (
+        emissions_output_co2e_metrics.columns.astype(int)
+    )
+
+    # Save the double counting report with the other cached files, out of
+    # podi/data, since no stage reads it
+    os.makedirs("cache", exist_ok=True)
+    double_count_report.set_axis(
+        double_count_report.columns.astype(str), axis=1
+    ).sort_index().to_parquet(
+        "cache/emissions_double_count.parquet", compression="brotli"
+    )
 
     # endregion
 
-    return
+    return {
+        "emissions_output": emissions_output,
+        "emissions_output_co2e": emissions_output_co2e,
+        "emissions_output_co2e_metrics": emissions_output_co2e_metrics,
+        "emissions_double_count": double_count_report,
+    }
@@ -0,0 +1,75 @@
+# region
+
+import numpy as np
+import pandas as pd
+
+# endregion
+
+# Build emissions factors for energy rows as a whole matrix: EFDB factors are
+# joined to rows on the codes of their product_long, and decreased over time by
+# one broadcast decay vector, instead of filtering EFDB and building the decay
+# of each row in parallel_apply.
+
+efdb_path = "podi/data/external/emissions_factors_efdb.csv"
+
+# Annual decrease of emissions factors, as a fraction of their value, by
+# product_long. Products that aren't listed decrease by default_decay.
+default_decay = 0.01
+decay = {}
+
+
+def load_efdb(path=efdb_path):
+    """
+    Load EFDB emissions factors as a Series indexed by product_long. Products
+    with more than one factor are dropped, since they can't be attributed.
+    """
+    efdb = pd.read_csv(path, usecols=["product_long", "value"])
+
+    return efdb.drop_duplicates("product_long", keep=False).set_index(
+        "product_long"
+    )["value"]
+
+
+def factors(index, columns, efdb, data_start_year, decay=decay):
+    """
+    Return the emissions factors of the rows of index, by their product_long,
+    for the years in columns. Factors decrease linearly from data_start_year
+    by the decay of their product, to no less than 0. Rows whose product has
+    no factor in efdb are NaN.
+    """
+    codes, products = pd.factorize(index.get_level_values("product_long"))
+
+    value = efdb.reindex(products).to_numpy(dtype=float)[codes]
+    rate = (
+        pd.Series(decay, dtype=float)
+        .reindex(products)
+        .fillna(default_decay)
+        .to_numpy()[codes]
+    )
+    years = np.asarray(columns, dtype=float) - data_start_year
+
+    return pd.DataFrame(
+        np.clip(
+            value[:, np.newaxis]
+            * (1 - rate[:, np.newaxis] * years[np.newaxis, :]),
+            0,
+            None,
+        ),
+        index=index,
+        columns=columns,
+    )
+
+
+def emissions(energy, efdb, data_start_year, decay=decay):
+    """
+    Multiply energy by the emissions factors of its rows. Rows without a
+    factor have no emissions.
+    """
+    return pd.DataFrame(
+        energy.to_numpy(dtype=float)
+        * factors(
+            energy.index, energy.columns, efdb, data_start_year, decay
+        ).to_numpy(),
+        index=energy.index,
+        columns=energy.columns,
+    ).fillna(0)
@@ -1,140 +1,63 @@
 # region
 
-import multiprocessing
 import os
+import shutil
 
 import numpy as np
 import pandas as pd
 from numpy import NaN
-from pandarallel import pandarallel
-from scipy.optimize import differential_evolution
 
-pandarallel.initialize(progress_bar=True)
+from podi import adoption, broadcast, executor, iea, projection
 
 # endregion
 
-
-# define a function to process the dataframes in parallel
-def process_df_function(regions, data_start_year, data_end_year):
-    energy_historical_temp = pd.DataFrame([])
-
-    for region in regions:
-        # Handle "x", "c", ".." qualifiers. IEA documentation is not clear on what
-        # "x" represents; "c" represents "confidential",
-        # ".." represents "not available"
-        energy_historical = (
-            pd.DataFrame(
-                pd.read_fwf(
-                    str("podi/data/IEA/" + region + ".txt"),
-                    colspecs=[
-                        (0, 15),
-                        (16, 31),
-                        (32, 47),
-                        (48, 63),
-                        (64, 70),
-                        (71, -1),
-                    ],
-                    names=[
-                        "region",
-                        "product_short",
-                        "year",
-                        "flow_short",
-                        "unit",
-                        "value",
-                    ],
-                    dtype={
-                        "region": "category",
-                        "product_short": "category",
-                        "year": "int",
-                        "flow_short": "category",
-                        "unit": "category",
-                    },
-                )
-            )
-            .replace(["c"], NaN)
-            .replace([".."], NaN)
-            .replace(["x"], NaN)
-        )
-
-        # Change values to float
-        energy_historical["value"] = energy_historical["value"].astype(float)
-
-        # Change from all caps to lowercase
-        energy_historical["region"] = energy_historical["region"].str.lower()
-
-        # Format as a dataframe with timeseries as rows
-        energy_historical = pd.pivot_table(
-            energy_historical,
-            values="value",
-            index=["region", "product_short", "flow_short", "unit"],
-            columns="year",
-        )
-
-        # Not all regions have placeholders for all years, so they need to be created
-        energy_historical = pd.DataFrame(
-            index=energy_historical.index,
-            columns=np.arange(data_start_year, data_end_year + 1, 1),
-            data=NaN,
-        ).combine_first(energy_historical)
-
-        # Backfill missing data using oldest data point
-        energy_historical = energy_historical.fillna(method="backfill", axis=1)
-
-        # For rows with data only prior to data_start_year, front fill to data_start_year
-        energy_historical.update(
-            energy_historical[energy_historical.loc[:, data_start_year].isna()]
-            .loc[:, :data_start_year]
-            .fillna(method="ffill", axis=1)
+# Outputs of energy(), saved as parquet files in its output_path
+outputs = [
+    "energy_post_upstream",
+    "energy_post_addtl_eff",
+    "energy_electrified",
+    "energy_reduced_electrified",
+    "energy_output",
+    "energy_percent",
+]
+
+# Directory of the outputs of each shard of regions, when energy runs by shard
+shards_path = "podi/data/energy_shards/"
+
+
+def energy(
+    model,
+    scenario,
+    data_start_year,
+    data_end_year,
+    proj_end_year,
+    energy_sharded=False,
+    regions=None,
+    output_path="podi/data/",
+):
+    # If energy_sharded is set, run energy() for each shard of regions and
+    # merge their outputs, see energy_by_shard(). Otherwise energy() runs for
+    # regions (all regions in Regions.txt by default), and saves its
+    # intermediate files and outputs in output_path.
+    if energy_sharded:
+        return energy_by_shard(
+            model, scenario, data_start_year, data_end_year, proj_end_year
         )
 
-        # Remove duplicate regions created due to name overlaps
-        energy_historical = energy_historical.loc[[region.lower()], :]
-
-        # Filter for data start_year and data_end_year, which can be different depending on region/product/flow because data becomes available at different times
-        energy_historical = energy_historical.loc[
-            :, data_start_year:data_end_year
-        ]
-
-        # Build dataframe consisting of all regions
-        energy_historical_temp = pd.concat(
-            [energy_historical_temp, energy_historical]
-        )
-
-    return energy_historical_temp
-
-
-def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     ############################
     #  LOAD HISTORICAL ENERGY  #
     ############################
 
     # region
 
-    # Download IEA World Energy Balances. As of Q1 2023, this dataset must be
-    # purchased. Choose the ZIP format of the 'World energy balances' file
-    # available [here](https://www.iea.org/data-and-statistics/data-product/
-    # world-energy-balances). Download the file to `pd/data/IEA` on your local
-    # machine and extract the file. Run the 'splitregion.sh' script, which
-    # splits the data by region and saves each to a .txt file with the
-    # filename matching the region name.
-
-    # Load historical energy data for each region.
-    regions_list = np.array_split(
-        pd.read_csv("podi/data/IEA/Regions.txt").squeeze("columns"),
-        multiprocessing.cpu_count(),
-    )
-
-    with multiprocessing.Pool() as pool:
-        energy_historical = pd.concat(
-            pool.starmap(
-                process_df_function,
-                zip(
-                    regions_list,
-                    [(data_start_year) for _ in regions_list],
-                    [(data_end_year) for _ in regions_list],
-                ),
-            )
-        )
+    # Load historical energy data for each region from the IEA World Energy
+    # Balances parquet dataset. See podi/iea.py to create it from the IEA
+    # fixed-width files.
+    energy_historical = iea.load_iea(
+        data_start_year,
+        data_end_year,
+        regions=load_regions() if regions is None else regions,
+    )
 
     # Add model and scenario indices
     energy_historical = pd.concat(
@@ -332,6 +255,10 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         irena.index.levels[2].str.lower().astype("category"), level=2
     )
 
+    # Keep only the regions of this shard, if energy is run by shard
+    if regions is not None:
+        irena = irena[irena.index.get_level_values(2).isin(regions)]
+
     # Set column type
     irena.columns = irena.columns.astype(int)
 
@@ -456,7 +383,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         energy_historical[
             (energy_historical.reset_index().flow_short == "ROAD").values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -478,7 +406,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         energy_historical[
             (energy_historical.reset_index().flow_short == "ROAD").values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -496,7 +425,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         energy_historical[
             (energy_historical.reset_index().flow_short == "ROAD").values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -514,7 +444,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         energy_historical[
             (energy_historical.reset_index().flow_short == "ROAD").values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -549,7 +480,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         energy_historical[
             (energy_historical.reset_index().flow_short == "DOMESAIR").values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -567,7 +499,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         energy_historical[
             (energy_historical.reset_index().flow_short == "DOMESAIR").values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -600,7 +533,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         energy_historical[
             (energy_historical.reset_index().flow_short == "RAIL").values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -618,7 +552,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         energy_historical[
             (energy_historical.reset_index().flow_short == "RAIL").values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -655,7 +590,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
                 | (energy_historical.reset_index().product_short == "HEATNS")
             ).values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -680,7 +616,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
                 | (energy_historical.reset_index().product_short == "HEATNS")
             ).values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 1
@@ -720,7 +657,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
                 energy_historical.reset_index().product_short == "NONCRUDE"
             ).values
         ]
-        .parallel_apply(
+        .pipe(
+            executor.apply,
             lambda x: x
             * (
                 subsector_props.loc[
@@ -735,7 +673,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     # Update NONCRUDE Product to be reduced by the estimate of HYDROGEN
     noncrude = energy_historical[
         (energy_historical.reset_index().product_short == "NONCRUDE").values
-    ].parallel_apply(
+    ].pipe(
+        executor.apply,
         lambda x: x
         * (
             1
@@ -763,7 +702,7 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     energy_historical.update(
         energy_historical[
             (energy_historical.reset_index().product_short == "SOLARPV").values
-        ].parallel_apply(lambda x: x * 0.6, axis=1)
+        ].pipe(executor.apply, lambda x: x * 0.6, axis=1)
     )
 
     energy_historical = pd.concat(
@@ -775,7 +714,7 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
                         energy_historical.reset_index().product_short
                         == "SOLARPV"
                     ).values
-                ].parallel_apply(lambda x: x * 0.4, axis=1)
+                ].pipe(executor.apply, lambda x: x * 0.4, axis=1)
             ).rename(
                 index={
                     "SOLARPV": "ROOFTOP",
@@ -825,14 +764,16 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         usecols=["product_category", "product_long", "product_short"],
     )
 
-    energy_historical["product_category"] = energy_historical.parallel_apply(
+    energy_historical["product_category"] = energy_historical.pipe(
+        executor.apply,
         lambda x: longnames[longnames["product_short"] == x["product_short"]][
             "product_category"
         ].squeeze("rows"),
         axis=1,
     )
 
-    energy_historical["product_long"] = energy_historical.parallel_apply(
+    energy_historical["product_long"] = energy_historical.pipe(
+        executor.apply,
         lambda x: longnames[longnames["product_short"] == x["product_short"]][
             "product_long"
         ].squeeze("rows"),
@@ -844,14 +785,16 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         usecols=["flow_category", "flow_long", "flow_short"],
     )
 
-    energy_historical["flow_category"] = energy_historical.parallel_apply(
+    energy_historical["flow_category"] = energy_historical.pipe(
+        executor.apply,
         lambda x: longnames[longnames["flow_short"] == x["flow_short"]][
             "flow_category"
         ].squeeze("rows"),
         axis=1,
     )
 
-    energy_historical["flow_long"] = energy_historical.parallel_apply(
+    energy_historical["flow_long"] = energy_historical.pipe(
+        executor.apply,
         lambda x: longnames[longnames["flow_short"] == x["flow_short"]][
             "flow_long"
         ].squeeze("rows"),
@@ -866,7 +809,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
                 (energy_historical.flow_short == "AGRICULT")
                 & (energy_historical.sector == "Agriculture")
             )
-        ].parallel_apply(
+        ].pipe(
+            executor.apply,
             lambda x: x.replace(
                 {
                     "Agriculture/forestry": "Agriculture",
@@ -883,7 +827,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
                 (energy_historical.flow_short == "AGRICULT")
                 & (energy_historical.sector == "Forests & Wetlands")
             ).values
-        ].parallel_apply(
+        ].pipe(
+            executor.apply,
             lambda x: x.replace(
                 {
                     "AGRICULT": "FOREST",
@@ -1028,7 +973,7 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         )
 
     energy_historical.droplevel(["EIA Region", "EIA Product"]).to_csv(
-        "podi/data/energy_historical.csv"
+        output_path + "energy_historical.csv"
     )
 
     # endregion
@@ -1116,19 +1061,16 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         .droplevel(["EIA Region", "EIA Product"])
     ).sort_index()
 
-    energy_baseline = energy_baseline.parallel_apply(
-        lambda x: pd.concat(
-            [x.loc[: data_end_year - 1], x.loc[data_end_year:].cumprod()]
-        ),
-        axis=1,
+    energy_baseline = projection.project(
+        energy_baseline, "cumprod", start=data_end_year
     )
 
     # Save
-    if os.path.exists("podi/data/energy_baseline.parquet"):
-        os.remove("podi/data/energy_baseline.parquet")
+    if os.path.exists(output_path + "energy_baseline.parquet"):
+        os.remove(output_path + "energy_baseline.parquet")
     energy_baseline.columns = energy_baseline.columns.astype(str)
     energy_baseline.to_parquet(
-        "podi/data/energy_baseline.parquet", compression="brotli"
+        output_path + "energy_baseline.parquet", compression="brotli"
     )
     energy_baseline.columns = energy_baseline.columns.astype(int)
 
@@ -1201,156 +1143,39 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         ef_ratio.index.get_level_values(4) == "floor"
     ].sort_index()
 
-    # Clear energy_adoption_curves.csv, and run adoption_projection_demand() to
-    # calculate logistics curves for energy reduction ratios
+    # Run adoption_projection_demand() to calculate logistics curves for energy
+    # reduction ratios
 
-    # Clear energy_adoption_curves.csv and energy_ef_ratio.csv
-    if os.path.exists("podi/data/energy_adoption_curves.csv"):
-        os.remove("podi/data/energy_adoption_curves.csv")
-    if os.path.exists("podi/data/energy_ef_ratios.csv"):
-        os.remove("podi/data/energy_ef_ratios.csv")
+    # Clear energy_ef_ratio.csv
+    if os.path.exists(output_path + "energy_ef_ratios.csv"):
+        os.remove(output_path + "energy_ef_ratios.csv")
 
-    def adoption_projection_demand(
-        parameters,
-        input_data,
-        scenario,
-        data_end_year,
-        saturation_year,
-        proj_end_year,
-    ):
-        def linear(x, a, b, c, d):
-            return a * x + d
-
-        def logistic(x, a, b, c, d):
-            return c / (1 + np.exp(-a * (x - b))) + d
-
-        # Create x array (year) and y array (linear scale from zero to saturation value)
-        x_data = np.arange(0, proj_end_year - data_end_year + 1, 1)
-        y_data = np.zeros((1, len(x_data)))
-        y_data[:] = np.NaN
-        y_data = y_data.squeeze().astype(float)
-        y_data[0] = 0
-        y_data[saturation_year - data_end_year] = parameters.loc[
-            "saturation point"
-        ].value.astype(float)
-
-        y_data = np.array((pd.DataFrame(y_data).interpolate()).squeeze())
-
-        # Load search bounds for logistic function parameters
-        search_bounds = [
-            (
-                pd.to_numeric(parameters.loc["parameter a min"].value),
-                pd.to_numeric(parameters.loc["parameter a max"].value),
-            ),
-            (
-                pd.to_numeric(parameters.loc["parameter b min"].value),
-                pd.to_numeric(parameters.loc["parameter b max"].value),
+    ef_ratios = (
+        adoption.apply_chunks(
+            broadcast.align(
+                parameters["value"].unstack("metric"),
+                ef_ratio.index,
+                ["region", "product_short", "scenario", "sector"],
             ),
-            (
-                pd.to_numeric(parameters.loc["saturation point"].value),
-                pd.to_numeric(parameters.loc["saturation point"].value),
+            lambda x: adoption.project_demand(
+                x,
+                data_end_year=data_end_year + 1,
+                saturation_year=2050,
+                proj_end_year=proj_end_year,
+                model="linear" if scenario == "baseline" else "logistic",
             ),
-            (
-                0,
-                0,
-            ),
-        ]
-
-        # Define sum of squared error function
-        def sum_of_squared_error(parameters):
-            return np.sum((y_data - logistic(x_data, *parameters)) ** 2.0)
-
-        # Generate genetic_parameters. For baseline scenarios, projections are linear
-        if scenario == "baseline":
-            y = linear(
-                x_data,
-                min(
-                    0.0018,
-                    max(0.00001, ((y_data[-1] - y_data[0]) / len(y_data))),
-                ),
-                (y_data[-1]),
-            )
-            genetic_parameters = [0, 0, 0, 0]
-        else:
-            genetic_parameters = differential_evolution(
-                sum_of_squared_error,
-                search_bounds,
-                seed=3,
-                polish=False,
-                updating="immediate",
-                mutation=(0, 1),
-            ).x
-
-        y = np.array(logistic(x_data, *genetic_parameters))
-
-        pd.concat(
-            [
-                pd.DataFrame(
-                    np.array(
-                        [
-                            input_data.name[0],
-                            input_data.name[1],
-                            input_data.name[2],
-                            input_data.name[3],
-                        ]
-                    )
-                ).T,
-                pd.DataFrame(y).T,
-            ],
-            axis=1,
-        ).to_csv(
-            "podi/data/energy_adoption_curves.csv",
-            mode="a",
-            header=None,
-            index=False,
+            columns=np.arange(data_end_year + 1, proj_end_year + 1, 1),
+            checkpoint=output_path + "energy_adoption_curves.npz",
         )
-
-        return
-
-    ef_ratio.parallel_apply(
-        lambda x: adoption_projection_demand(
-            parameters=parameters.loc[
-                x.name[0], x.name[1], x.name[2], x.name[3]
-            ],
-            input_data=x,
-            scenario=scenario,
-            data_end_year=data_end_year + 1,
-            saturation_year=2050,
-            proj_end_year=proj_end_year,
-        ),
-        axis=1,
-    )
-
-    ef_ratios = (
-        pd.DataFrame(
-            pd.read_csv("podi/data/energy_adoption_curves.csv", header=None)
-        )
-        .set_axis(
-            pd.concat(
-                [
-                    pd.DataFrame(
-                        np.array(
-                            ["region", "product_short", "scenario", "sector"]
-                        )
-                    ).T,
-                    pd.DataFrame(
-                        np.linspace(
-                            data_end_year + 1,
-                            proj_end_year,
-                            proj_end_year - data_end_year,
-                        ).astype(int)
-                    ).T,
-                ],
-                axis=1,
-            ).squeeze(),
-            axis=1,
-        )
-        .set_index(["region", "sector", "product_short", "scenario"])
+        .droplevel("metric")
+        .reorder_levels(["region", "sector", "product_short", "scenario"])
     ).sort_index()
 
     # Prepare df for multiplication with energy
-    ef_ratios = ef_ratios.parallel_apply(
-        lambda x: 1 - (1 - x.max()) * (x - x.min()) / x.max(), axis=1
+    ef_ratios = ef_ratios.pipe(
+        executor.apply,
+        lambda x: 1 - (1 - x.max()) * (x - x.min()) / x.max(),
+        axis=1,
     )
 
     ef_ratios = (
@@ -1363,7 +1188,7 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     ef_ratios = ef_ratios.loc[:, : energy_baseline.columns[-1]]
     ef_ratios = ef_ratios.sort_index()
 
-    ef_ratios.to_csv("podi/data/energy_ef_ratios.csv")
+    ef_ratios.to_csv(output_path + "energy_ef_ratios.csv")
 
     # Add labels to ef_ratios
     labels = (
@@ -1439,8 +1264,10 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
 
     upstream_ratios.update(
         upstream_ratios[upstream_ratios.index.get_level_values(4) == "Y"]
-        .parallel_apply(
-            lambda x: 1 - (x.max() - x) / (x.max() - x.min()), axis=1
+        .pipe(
+            executor.apply,
+            lambda x: 1 - (x.max() - x) / (x.max() - x.min()),
+            axis=1,
         )
         .fillna(0)
     )
@@ -1459,13 +1286,12 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
 
     # region
 
-    energy_post_upstream = energy_baseline.parallel_apply(
-        lambda x: x.mul(
-            upstream_ratios.loc[
-                x.name[2], x.name[3], x.name[6], x.name[9]
-            ].squeeze()
+    energy_post_upstream = broadcast.multiply(
+        energy_baseline,
+        upstream_ratios.droplevel(
+            ["WWS Upstream Product", "WWS Addtl Efficiency"]
         ),
-        axis=1,
+        ["region", "sector", "product_short", "flow_short"],
     )
     energy_post_upstream.rename(index={"baseline": scenario}, inplace=True)
 
@@ -1476,7 +1302,7 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     # region
 
     addtl_eff = pd.DataFrame(
-        pd.read_csv("podi/data/energy_ef_ratios.csv")
+        pd.read_csv(output_path + "energy_ef_ratios.csv")
     ).set_index(["scenario", "region", "sector", "product_short"])
     addtl_eff.columns = addtl_eff.columns.astype(int)
 
@@ -1515,11 +1341,10 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     addtl_eff = addtl_eff[~addtl_eff.index.duplicated()]
     addtl_eff = addtl_eff.sort_index()
 
-    energy_post_addtl_eff = energy_post_upstream.parallel_apply(
-        lambda x: x.mul(
-            addtl_eff.loc[x.name[2], x.name[3], x.name[6], x.name[9]].squeeze()
-        ),
-        axis=1,
+    energy_post_addtl_eff = broadcast.multiply(
+        energy_post_upstream,
+        addtl_eff,
+        ["region", "sector", "product_short", "flow_short"],
     )
 
     # endregion
@@ -1534,39 +1359,26 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     # undergoes electrification in each year. This does not count preexisting
     # electricity, except for nuclear, which is estimated to shift to renewables, and
     # is treated in subsequent steps.
-    energy_electrified = energy_post_addtl_eff.parallel_apply(
-        lambda x: x.mul(
-            (
-                (
-                    ef_ratios.loc[x.name[2], x.name[3], x.name[6], x.name[9]]
-                    .squeeze()
-                    .iloc[0]
-                    - ef_ratios.loc[
-                        x.name[2], x.name[3], x.name[6], x.name[9]
-                    ].squeeze()
-                )
-                / (
-                    ef_ratios.loc[x.name[2], x.name[3], x.name[6], x.name[9]]
-                    .squeeze()
-                    .iloc[0]
-                    - ef_ratios.loc[x.name[2], x.name[3], x.name[6], x.name[9]]
-                    .squeeze()
-                    .iloc[-1]
-                )
-            ).fillna(0)
-        ),
-        axis=1,
+    ef_ratios = ef_ratios.droplevel(
+        ["WWS Upstream Product", "WWS Addtl Efficiency"]
+    )
+
+    energy_electrified = broadcast.multiply(
+        energy_post_addtl_eff,
+        (
+            ef_ratios.rsub(ef_ratios.iloc[:, 0], axis=0).divide(
+                ef_ratios.iloc[:, 0] - ef_ratios.iloc[:, -1], axis=0
+            )
+        ).fillna(0),
+        ["region", "sector", "product_short", "flow_short"],
     )
 
     # Find the reduced amount of electrical energy that represents an equivalent amount
     # of work to that of the energy that undergoes electrification.
-    energy_reduced_electrified = energy_electrified.parallel_apply(
-        lambda x: x.mul(
-            ef_ratios.loc[x.name[2], x.name[3], x.name[6], x.name[9]]
-            .squeeze()
-            .iloc[-1]
-        ),
-        axis=1,
+    energy_reduced_electrified = broadcast.multiply(
+        energy_electrified,
+        ef_ratios.iloc[:, -1],
+        ["region", "sector", "product_short", "flow_short"],
     )
 
     # Find the electrical energy from fossil fuels assumed to shift to renewables
@@ -1741,7 +1553,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         & ((energy_post_electrification.reset_index().nonenergy == "N").values)
     ]
 
-    per_elec_supply = elec_supply.parallel_apply(
+    per_elec_supply = elec_supply.pipe(
+        executor.apply,
         lambda x: x.divide(
             elec_supply.groupby(["region"], observed=True)
             .sum(0)
@@ -1765,135 +1578,37 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     ).set_index(["region", "product_short", "scenario", "sector", "metric"])
     parameters = parameters.sort_index()
 
-    def adoption_projection(
-        input_data,
-        saturation_date,
-        output_end_date,
-        change_model,
-        change_parameters,
-    ):
-        def linear(x, a, b, c, d):
-            return a * x + d
-
-        def logistic(x, a, b, c, d):
-            return c / (1 + np.exp(-a * (x - b))) + d
-
-        # Take 10 years prior data to fit logistic function
-        x_data = np.arange(
-            0, output_end_date - input_data.last_valid_index() + 11, 1
-        )
-        y_data = np.zeros((1, len(x_data)))
-        y_data[:, :] = np.NaN
-        y_data = y_data.squeeze().astype(float)
-        y_data[:11] = input_data.loc[
-            input_data.last_valid_index() - 10 : input_data.last_valid_index()
-        ]
-        y_data[
-            saturation_date - input_data.last_valid_index()
-        ] = change_parameters.loc["saturation point"].value.astype(float)
-
-        # Handle cases where saturation point is below current value, by making
-        # saturation point equidistant from current value but in positive direction
-        if y_data[10] > y_data[-1]:
-            y_data[-1] = y_data[10] + abs(y_data[-1] - y_data[10])
-
-        y_data = np.array(
-            (pd.DataFrame(y_data).interpolate(method="linear")).squeeze()
-        )
-
-        # Load search bounds for logistic function parameters
-        search_bounds = [
-            (
-                pd.to_numeric(change_parameters.loc["parameter a min"].value),
-                pd.to_numeric(change_parameters.loc["parameter a max"].value),
-            ),
-            (
-                pd.to_numeric(change_parameters.loc["parameter b min"].value),
-                pd.to_numeric(change_parameters.loc["parameter b max"].value),
-            ),
-            (
-                pd.to_numeric(change_parameters.loc["saturation point"].value),
-                pd.to_numeric(change_parameters.loc["saturation point"].value),
-            ),
-            (
-                y_data[10],
-                y_data[10],
-            ),
-        ]
-
-        # Define sum of squared error function
-        def sum_of_squared_error(change_parameters):
-            return np.sum(
-                (y_data - logistic(x_data, *change_parameters)) ** 2.0
-            )
-
-        # Generate genetic_parameters. For baseline scenarios, projections are linear
-        if change_model == "linear":
-            y = linear(
-                x_data,
-                min(
-                    0.04,
-                    max(0.00001, ((y_data[-1] - y_data[0]) / len(y_data))),
-                ),
-                0,
-                0,
-                y_data[10],
-            )
-            genetic_parameters = [0, 0, 0, 0]
-        else:
-            genetic_parameters = differential_evolution(
-                sum_of_squared_error,
-                search_bounds,
-                seed=3,
-                polish=False,
-                updating="immediate",
-                mutation=(0, 1),
-            ).x
-
-            y = np.array(logistic(np.arange(0, 500, 1), *genetic_parameters))
-
-        # Rejoin with input data at point where projection curve results in smooth
-        # growth
-        y = np.concatenate(
-            [
-                input_data.loc[: input_data.last_valid_index()].values,
-                y[
-                    y >= input_data.loc[input_data.last_valid_index()]
-                ].squeeze(),
-            ]
-        )[: (output_end_date + 1 - input_data.first_valid_index())]
-
-        return pd.Series(
-            data=y[
-                : len(
-                    np.arange(
-                        input_data.first_valid_index(), output_end_date + 1, 1
-                    )
+    # Align parameters for adoption.project_supply() with each row (region,
+    # product_short, sector) of a DataFrame
+    def adoption_parameters(input_data):
+        return (
+            parameters["value"]
+            .unstack("metric")
+            .reindex(
+                pd.MultiIndex.from_arrays(
+                    [
+                        input_data.index.get_level_values(2),
+                        input_data.index.get_level_values(6),
+                        [scenario] * len(input_data),
+                        input_data.index.get_level_values(3),
+                    ]
                 )
-            ],
-            index=np.arange(
-                input_data.first_valid_index(), output_end_date + 1, 1
-            ),
-            name=input_data.name,
+            )
         )
 
     per_elec_supply.update(
-        per_elec_supply[
-            per_elec_supply.index.get_level_values(6).isin(renewables)
-        ]
-        .parallel_apply(
-            lambda x: adoption_projection(
-                input_data=x.loc[:data_end_year],
-                saturation_date=2050,
-                output_end_date=proj_end_year,
-                change_model="logistic",
-                change_parameters=parameters.loc[
-                    x.name[2], x.name[6], scenario, x.name[3]
-                ],
+        adoption.project_supply(
+            input_data=per_elec_supply[
+                per_elec_supply.index.get_level_values(6).isin(renewables)
+            ].loc[:, :data_end_year],
+            parameters=adoption_parameters(
+                per_elec_supply[
+                    per_elec_supply.index.get_level_values(6).isin(renewables)
+                ]
             ),
-            axis=1,
-        )
-        .clip(upper=1)
+            saturation_date=2050,
+            output_end_date=proj_end_year,
+        ).clip(upper=1)
     )
 
     # Estimate the rate of nonrenewable electricity generation being replaced by
@@ -1905,7 +1620,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
                     pd.concat([pd.Series(renewables), pd.Series("RELECTR")])
                 )
             ]
-            .parallel_apply(
+            .pipe(
+                executor.apply,
                 lambda x: x.multiply(
                     per_elec_supply[
                         per_elec_supply.index.get_level_values(6).isin(
@@ -1927,7 +1643,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
                     pd.concat([pd.Series(renewables), pd.Series("RELECTR")])
                 )
             ]
-            .parallel_apply(
+            .pipe(
+                executor.apply,
                 lambda x: x.multiply(
                     per_elec_supply[
                         per_elec_supply.index.get_level_values(6).isin(
@@ -1958,7 +1675,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
                     pd.concat([pd.Series(renewables), pd.Series("RELECTR")])
                 )
             ]
-            .parallel_apply(
+            .pipe(
+                executor.apply,
                 lambda x: x.multiply(
                     1
                     - per_elec_supply[
@@ -1981,7 +1699,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
                     pd.concat([pd.Series(renewables), pd.Series("RELECTR")])
                 )
             ]
-            .parallel_apply(
+            .pipe(
+                executor.apply,
                 lambda x: x.multiply(
                     1
                     - per_elec_supply[
@@ -2013,8 +1732,10 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         ~elec_supply.index.get_level_values(6).isin(
             pd.concat([pd.Series(renewables), pd.Series("RELECTR")])
         )
-    ].parallel_apply(
-        lambda x: (x + nonrenew.loc[x.name]).clip(lower=0), axis=1
+    ].pipe(
+        executor.apply,
+        lambda x: (x + nonrenew.loc[x.name]).clip(lower=0),
+        axis=1,
     )
 
     # Set renewables generation to meet RELECTR in the proportion estimated by
@@ -2029,7 +1750,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
                 +per_elec_supply[
                     per_elec_supply.index.get_level_values(6).isin(renewables)
                 ]
-                .parallel_apply(
+                .pipe(
+                    executor.apply,
                     lambda x: x.multiply(
                         nonrenewable_to_renewable.groupby(
                             ["region"], observed=True
@@ -2110,7 +1832,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     elec_supply.drop(labels="RELECTR", level=6, inplace=True)
 
     # Recalculate percent of total consumption each technology meets
-    per_elec_supply = elec_supply.parallel_apply(
+    per_elec_supply = elec_supply.pipe(
+        executor.apply,
         lambda x: x.divide(
             elec_supply.groupby(["region"], observed=True)
             .sum(0)
@@ -2121,7 +1844,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
 
     # Recalculate elec_supply to cover energy_post_electrification product_long =
     # "Electricity" flow_category = "Final consumption"
-    elec_supply = per_elec_supply.parallel_apply(
+    elec_supply = per_elec_supply.pipe(
+        executor.apply,
         lambda x: x.multiply(
             energy_post_electrification[
                 (
@@ -2178,7 +1902,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         & ((energy_post_electrification.reset_index().nonenergy == "N").values)
     ]
 
-    per_heat_supply = heat_supply.parallel_apply(
+    per_heat_supply = heat_supply.pipe(
+        executor.apply,
         lambda x: x.divide(
             heat_supply.groupby(["region"], observed=True)
             .sum(0)
@@ -2190,22 +1915,18 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     # Use the historical percent of total heat consumption met by each renewable
     # product to estimate projected percent of total heat consumption each meets
     per_heat_supply.update(
-        per_heat_supply[
-            per_heat_supply.index.get_level_values(6).isin(renewables)
-        ]
-        .parallel_apply(
-            lambda x: adoption_projection(
-                input_data=x.loc[:data_end_year],
-                saturation_date=2050,
-                output_end_date=proj_end_year,
-                change_model="logistic",
-                change_parameters=parameters.loc[
-                    x.name[2], x.name[6], scenario, x.name[3]
-                ],
+        adoption.project_supply(
+            input_data=per_heat_supply[
+                per_heat_supply.index.get_level_values(6).isin(renewables)
+            ].loc[:, :data_end_year],
+            parameters=adoption_parameters(
+                per_heat_supply[
+                    per_heat_supply.index.get_level_values(6).isin(renewables)
+                ]
             ),
-            axis=1,
-        )
-        .clip(upper=1)
+            saturation_date=2050,
+            output_end_date=proj_end_year,
+        ).clip(upper=1)
     )
 
     # Set renewables heat generation to meet the amount estimated in Jacobson et al.
@@ -2213,7 +1934,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     heat_supply.update(
         per_heat_supply[
             per_heat_supply.index.get_level_values(6).isin(renewables)
-        ].parallel_apply(
+        ].pipe(
+            executor.apply,
             lambda x: x.multiply(
                 heat_supply[
                     heat_supply.index.get_level_values(6).isin(renewables)
@@ -2227,7 +1949,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     )
 
     # Recalculate percent of total consumption each technology meets
-    per_heat_supply = heat_supply.parallel_apply(
+    per_heat_supply = heat_supply.pipe(
+        executor.apply,
         lambda x: x.divide(
             heat_supply.groupby(["region"], observed=True)
             .sum(0)
@@ -2267,7 +1990,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
         & ((energy_post_electrification.reset_index().nonenergy == "N").values)
     ]
 
-    per_transport_supply = transport_supply.parallel_apply(
+    per_transport_supply = transport_supply.pipe(
+        executor.apply,
         lambda x: x.divide(
             transport_supply.groupby(["region"], observed=True)
             .sum(0)
@@ -2280,29 +2004,28 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     # renewable product to estimate projected percent of total heat consumption each
     # meets
     per_transport_supply.update(
-        per_transport_supply[
-            per_transport_supply.index.get_level_values(6).isin(renewables)
-        ]
-        .parallel_apply(
-            lambda x: adoption_projection(
-                input_data=x.loc[:data_end_year],
-                saturation_date=2050,
-                output_end_date=proj_end_year,
-                change_model="logistic",
-                change_parameters=parameters.loc[
-                    x.name[2], x.name[6], scenario, x.name[3]
-                ],
+        adoption.project_supply(
+            input_data=per_transport_supply[
+                per_transport_supply.index.get_level_values(6).isin(renewables)
+            ].loc[:, :data_end_year],
+            parameters=adoption_parameters(
+                per_transport_supply[
+                    per_transport_supply.index.get_level_values(6).isin(
+                        renewables
+                    )
+                ]
             ),
-            axis=1,
-        )
-        .clip(upper=1)
+            saturation_date=2050,
+            output_end_date=proj_end_year,
+        ).clip(upper=1)
     )
 
     # Set renewables nonelectric transport generation to meet the amount estimated
     transport_supply.update(
         per_transport_supply[
             per_transport_supply.index.get_level_values(6).isin(renewables)
-        ].parallel_apply(
+        ].pipe(
+            executor.apply,
             lambda x: x.multiply(
                 transport_supply[
                     transport_supply.index.get_level_values(6).isin(renewables)
@@ -2316,7 +2039,8 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
     )
 
     # Recalculate percent of total consumption each technology meets
-    per_transport_supply = transport_supply.parallel_apply(
+    per_transport_supply = transport_supply.pipe(
+        executor.apply,
         lambda x: x.divide(
             transport_supply.groupby(["region"], observed=True)
             .sum(0)
@@ -2397,7 +2121,7 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
             ],
             observed=True,
         ).sum(numeric_only=True).sort_index().to_parquet(
-            "podi/data/" + output[1] + ".parquet", compression="brotli"
+            output_path + output[1] + ".parquet", compression="brotli"
         )
         output[0].columns = output[0].columns.astype(int)
 
@@ -2424,4 +2148,92 @@ def energy(model, scenario, data_start_year, data_end_year, proj_end_year):
 
     # endregion
 
-    return
+    return {
+        "energy_post_upstream": energy_post_upstream,
+        "energy_post_addtl_eff": energy_post_addtl_eff,
+        "energy_electrified": energy_electrified,
+        "energy_reduced_electrified": energy_reduced_electrified,
+        "energy_output": energy_output,
+        "energy_percent": energy_percent,
+    }
+
+
+def load_regions():
+    # Return the regions of the IEA World Energy Balances that are modeled
+    return (
+        pd.read_csv("podi/data/IEA/Regions.txt").squeeze("columns").str.lower()
+    )
+
+
+def region_shards(regions):
+    """
+    Group regions by their EIA region, since baseline energy is projected by
+    EIA region. Regions without an EIA region are dropped by energy() when
+    it matches EIA projections, so they are left out. Returns lists of
+    regions by shard name.
+    """
+    eia_regions = (
+        pd.read_csv(
+            "podi/data/region_categories.csv",
+            usecols=["WEB Region", "EIA Region"],
+        )
+        .dropna(axis=0)
+        .assign(region=lambda x: x["WEB Region"].str.lower())
+        .drop_duplicates("region")
+        .set_index("region")["EIA Region"]
+    )
+    eia_regions = eia_regions[eia_regions.index.isin(regions)]
+
+    return {
+        str(name): list(shard.index)
+        for name, shard in eia_regions.groupby(eia_regions)
+    }
+
+
+def energy_by_shard(
+    model, scenario, data_start_year, data_end_year, proj_end_year
+):
+    """
+    Run energy() separately for each shard of regions from region_shards(),
+    so that memory scales with the largest shard rather than all regions.
+    Each shard saves its intermediate files and outputs in its own directory
+    of shards_path, and its frames are dropped before the next shard runs.
+    No step of energy() uses other regions, so the outputs of the shards are
+    then concatenated, saved to podi/data, and returned as energy() returns
+    them (with the index levels and float32 values of the saved outputs).
+    """
+    # Outputs of a previous run may be from other inputs
+    if os.path.exists(shards_path):
+        shutil.rmtree(shards_path)
+
+    shards = region_shards(load_regions())
+    for i, (name, regions) in enumerate(shards.items()):
+        print(f"energy: shard {i + 1}/{len(shards)} ({name})")
+        output_path = shards_path + name + "/"
+        os.makedirs(output_path, exist_ok=True)
+
+        energy(
+            model,
+            scenario,
+            data_start_year,
+            data_end_year,
+            proj_end_year,
+            regions=regions,
+            output_path=output_path,
+        )
+
+    merged = {}
+    for output in outputs:
+        merged[output] = pd.concat(
+            [
+                pd.read_parquet(shards_path + name + "/" + output + ".parquet")
+                for name in shards
+            ]
+        ).sort_index()
+
+        merged[output].to_parquet(
+            "podi/data/" + output + ".parquet", compression="brotli"
+        )
+        merged[output].columns = merged[output].columns.astype(int)
+
+    return merged
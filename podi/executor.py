@@ -0,0 +1,251 @@
+# region
+
+import atexit
+import hashlib
+import multiprocessing
+import os
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+import dill
+import numpy as np
+import pandas as pd
+
+# endregion
+
+# Apply functions to the rows of DataFrames in a pool of worker processes, in
+# place of pandarallel. Use as df.pipe(executor.apply, function, axis=1), which
+# returns the same as df.apply(function, axis=1).
+#
+# Workers are started on the first apply that is large enough to split, and
+# are reused by every apply after it, so importing a stage module starts
+# nothing. Numeric columns of the frame are copied once into shared memory, one
+# block per dtype, and workers read their rows from it. The function, with the
+# frames its closure captures, is serialized once per apply into shared memory
+# rather than once per chunk, and workers keep the functions they loaded by a
+# hash of them, so that a closure applied again over the same state (e.g. in a
+# loop over years) is only loaded once by each worker.
+
+# Number of worker processes
+processes = os.cpu_count()
+
+# Frames with fewer rows than this are applied in this process, where the cost
+# of sharing them with workers outweighs splitting the work
+min_rows = 1000
+
+# Rows are split into this many chunks per worker, to balance the load
+chunks_per_process = 4
+
+# Number of functions each worker keeps
+cache_size = 8
+
+pool = None
+in_worker = False
+
+
+def start_worker():
+    # Applies in a worker run in the worker, since it can't start processes
+    global in_worker
+    in_worker = True
+
+
+def get_pool():
+    # Start the worker processes the first time they are needed. fork is used
+    # where available, as pandarallel did, so that workers start quickly.
+    global pool
+    if pool is None:
+        context = multiprocessing.get_context(
+            "fork"
+            if "fork" in multiprocessing.get_all_start_methods()
+            else None
+        )
+        pool = context.Pool(processes, initializer=start_worker)
+        atexit.register(shutdown)
+
+    return pool
+
+
+def worker_pids():
+    """
+    Return the process ids of the running workers, if any.
+    """
+    if pool is None:
+        return []
+
+    return [process.pid for process in pool._pool]
+
+
+def shutdown():
+    """
+    Stop the worker processes. They are started again by the next apply.
+    """
+    global pool
+    if pool is not None:
+        pool.terminate()
+        pool.join()
+        pool = None
+
+
+def share_bytes(data):
+    # Copy data into a new block of shared memory
+    block = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    block.buf[: len(data)] = data
+
+    return block
+
+
+def share_frame(df):
+    """
+    Copy the numeric columns of df into shared memory, one block per dtype.
+    Returns the blocks, and a serialized description of df that has the
+    names of the blocks, the index, and the other columns.
+    """
+    blocks = []
+    description = {
+        "index": df.index,
+        "columns": df.columns,
+        "blocks": [],
+        "others": {},
+    }
+
+    positions = {}
+    for position, dtype in enumerate(df.dtypes):
+        if pd.api.types.is_numeric_dtype(dtype) and not (
+            pd.api.types.is_bool_dtype(dtype)
+            or isinstance(dtype, pd.api.extensions.ExtensionDtype)
+        ):
+            positions.setdefault(np.dtype(dtype), []).append(position)
+        else:
+            description["others"][position] = df.iloc[:, position].to_numpy()
+
+    for dtype, dtype_positions in positions.items():
+        shape = (len(df), len(dtype_positions))
+        block = shared_memory.SharedMemory(
+            create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1)
+        )
+        blocks.append(block)
+
+        values = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        values[:] = df.iloc[:, dtype_positions].to_numpy(dtype=dtype)
+        del values
+
+        description["blocks"].append(
+            (block.name, dtype.str, shape, dtype_positions)
+        )
+
+    return blocks, dill.dumps(description)
+
+
+# State of each worker process: the functions it loaded by key, and the
+# description of the last frame it read
+functions = OrderedDict()
+frame = {}
+
+
+def read_bytes(name, size=None):
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(block.buf[:size] if size is not None else block.buf)
+    finally:
+        block.close()
+
+
+def load_function(key, name, size):
+    if key in functions:
+        functions.move_to_end(key)
+    else:
+        functions[key] = dill.loads(read_bytes(name, size))
+        if len(functions) > cache_size:
+            functions.popitem(last=False)
+
+    return functions[key]
+
+
+def load_chunk(name, size, start, stop):
+    # Return rows start to stop of the shared frame, as a DataFrame
+    if frame.get("name") != name:
+        frame.clear()
+        frame.update(dill.loads(read_bytes(name, size)), name=name)
+
+    data = {}
+    for block_name, dtype, shape, positions in frame["blocks"]:
+        block = shared_memory.SharedMemory(name=block_name)
+        try:
+            values = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            for j, position in enumerate(positions):
+                data[position] = values[start:stop, j].copy()
+            del values
+        finally:
+            block.close()
+
+    for position, values in frame["others"].items():
+        data[position] = values[start:stop]
+
+    chunk = pd.DataFrame(
+        {position: data[position] for position in sorted(data)},
+        index=frame["index"][start:stop],
+    )
+    chunk.columns = frame["columns"]
+
+    return chunk
+
+
+def apply_chunk(function, frame_block, start, stop):
+    # Run in a worker: apply the shared function to rows start to stop of the
+    # shared frame
+    function, args, kwargs = load_function(*function)
+    chunk = load_chunk(*frame_block, start, stop)
+
+    return chunk.apply(function, *args, **kwargs)
+
+
+def apply(df, function, *args, axis=0, **kwargs):
+    """
+    Return df.apply(function, *args, axis=axis, **kwargs), applying function
+    to chunks of rows of df in the worker processes if axis is 1. Applies
+    over columns, to Series, to frames of fewer than min_rows rows, and in
+    workers run in this process.
+    """
+    if isinstance(df, pd.Series):
+        return df.apply(function, *args, **kwargs)
+
+    if (
+        axis not in (1, "columns")
+        or len(df) < min_rows
+        or processes <= 1
+        or in_worker
+    ):
+        return df.apply(function, *args, axis=axis, **kwargs)
+
+    serialized = dill.dumps((function, args, {**kwargs, "axis": axis}))
+    key = hashlib.sha256(serialized).hexdigest()
+
+    blocks, description = share_frame(df)
+    function_block = share_bytes(serialized)
+    frame_block = share_bytes(description)
+    blocks += [function_block, frame_block]
+    try:
+        bounds = np.linspace(
+            0,
+            len(df),
+            min(processes * chunks_per_process, len(df)) + 1,
+            dtype=int,
+        )
+        results = get_pool().starmap(
+            apply_chunk,
+            [
+                (
+                    (key, function_block.name, len(serialized)),
+                    (frame_block.name, len(description)),
+                    start,
+                    stop,
+                )
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ],
+        )
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return pd.concat(results)
@@ -0,0 +1,148 @@
+# region
+
+import hashlib
+import sqlite3
+import time
+
+import numpy as np
+
+# endregion
+
+# Fitted adoption curve parameters are stored in a SQLite database of their own,
+# which isn't tracked by git, keyed by a hash of everything that determines a
+# fit. Entries that haven't been used recently are evicted once the table holds
+# more than max_entries fits.
+
+path = "cache/adoption_fits.db"
+max_entries = 100000
+
+
+def connect():
+    connection = sqlite3.connect(path, timeout=60)
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS adoption_fits ("
+        "key TEXT PRIMARY KEY, parameters BLOB, access_time REAL)"
+    )
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS adoption_fits_access_time "
+        "ON adoption_fits (access_time)"
+    )
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS adoption_fit_stats ("
+        "name TEXT PRIMARY KEY, value INTEGER)"
+    )
+    connection.execute(
+        "INSERT OR IGNORE INTO adoption_fit_stats VALUES "
+        "('hits', 0), ('misses', 0)"
+    )
+    return connection
+
+
+def keys(model, x_data, y_data, bounds, seed):
+    """
+    Hash each row of y_data (N, T) and bounds (N, D, 2) together with the
+    model name, x_data and seed into a key for that row's fit.
+    """
+    x_data = np.ascontiguousarray(x_data, dtype=float)
+    y_data = np.ascontiguousarray(y_data, dtype=float)
+    bounds = np.ascontiguousarray(bounds, dtype=float)
+
+    common = hashlib.sha256()
+    common.update(f"{model}|{seed}|{x_data.shape}|".encode())
+    common.update(x_data.tobytes())
+
+    result = []
+    for y_row, bounds_row in zip(y_data, bounds):
+        key = common.copy()
+        key.update(y_row.tobytes())
+        key.update(bounds_row.tobytes())
+        result.append(key.hexdigest())
+
+    return result
+
+
+def get(keys):
+    """
+    Return a dict of the cached parameters for those keys that have been
+    fitted before, and count the lookups as hits or misses.
+    """
+    with connect() as connection:
+        found = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            found.update(
+                connection.execute(
+                    "SELECT key, parameters FROM adoption_fits WHERE key IN "
+                    f"({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+            )
+        connection.executemany(
+            "UPDATE adoption_fits SET access_time = ? WHERE key = ?",
+            [(time.time(), key) for key in found],
+        )
+        connection.execute(
+            "UPDATE adoption_fit_stats SET value = value + ? "
+            "WHERE name = 'hits'",
+            (len(found),),
+        )
+        connection.execute(
+            "UPDATE adoption_fit_stats SET value = value + ? "
+            "WHERE name = 'misses'",
+            (len(keys) - len(found),),
+        )
+    connection.close()
+
+    return {
+        key: np.frombuffer(parameters, dtype=float)
+        for key, parameters in found.items()
+    }
+
+
+def put(keys, parameters):
+    """
+    Store the fitted parameters (N, D) under keys, then evict the least
+    recently used fits beyond max_entries.
+    """
+    with connect() as connection:
+        connection.executemany(
+            "INSERT OR REPLACE INTO adoption_fits VALUES (?, ?, ?)",
+            [
+                (key, np.asarray(row, dtype=float).tobytes(), time.time())
+                for key, row in zip(keys, parameters)
+            ],
+        )
+        connection.execute(
+            "DELETE FROM adoption_fits WHERE key NOT IN (SELECT key FROM "
+            "adoption_fits ORDER BY access_time DESC LIMIT ?)",
+            (max_entries,),
+        )
+    connection.close()
+
+
+def stats():
+    """
+    Return the number of cache hits and misses, and the number of fits held.
+    """
+    with connect() as connection:
+        result = dict(
+            connection.execute(
+                "SELECT name, value FROM adoption_fit_stats"
+            ).fetchall()
+        )
+        result["entries"] = connection.execute(
+            "SELECT COUNT(*) FROM adoption_fits"
+        ).fetchone()[0]
+    connection.close()
+
+    return result
+
+
+def clear():
+    """
+    Remove all cached fits and reset the hit and miss counters.
+    """
+    with connect() as connection:
+        connection.execute("DELETE FROM adoption_fits")
+        connection.execute("UPDATE adoption_fit_stats SET value = 0")
+    connection.close()
@@ -0,0 +1,125 @@
+# region
+
+import glob
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from numpy import NaN
+
+# endregion
+
+# Download IEA World Energy Balances. As of Q1 2023, this dataset must be
+# purchased. Choose the ZIP format of the 'World energy balances' file
+# available [here](https://www.iea.org/data-and-statistics/data-product/
+# world-energy-balances). Download the file to `podi/data/IEA` on your local
+# machine and extract it, then run convert_iea_to_parquet() once
+# (`python -m podi.iea`) to build the parquet dataset that energy() reads.
+
+iea_source = "podi/data/IEA/WBIG*.TXT"
+iea_dataset = "podi/data/IEA/world_energy_balances"
+
+colspecs = [(0, 15), (16, 31), (32, 47), (48, 63), (64, 70), (71, -1)]
+names = ["region", "product_short", "year", "flow_short", "unit", "value"]
+
+
+def convert_iea_to_parquet(
+    source=iea_source, destination=iea_dataset, chunksize=5000000
+):
+    """
+    Convert the fixed-width IEA World Energy Balances files matching source
+    into a parquet dataset partitioned by region, with dictionary-encoded
+    product, flow and unit columns.
+    """
+    if os.path.exists(destination):
+        shutil.rmtree(destination)
+
+    for i, path in enumerate(sorted(glob.glob(source))):
+        for j, chunk in enumerate(
+            pd.read_fwf(
+                path,
+                colspecs=colspecs,
+                names=names,
+                dtype={"value": "str"},
+                chunksize=chunksize,
+            )
+        ):
+            # Handle "x", "c", ".." qualifiers. IEA documentation is not clear
+            # on what "x" represents; "c" represents "confidential", ".."
+            # represents "not available". These become NaN and are dropped.
+            chunk["value"] = pd.to_numeric(chunk["value"], errors="coerce")
+            chunk = chunk.dropna(subset=["value"]).copy()
+
+            # Change from all caps to lowercase
+            chunk["region"] = chunk["region"].str.lower()
+            chunk["year"] = chunk["year"].astype(int)
+            for column in ["product_short", "flow_short", "unit"]:
+                chunk[column] = chunk[column].astype("category")
+
+            ds.write_dataset(
+                pa.Table.from_pandas(chunk, preserve_index=False),
+                destination,
+                format="parquet",
+                partitioning=["region"],
+                partitioning_flavor="hive",
+                basename_template=f"part-{i}-{j}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+
+
+def load_iea(data_start_year, data_end_year, regions=None):
+    """
+    Load historical energy from the parquet dataset as a DataFrame indexed by
+    region, product_short, flow_short and unit, with a column for each year
+    from data_start_year to data_end_year. Only the partitions of regions are
+    read if given.
+    """
+    dataset = ds.dataset(iea_dataset, format="parquet", partitioning="hive")
+
+    energy_historical = dataset.to_table(
+        columns=names,
+        filter=(
+            ds.field("region").isin(list(regions))
+            if regions is not None
+            else None
+        ),
+    ).to_pandas()
+    energy_historical["region"] = energy_historical["region"].astype(
+        "category"
+    )
+
+    # Format as a dataframe with timeseries as rows
+    energy_historical = pd.pivot_table(
+        energy_historical,
+        values="value",
+        index=["region", "product_short", "flow_short", "unit"],
+        columns="year",
+        observed=True,
+    )
+
+    # Not all regions have placeholders for all years, so they need to be created
+    energy_historical = pd.DataFrame(
+        index=energy_historical.index,
+        columns=np.arange(data_start_year, data_end_year + 1, 1),
+        data=NaN,
+    ).combine_first(energy_historical)
+
+    # Backfill missing data using oldest data point
+    energy_historical = energy_historical.fillna(method="backfill", axis=1)
+
+    # For rows with data only prior to data_start_year, front fill to data_start_year
+    energy_historical.update(
+        energy_historical[energy_historical.loc[:, data_start_year].isna()]
+        .loc[:, :data_start_year]
+        .fillna(method="ffill", axis=1)
+    )
+
+    # Filter for data start_year and data_end_year, which can be different depending on region/product/flow because data becomes available at different times
+    return energy_historical.loc[:, data_start_year:data_end_year]
+
+
+if __name__ == "__main__":
+    convert_iea_to_parquet()
@@ -0,0 +1,153 @@
+# region
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+# endregion
+
+# Turn the piecewise inputs of TNC's 'Positive Disruption NCS Verticals'
+# spreadsheet (rows of up to three values, each held for a duration in years)
+# into continuous yearly timeseries, for the whole table at once. Each row's
+# years are laid out as segments between its values with np.repeat, and filled
+# by linear interpolation. The timeseries are cached by a hash of the input
+# file and of this module, so stages that read the same file share one copy,
+# and a change to how they are built doesn't reuse stale copies.
+
+cache_path = "cache/piecewise/"
+
+
+def hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            sha.update(block)
+
+    return sha.hexdigest()
+
+
+def interpolate(values, offsets, length):
+    """
+    Return an array with a row for each row of values and length columns,
+    that passes through values[:, i] at column offsets[:, i] and is linear
+    in between. offsets start at 0 and are non-decreasing along each row;
+    where two are equal, the later value is used. The last offset must be
+    the same for every row, and at least length - 1.
+    """
+    offsets = np.asarray(offsets, dtype=int)
+    values = np.asarray(values, dtype=float)
+
+    # Segments run from each offset to the next, and the last value is held
+    # for one column
+    lengths = np.append(
+        np.diff(offsets, axis=1), np.ones((len(offsets), 1), dtype=int), axis=1
+    ).ravel()
+    segment = np.repeat(np.arange(len(lengths)), lengths)
+    step = (
+        np.arange(len(segment)) - (np.cumsum(lengths) - lengths)[segment]
+    ) / lengths[segment]
+
+    # Each segment runs towards the value at its end offset, which is the
+    # last of the values there if several have the same offset
+    following = np.append(values[:, 1:], values[:, -1:], axis=1)
+    for i in reversed(range(offsets.shape[1] - 2)):
+        following[:, i] = np.where(
+            offsets[:, i + 1] == offsets[:, i + 2],
+            following[:, i + 1],
+            following[:, i],
+        )
+
+    first = values.ravel()[segment]
+    last = following.ravel()[segment]
+
+    return (first + step * (last - first)).reshape(len(values), -1)[:, :length]
+
+
+def segments(path, variable):
+    """
+    Load the rows of path whose variable ('Subvertical|Metric') contains
+    variable, indexed in IAMC format, with missing values and durations
+    filled from the segment before them.
+    """
+    name = (
+        pd.read_csv(path)
+        .drop(columns=["Region Group", "Region"])
+        .rename(
+            columns={
+                "ISO": "region",
+                "Model": "model",
+                "Scenario": "scenario",
+                "Unit": "unit",
+            }
+        )
+    )
+    name["variable"] = name["Subvertical"] + "|" + name["Metric"]
+    name = name[name["variable"].str.contains(variable)]
+
+    name["Value 1"] = name["Value 1"].fillna(0)
+    for i in [2, 3]:
+        name[f"Value {i}"] = name[f"Value {i}"].fillna(name[f"Value {i - 1}"])
+        name[f"Duration {i} (Years)"] = name[f"Duration {i} (Years)"].fillna(
+            name[f"Duration {i - 1} (Years)"]
+        )
+
+    return name.set_index(["model", "scenario", "region", "variable", "unit"])
+
+
+def continuous(path, variable, scenario, start, end):
+    """
+    Return timeseries of the rows of path whose variable contains variable,
+    for the years start to end, with 'Pathway' renamed to scenario.
+
+    Each starts at Value 1 in year start, and changes linearly to Value 2
+    after Duration 1, which is at most end - start years. From there it
+    changes linearly to Value 3, which is reached the year after end, so
+    Duration 2 doesn't change the timeseries.
+    """
+    key = hashlib.sha256(
+        "|".join(
+            [
+                hash_file(__file__),
+                hash_file(path),
+                variable,
+                str(start),
+                str(end),
+            ]
+        ).encode()
+    ).hexdigest()
+    file = cache_path + key + ".parquet"
+
+    if os.path.exists(file):
+        timeseries = pd.read_parquet(file)
+        timeseries.columns = timeseries.columns.astype(int)
+    else:
+        name = segments(path, variable)
+
+        duration = name["Duration 1 (Years)"]
+        duration = duration.where(duration <= end - start, end - start)
+
+        timeseries = pd.DataFrame(
+            interpolate(
+                name[["Value 1", "Value 2", "Value 3"]],
+                np.stack(
+                    [
+                        np.zeros(len(name)),
+                        duration,
+                        np.full(len(name), end + 1 - start),
+                    ],
+                    axis=1,
+                ),
+                end + 1 - start,
+            ),
+            index=name.index,
+            columns=np.arange(start, end + 1, 1),
+        ).fillna(0)
+
+        os.makedirs(cache_path, exist_ok=True)
+        timeseries.columns = timeseries.columns.astype(str)
+        timeseries.to_parquet(file, compression="brotli")
+        timeseries.columns = timeseries.columns.astype(int)
+
+    return timeseries.rename(index={"Pathway": scenario}, level="scenario")
@@ -0,0 +1,349 @@
+# region
+
+import glob
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+import pandas as pd
+
+from podi import profiler
+from podi.afolu import afolu
+from podi.climate import climate
+from podi.emissions import emissions
+from podi.energy import energy
+from podi.results_analysis.results_analysis import results_analysis
+
+# endregion
+
+# Each stage declares the files it reads from podi/data, the run parameters it
+# takes, the artifacts it needs from other stages and the artifacts it returns
+# (and saves to podi/data as parquet, or to its file in output_paths). A stage
+# is rerun only if its fingerprint, made from all of these and the source of
+# its module and of the podi modules it imports, changed since its last run.
+# Fingerprints are kept in state_path.
+
+state_path = "cache/pipeline.json"
+
+# Files of the outputs that are not saved to podi/data
+output_paths = {
+    "emissions_double_count": "cache/emissions_double_count.parquet",
+}
+
+stages = {
+    "energy": {
+        "function": energy,
+        "parameters": [
+            "model",
+            "scenario",
+            "data_start_year",
+            "data_end_year",
+            "proj_end_year",
+            "energy_sharded",
+        ],
+        "inputs": [
+            "podi/data/IEA/Regions.txt",
+            "podi/data/IEA/world_energy_balances/*/*.parquet",
+            "podi/data/IEA/Other/IEA_Flow_Definitions.csv",
+            "podi/data/IEA/Other/IEA_Product_Definitions.csv",
+            "podi/data/EIA/EIA_IEO.xlsx",
+            "podi/data/IRENA/RE-ELECGEN_20220805-204524.csv",
+            "podi/data/product_flow_labels.csv",
+            "podi/data/region_categories.csv",
+            "podi/data/tech_parameters.csv",
+        ],
+        "upstream": [],
+        "outputs": [
+            "energy_post_upstream",
+            "energy_post_addtl_eff",
+            "energy_electrified",
+            "energy_reduced_electrified",
+            "energy_output",
+            "energy_percent",
+        ],
+    },
+    "afolu": {
+        "function": afolu,
+        "parameters": [
+            "scenario",
+            "data_start_year",
+            "data_end_year",
+            "proj_end_year",
+        ],
+        "inputs": [
+            "podi/data/APL/historical_observations.csv",
+            "podi/data/APL/max_extent.csv",
+            "podi/data/TNC/analog_mapping.csv",
+            "podi/data/TNC/analogs_modeled.csv",
+            "podi/data/TNC/avoided_subverticals_input.csv",
+            "podi/data/TNC/historical_observations.csv",
+            "podi/data/TNC/max_extent.csv",
+            "podi/data/region_categories.csv",
+            "podi/data/tagging_rules.csv",
+        ],
+        "upstream": [],
+        "outputs": ["afolu_historical", "afolu_output"],
+    },
+    "emissions": {
+        "function": emissions,
+        "parameters": [
+            "scenario",
+            "data_start_year",
+            "data_end_year",
+            "proj_end_year",
+        ],
+        "inputs": [
+            "podi/data/APL/flux.csv",
+            "podi/data/CEDS/*.csv",
+            "podi/data/EDGAR/*.xlsx",
+            "podi/data/FAO/Emissions_Totals_E_All_Data_NOFLAG.csv",
+            "podi/data/TNC/avoided_subverticals_input.csv",
+            "podi/data/TNC/flux.csv",
+            "podi/data/external/emissions_factors_efdb.csv",
+            "podi/data/region_categories.csv",
+            "podi/data/tagging_rules.csv",
+            "podi/data/tech_parameters.csv",
+            "podi/data/tech_parameters_afolu.csv",
+        ],
+        "upstream": ["energy_output", "afolu_output"],
+        "outputs": [
+            "emissions_output",
+            "emissions_output_co2e",
+            "emissions_output_co2e_metrics",
+            "emissions_double_count",
+        ],
+    },
+    "climate": {
+        "function": climate,
+        "parameters": [
+            "model",
+            "scenario",
+            "data_start_year",
+            "data_end_year",
+            "proj_end_year",
+            "climate_ensemble",
+        ],
+        "inputs": [
+            "podi/data/climate_unit_conversions.csv",
+            "podi/data/external/calibrated_constrained_parameters.csv",
+            "podi/data/external/climate-change.csv",
+            "podi/data/external/radiative_forcing_historical.csv",
+            "podi/data/external/temperature_change_historical.csv",
+        ],
+        "upstream": ["emissions_output", "emissions_output_co2e"],
+        "outputs": lambda config: [
+            "climate_output_concentration",
+            "climate_output_forcing",
+            "climate_output_temperature",
+            "climate_output_concentration_co2e",
+            "climate_output_forcing_co2e",
+        ]
+        + (
+            ["climate_output_temperature_ensemble"]
+            if config["climate_ensemble"]
+            else []
+        ),
+    },
+    "results_analysis": {
+        "function": results_analysis,
+        "parameters": [
+            "scenario",
+            "data_start_year",
+            "data_end_year",
+            "proj_end_year",
+        ],
+        "inputs": [
+            "podi/data/external/CHATTING_SPLICED.csv",
+            "podi/data/IEA/Other/IEA CCUS Projects Database 2023.xlsx",
+            "podi/data/ClimateTRACE/*.csv",
+            "podi/data/region_categories.csv",
+            "podi/data/tagging_rules.csv",
+        ],
+        "upstream": [
+            "energy_output",
+            "afolu_output",
+            "emissions_output",
+            "emissions_output_co2e",
+            "climate_output_concentration",
+            "climate_output_temperature",
+            "climate_output_forcing",
+        ],
+        "outputs": ["technology_adoption_output"],
+    },
+}
+
+
+def stage_outputs(stage, config):
+    # outputs is a list, or a function of config for stages whose outputs
+    # depend on the run parameters
+    if callable(stage["outputs"]):
+        return stage["outputs"](config)
+
+    return stage["outputs"]
+
+
+def output_path(name):
+    return output_paths.get(name, f"podi/data/{name}.parquet")
+
+
+class Artifacts(dict):
+    """
+    Stage outputs by name. Outputs of stages that were not rerun are read from
+    their files the first time they are used.
+    """
+
+    def __missing__(self, name):
+        self[name] = pd.read_parquet(output_path(name))
+        self[name].columns = self[name].columns.astype(int)
+
+        return self[name]
+
+
+def hash_file(path, state):
+    # Reuse the stored hash of a file if its size and modification time are
+    # unchanged
+    stat = os.stat(path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+
+    if state["files"].get(path, {}).get("stamp") != stamp:
+        sha = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                sha.update(block)
+        state["files"][path] = {"stamp": stamp, "hash": sha.hexdigest()}
+
+    return state["files"][path]["hash"]
+
+
+def hash_dataframe(df):
+    return hashlib.sha256(
+        pd.util.hash_pandas_object(df).values.tobytes()
+        + str(list(df.columns)).encode()
+    ).hexdigest()
+
+
+def source_files(function):
+    """
+    Return the source files of the module of function and of all podi
+    modules it imports, directly or through other podi modules.
+    """
+    found = set()
+    pending = [function.__module__]
+    while pending:
+        module = sys.modules[pending.pop()]
+        if module.__name__ in found:
+            continue
+        found.add(module.__name__)
+
+        for value in vars(module).values():
+            name = (
+                value.__name__
+                if inspect.ismodule(value)
+                else getattr(value, "__module__", None)
+            )
+            if (
+                isinstance(name, str)
+                and name.split(".")[0] == "podi"
+                and name in sys.modules
+            ):
+                pending.append(name)
+
+    return sorted(
+        os.path.relpath(inspect.getsourcefile(sys.modules[module]))
+        for module in found
+    )
+
+
+def fingerprint(name, config, state):
+    stage = stages[name]
+
+    # Input files that are missing are recorded as such, so that adding them
+    # later triggers a rerun
+    inputs = {}
+    for pattern in stage["inputs"]:
+        paths = sorted(glob.glob(pattern))
+        inputs[pattern] = [(path, hash_file(path, state)) for path in paths]
+
+    return hashlib.sha256(
+        json.dumps(
+            {
+                "parameters": [config[key] for key in stage["parameters"]],
+                "inputs": inputs,
+                "source": {
+                    path: hash_file(path, state)
+                    for path in source_files(stage["function"])
+                },
+                "upstream": [
+                    state["artifacts"].get(artifact)
+                    for artifact in stage["upstream"]
+                ],
+            },
+            sort_keys=True,
+        ).encode()
+    ).hexdigest()
+
+
+def run(config, force=(), profile=False):
+    """
+    Run the stages in order, skipping those whose fingerprint is unchanged and
+    whose outputs are saved. config holds the run parameters
+    (model, scenario, data_start_year, data_end_year, proj_end_year,
+    climate_ensemble, energy_sharded) and force lists stages to rerun
+    regardless. If profile is set, the stages that run are profiled by region
+    and the report is saved to profiler.report_path. Returns the Artifacts of
+    all stages.
+    """
+    state = {"stages": {}, "artifacts": {}, "files": {}}
+    if os.path.exists(state_path):
+        with open(state_path) as file:
+            state.update(json.load(file))
+
+    artifacts = Artifacts()
+    stage_profiler = profiler.Profiler()
+
+    for name, stage in stages.items():
+        stage_fingerprint = fingerprint(name, config, state)
+
+        if (
+            name not in force
+            and state["stages"].get(name) == stage_fingerprint
+            and all(
+                os.path.exists(output_path(output))
+                for output in stage_outputs(stage, config)
+            )
+        ):
+            print(f"{name}: up to date")
+            continue
+
+        print(f"{name}: running")
+        kwargs = {
+            **{key: config[key] for key in stage["parameters"]},
+            **{
+                artifact: artifacts[artifact] for artifact in stage["upstream"]
+            },
+        }
+        if profile:
+            # Save the report even if the stage fails, e.g. out of memory
+            try:
+                outputs = stage_profiler.profile(
+                    name, stage["function"], **kwargs
+                )
+            finally:
+                stage_profiler.save()
+        else:
+            outputs = stage["function"](**kwargs)
+
+        for output in stage_outputs(stage, config):
+            artifacts[output] = outputs[output]
+            state["artifacts"][output] = hash_dataframe(outputs[output])
+
+        # Save state after each stage, so that a failure in a later stage
+        # doesn't cause this one to rerun
+        state["stages"][name] = stage_fingerprint
+        os.makedirs(os.path.dirname(state_path), exist_ok=True)
+        with open(state_path, "w") as file:
+            json.dump(state, file, indent=2)
+
+    return artifacts
@@ -0,0 +1,215 @@
+# region
+
+import inspect
+import json
+import os
+import resource
+import sys
+import time
+
+import pandas as pd
+
+from podi import executor
+
+# endregion
+
+# Record the wall time, peak RSS and the size of the DataFrames held in local
+# variables for each '# region' block of the stage functions, by tracing the
+# lines of a stage function as it runs. Regions are labelled with the comment
+# before their '# region' line (or its line number if there is none), nested in
+# the labels of enclosing regions. Regions that run more than once are added
+# up. The peak RSS of the executor workers, which live across stages, is read
+# from each worker and added up in workers_peak_rss.
+
+report_path = "cache/memory_profile"
+
+
+def rss(pid="self"):
+    # Return the current and peak resident set size of process pid (this
+    # process by default), in bytes
+    try:
+        with open(f"/proc/{pid}/status") as file:
+            status = dict(line.split(":", 1) for line in file if ":" in line)
+        return (
+            int(status["VmRSS"].split()[0]) * 1024,
+            int(status["VmHWM"].split()[0]) * 1024,
+        )
+    except (OSError, KeyError):
+        if pid != "self":
+            return 0, 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return peak, peak
+
+
+def reset_peak(pid="self"):
+    # Reset the peak RSS of process pid, so that it is measured per region.
+    # This is only possible on Linux; elsewhere peaks are since the start.
+    try:
+        with open(f"/proc/{pid}/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def workers_peak_rss():
+    # Return the sum of the peak RSS of the executor workers, in bytes
+    return sum(rss(pid)[1] for pid in executor.worker_pids())
+
+
+def regions(function):
+    """
+    Return the label of the innermost region of each line of function, by
+    line number.
+    """
+    lines, first = inspect.getsourcelines(function)
+
+    labels = {}
+    stack = [function.__name__]
+    comment = None
+    for number, line in enumerate(lines, first):
+        text = line.strip()
+        if text == "# region":
+            stack.append(comment or f"line {number}")
+            comment = None
+        elif text == "# endregion":
+            if len(stack) > 1:
+                stack.pop()
+        elif text.startswith("#") and text.strip("# "):
+            comment = text.strip("# ")
+        labels[number] = " > ".join(stack)
+
+    return labels
+
+
+def frame_sizes(variables):
+    # Return the memory used by the DataFrames and Series in variables, in
+    # bytes, by variable name. memory_usage of a Series is a number, and of a
+    # DataFrame a Series of the memory of each column.
+    return {
+        name: int(
+            pd.Series(value.memory_usage(index=True, deep=False)).sum()
+        )
+        for name, value in variables.items()
+        if isinstance(value, (pd.DataFrame, pd.Series))
+    }
+
+
+class Profiler:
+    """
+    Collects a record for each region of the stage functions run with
+    profile(), and saves them as a report with save().
+    """
+
+    def __init__(self):
+        self.records = {}
+
+    def profile(self, stage, function, **kwargs):
+        """
+        Run function with kwargs, recording each of its regions under stage.
+        Returns the result of function.
+        """
+        labels = regions(function)
+        code = function.__code__
+        current = {"label": None}
+
+        def checkpoint(frame):
+            if current["label"] is None:
+                return
+
+            now, peak = rss()
+            record = self.records.setdefault(
+                (stage, current["label"]),
+                {
+                    "stage": stage,
+                    "region": current["label"],
+                    "runs": 0,
+                    "seconds": 0.0,
+                    "rss": 0,
+                    "peak_rss": 0,
+                    "workers_peak_rss": 0,
+                    "frames": {},
+                },
+            )
+            record["runs"] += 1
+            record["seconds"] += time.perf_counter() - current["start"]
+            record["rss"] = now
+            record["peak_rss"] = max(record["peak_rss"], peak)
+            record["workers_peak_rss"] = max(
+                record["workers_peak_rss"], workers_peak_rss()
+            )
+            record["frames"] = frame_sizes(frame.f_locals)
+
+        def trace_lines(frame, event, arg):
+            if event == "line":
+                label = labels.get(frame.f_lineno, stage)
+                if label != current["label"]:
+                    checkpoint(frame)
+                    reset_peak()
+                    for pid in executor.worker_pids():
+                        reset_peak(pid)
+                    current["label"] = label
+                    current["start"] = time.perf_counter()
+            elif event == "return":
+                checkpoint(frame)
+                current["label"] = None
+            return trace_lines
+
+        def trace_calls(frame, event, arg):
+            # Only trace the lines of the stage function itself
+            if frame.f_code is code:
+                return trace_lines
+            return None
+
+        previous = sys.gettrace()
+        sys.settrace(trace_calls)
+        try:
+            return function(**kwargs)
+        finally:
+            sys.settrace(previous)
+
+    def report(self):
+        """
+        Return the records as a DataFrame with a row per region, with sizes
+        in MB and the five largest DataFrames alive at the end of each.
+        """
+        report = pd.DataFrame(list(self.records.values()))
+        if report.empty:
+            return report
+
+        for column in ["rss", "peak_rss", "workers_peak_rss"]:
+            report[column] = report[column] / 1e6
+        report["frames_total"] = report["frames"].apply(
+            lambda x: sum(x.values()) / 1e6
+        )
+        report["largest_frames"] = report["frames"].apply(
+            lambda x: ", ".join(
+                f"{name}: {size / 1e6:.1f}"
+                for name, size in sorted(
+                    x.items(), key=lambda item: item[1], reverse=True
+                )[:5]
+            )
+        )
+
+        return report.drop(columns="frames").rename(
+            columns={
+                "rss": "rss_mb",
+                "peak_rss": "peak_rss_mb",
+                "workers_peak_rss": "workers_peak_rss_mb",
+                "frames_total": "frames_mb",
+                "largest_frames": "largest_frames_mb",
+            }
+        )
+
+    def save(self, path=report_path):
+        """
+        Save the records as path.json, with the size of every DataFrame, and
+        the report as an HTML table in path.html.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path + ".json", "w") as file:
+            json.dump(list(self.records.values()), file, indent=2)
+
+        self.report().to_html(
+            path + ".html", index=False, float_format="{:.2f}".format
+        )
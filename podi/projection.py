@@ -0,0 +1,114 @@
+# region
+
+import numpy as np
+import pandas as pd
+
+# endregion
+
+# Project timeseries (rows of a DataFrame with year columns) forward in time on
+# the whole array at once, rather than row by row.
+
+
+def last_valid(df):
+    """
+    Return the column label of the last non-NaN value in each row of df, as
+    an array. Rows that are all NaN get the last column label.
+    """
+    valid = df.notna().to_numpy()
+
+    return df.columns.to_numpy()[
+        df.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)
+    ]
+
+
+def first_valid(df):
+    """
+    Return the column label of the first non-NaN value in each row of df, as
+    an array. Rows that are all NaN get the first column label.
+    """
+    return df.columns.to_numpy()[df.notna().to_numpy().argmax(axis=1)]
+
+
+def project(df, mode, start=None, end=None):
+    """
+    Project the rows of df, a DataFrame with year columns, using one of the
+    modes:
+
+    "cumprod": replace the values from year start onward by their cumulative
+    product along each row, e.g. to turn growth rates into levels.
+    "cumsum": replace the values from year start onward by their cumulative
+    sum along each row, e.g. to turn annual changes into levels.
+    "linear": extend each row beyond its last valid value, through year end,
+    along the slope between its last two valid values. Raises ValueError if
+    a row has fewer than two valid values.
+
+    start is a year or an array with a year for each row, and defaults to the
+    first column. NaN values are skipped by cumprod and cumsum as they are in
+    pandas. The dtype of df is preserved.
+    """
+    if mode == "linear":
+        return extrapolate(df, end)
+
+    if start is None:
+        start = df.columns[0]
+
+    values = df.to_numpy()
+    mask = (
+        df.columns.to_numpy()[np.newaxis, :]
+        >= np.broadcast_to(start, (len(df),))[:, np.newaxis]
+    )
+    nan = np.isnan(values)
+
+    if mode == "cumprod":
+        projected = np.cumprod(np.where(mask & ~nan, values, 1), axis=1)
+    elif mode == "cumsum":
+        projected = np.cumsum(np.where(mask & ~nan, values, 0), axis=1)
+    else:
+        raise ValueError(f"Unknown projection mode '{mode}'")
+
+    return pd.DataFrame(
+        np.where(mask & ~nan, projected, values).astype(values.dtype),
+        index=df.index,
+        columns=df.columns,
+    )
+
+
+def extrapolate(df, end):
+    # Take the slope of the last two valid values of each row, and use it to
+    # extrapolate from the last valid value through end
+    short = df.notna().sum(axis=1) < 2
+    if short.any():
+        raise ValueError(
+            "Rows with fewer than two valid values can't be extrapolated: "
+            f"{list(df.index[short.to_numpy()])}"
+        )
+
+    last = last_valid(df)
+    dtype = np.result_type(*df.dtypes)
+    df = df.reindex(
+        columns=df.columns.union(pd.RangeIndex(last.min(), end + 1))
+    )
+    years = df.columns.to_numpy()
+    values = df.to_numpy()
+    rows = np.arange(len(df))
+
+    penultimate = last_valid(df.where(years[np.newaxis, :] < last[:, None]))
+
+    last_value = values[rows, df.columns.get_indexer(last)]
+    slope = (
+        last_value - values[rows, df.columns.get_indexer(penultimate)]
+    ) / (last - penultimate)
+
+    extrapolated = last_value[:, None] + slope[:, None] * (
+        years[np.newaxis, :] - last[:, None]
+    )
+
+    return pd.DataFrame(
+        np.where(
+            np.isnan(values) & (years[np.newaxis, :] > last[:, None]),
+            extrapolated,
+            values,
+        ).astype(dtype),
+        index=df.index,
+        columns=df.columns,
+    )
@@ -6,6 +6,8 @@ import pandas as pd
 from langchain.agents import create_pandas_dataframe_agent
 from langchain.llms import OpenAI
 
+from podi import tagging
+
 # endregion
 
 
@@ -682,6 +684,9 @@ def results_analysis(
     technology_adoption_output.to_parquet(
         "podi/data/technology_adoption_output.parquet", compression="brotli"
     )
+    technology_adoption_output.columns = (
+        technology_adoption_output.columns.astype(int)
+    )
 
     # endregion
 
@@ -946,27 +951,8 @@ def results_analysis(
     )
 
     # Update Sector index
-    def addsector4(x):
-        if x["sector"] in ["power"]:
-            return "Electric Power"
-        elif x["sector"] in ["transport", "maritime"]:
-            return "Transportation"
-        elif x["sector"] in ["buildings"]:
-            return "Buildings"
-        elif x["sector"] in [
-            "extraction",
-            "manufacturing",
-            "oil and gas",
-            "waste",
-        ]:
-            return "Industrial"
-        elif x["sector"] in ["agriculture"]:
-            return "Agriculture"
-        elif x["sector"] in ["forests"]:
-            return "Forests & Wetlands"
-
-    emissions_historical["sector"] = emissions_historical.parallel_apply(
-        lambda x: addsector4(x), axis=1
+    emissions_historical["sector"] = tagging.tag(
+        "climatetrace_sector", emissions_historical["sector"]
     )
 
     emissions_historical = (
@@ -1052,4 +1038,4 @@ def results_analysis(
 
     # endregion
 
-    return
+    return {"technology_adoption_output": technology_adoption_output}
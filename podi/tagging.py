@@ -0,0 +1,72 @@
+# region
+
+import functools
+
+import numpy as np
+import pandas as pd
+
+# endregion
+
+# Tag rows with labels (e.g. sector or gas) from the rule table in
+# podi/data/tagging_rules.csv, instead of a Python function per row. Each rule
+# set is a list of rules, tried in order, that match the key of a row either
+# exactly or by a regular expression, and give it a value. Rules are only
+# matched against the unique keys, and the values are looked up for the rows by
+# the codes of their keys.
+
+rules_path = "podi/data/tagging_rules.csv"
+
+
+@functools.lru_cache()
+def load(path=rules_path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def on_unique(values, function):
+    """
+    Return function applied to the unique values of values, as an array with
+    an element for each of values. function takes and returns an Index, e.g.
+    lambda x: x.str.replace(...).
+    """
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+
+    return np.asarray(function(pd.Index(uniques)), dtype=object)[codes]
+
+
+def tag(name, *keys, path=rules_path):
+    """
+    Return the value of the first rule of the rule set name that matches each
+    row of keys, as an array, or None for rows that no rule matches. keys are
+    one or more arrays, Series or Index levels; a row's key is its values
+    joined by '|'.
+    """
+    rules = load(path)
+    rules = rules[rules["rules"] == name].reset_index(drop=True)
+    if rules.empty:
+        raise ValueError(f"Unknown rule set '{name}'")
+
+    if len(keys) == 1:
+        codes, uniques = pd.factorize(keys[0], use_na_sentinel=False)
+        uniques = pd.Index(uniques).astype(str)
+    else:
+        codes, uniques = pd.factorize(
+            pd.MultiIndex.from_arrays(keys), use_na_sentinel=False
+        )
+        uniques = pd.Index(["|".join(map(str, key)) for key in uniques])
+
+    # Find the first rule that matches each unique key, or len(rules) if none
+    first = np.full(len(uniques), len(rules))
+
+    exact = rules[rules["match"] == "exact"]
+    exact = exact[~exact["pattern"].duplicated()]
+    position = pd.Index(exact["pattern"]).get_indexer(uniques)
+    first = np.where(position >= 0, exact.index.to_numpy()[position], first)
+
+    for i, rule in rules[rules["match"] != "exact"].iterrows():
+        if rule["match"] != "regex":
+            raise ValueError(f"Unknown match '{rule['match']}' in '{name}'")
+        first = np.where(
+            uniques.str.fullmatch(rule["pattern"]) & (i < first), i, first
+        )
+
+    return np.append(rules["value"].to_numpy(dtype=object), None)[first][codes]
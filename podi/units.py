@@ -0,0 +1,151 @@
+# region
+
+import functools
+
+import globalwarmingpotentials as gwp
+import numpy as np
+import pandas as pd
+
+# endregion
+
+# Convert units by gas for whole frames at once, by mapping the gas level of
+# their index to a factor for each row, instead of looking up the factor of
+# each row in parallel_apply.
+
+climate_unit_conversions_path = "podi/data/climate_unit_conversions.csv"
+
+# GWP values that are missing from the globalwarmingpotentials library, by
+# version. BC over 20 years is from AR5 WG1 Table 8.A.6; the other gases are
+# not counted in CO2e.
+gwp_additions = {
+    **{
+        version: {
+            "CO2": 1,
+            "BC": 500,
+            "CO": 0,
+            "NH3": 0,
+            "NMVOC": 0,
+            "NOx": 0,
+            "OC": 0,
+            "SO2": 0,
+        }
+        for version in [
+            "SARGWP100",
+            "TARGWP100",
+            "AR4GWP100",
+            "AR5GWP100",
+            "AR5CCFGWP100",
+            "AR6GWP100",
+        ]
+    },
+    "AR6GWP20": {
+        "CO2": 1,
+        "BC": 3200,
+        "CO": 0,
+        "NH3": 0,
+        "NMVOC": 0,
+        "NOx": 0,
+        "OC": 0,
+        "SO2": 0,
+    },
+}
+
+# Gas names that differ in the globalwarmingpotentials library
+gwp_names = {
+    "HCFC-141b": "HCFC141b",
+    "HCFC-142b": "HCFC142b",
+    "HFC-125": "HFC125",
+    "HFC-134a": "HFC134a",
+    "HFC-143a": "HFC143a",
+    "HFC-152a": "HFC152a",
+    "HFC-227ea": "HFC227ea",
+    "HFC-245fa": "HFC245fa",
+    "HFC-32": "HFC32",
+    "HFC-365mfc": "HFC365mfc",
+    "HFC-23": "HFC23",
+    "c-C4F8": "cC4F8",
+    "HFC-134": "HFC134",
+    "HFC-143": "HFC143",
+    "HFC-236fa": "HFC236fa",
+    "HFC-41": "HFC41",
+    "HFC-43-10-mee": "HFC4310mee",
+}
+
+
+@functools.lru_cache()
+def climate_unit_conversions():
+    """
+    Return the factors that convert emissions_output units to the units
+    assumed by FaIR, by gas.
+    """
+    return (
+        pd.read_csv(climate_unit_conversions_path, usecols=["value", "gas"])
+        .set_index("gas")["value"]
+        .groupby(level=0)
+        .first()
+    )
+
+
+def gwp_factors(version):
+    """
+    Return the GWP of each gas in version (e.g. 'AR6GWP100'), by the gas
+    names used in emissions_output. Raises KeyError if gwp_additions has no
+    values for version.
+    """
+    if version not in gwp_additions:
+        raise KeyError(f"No GWP additions for '{version}'")
+
+    factors = pd.Series({**gwp.data[version], **gwp_additions[version]})
+
+    return factors.rename(index={v: k for k, v in gwp_names.items()})
+
+
+def convert(df, factors, level="product_short", keys=None):
+    """
+    Multiply each row of df by the factor of its gas, the value of level in
+    its index. keys optionally maps gas names to the index of factors first.
+    Raises KeyError if a gas has no factor.
+    """
+    gases = df.index.get_level_values(level)
+    if keys is not None:
+        gases = gases.map(keys)
+
+    missing = gases.unique().difference(factors.index)
+    if len(missing) > 0:
+        raise KeyError(f"No conversion factor for {list(missing)}")
+
+    return df.multiply(factors.reindex(gases).to_numpy(), axis=0)
+
+
+def co2e(df, versions, level="product_short"):
+    """
+    Convert df to CO2e with each GWP version in versions (e.g. 'AR6GWP100',
+    'AR6GWP20') in one multiply. Returns the rows of df for each version,
+    with the version in an added 'metric' index level.
+    """
+    gases = df.index.get_level_values(level)
+
+    factors = pd.concat(
+        {version: gwp_factors(version) for version in versions}, axis=1
+    ).reindex(gases.unique())
+
+    missing = factors[factors.isna().any(axis=1)]
+    if len(missing) > 0:
+        raise KeyError(f"No GWP for {list(missing.index)}")
+
+    values = (
+        df.to_numpy()[np.newaxis, :, :]
+        * factors.reindex(gases).to_numpy().T[:, :, np.newaxis]
+    )
+
+    index = df.index.append([df.index] * (len(versions) - 1))
+
+    return pd.DataFrame(
+        values.reshape(-1, df.shape[1]),
+        index=pd.MultiIndex.from_arrays(
+            [index.get_level_values(i) for i in range(index.nlevels)]
+            + [np.repeat(versions, len(df))],
+            names=[*df.index.names, "metric"],
+        ),
+        columns=df.columns,
+    )
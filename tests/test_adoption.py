@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+import scipy.optimize
+
+from podi import adoption, fit_cache
+
+x_data = np.arange(30)
+
+
+def make_data():
+    # Logistic curves with noise, and the search bounds of their fits
+    rng = np.random.default_rng(0)
+    parameters = np.array(
+        [[0.3, 12, 0.8, 0], [0.5, 20, 1.0, 0.05], [0.2, 5, 0.6, 0.1]]
+    )
+    y_data = adoption.evaluate("logistic", x_data, parameters)
+    y_data = y_data + rng.normal(0, 0.01, y_data.shape)
+    bounds = np.stack(
+        [
+            np.tile([0.01, 1.0], (3, 1)),
+            np.tile([0.0, 30.0], (3, 1)),
+            np.stack([parameters[:, 2], parameters[:, 2]], axis=1),
+            np.stack([parameters[:, 3], parameters[:, 3]], axis=1),
+        ],
+        axis=1,
+    )
+    return y_data, bounds
+
+
+def test_interpolate_matches_pandas():
+    y = np.array(
+        [
+            [np.nan, 1, np.nan, np.nan, 4, np.nan],
+            [0, np.nan, 2, 3, np.nan, 5],
+            [np.nan] * 6,
+            [1, 2, 3, 4, 5, 6],
+        ]
+    )
+
+    np.testing.assert_allclose(
+        adoption.interpolate(y),
+        pd.DataFrame(y).interpolate(axis=1).to_numpy(),
+    )
+
+
+def test_evaluate_matches_curves():
+    parameters = np.array([[0.3, 12, 0.8, 0], [0.05, 0.4, 1.0, 0.1]])
+
+    for model, curve in adoption.curves.items():
+        evaluated = adoption.evaluate(model, x_data, parameters)
+
+        for row, result in zip(parameters, evaluated):
+            np.testing.assert_allclose(result, curve(x_data, *row))
+
+
+def test_fit_matches_scipy():
+    y_data, bounds = make_data()
+
+    fitted = adoption.fit(x_data, y_data, bounds, cache=False)
+
+    for y, row_bounds, parameters in zip(y_data, bounds, fitted):
+        expected = scipy.optimize.differential_evolution(
+            lambda p: np.sum((y - adoption.logistic(x_data, *p)) ** 2.0),
+            row_bounds,
+            seed=3,
+            polish=False,
+        ).x
+        np.testing.assert_allclose(
+            adoption.logistic(x_data, *parameters),
+            adoption.logistic(x_data, *expected),
+            atol=5e-3,
+        )
+
+
+def test_fit_of_a_row_does_not_depend_on_the_batch():
+    y_data, bounds = make_data()
+
+    fitted = adoption.fit(x_data, y_data, bounds, cache=False)
+
+    for i in range(len(y_data)):
+        np.testing.assert_array_equal(
+            adoption.fit(
+                x_data, y_data[i : i + 1], bounds[i : i + 1], cache=False
+            )[0],
+            fitted[i],
+        )
+
+
+def test_fit_reads_cached_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(fit_cache, "path", str(tmp_path / "fits.db"))
+    y_data, bounds = make_data()
+
+    # Fit the first row, then all rows with the first read from the cache
+    first = adoption.fit(x_data, y_data[:1], bounds[:1])
+    fitted = adoption.fit(x_data, y_data, bounds)
+
+    np.testing.assert_array_equal(fitted[0], first[0])
+    np.testing.assert_array_equal(
+        fitted, adoption.fit(x_data, y_data, bounds, cache=False)
+    )
@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from podi import analogs
+
+data_start_year = 2000
+proj_end_year = 2030
+
+
+def make_analogs():
+    # Curves that start at 0, one of which dips after reaching its maximum
+    rising = np.concatenate([np.zeros(20), np.linspace(0, 1, 280)])
+    dipping = np.concatenate(
+        [np.zeros(20), np.linspace(0, 0.8, 250), np.full(30, 0.7)]
+    )
+    return pd.DataFrame(
+        [rising, dipping**2, dipping],
+        index=pd.Index(["Rising", "Squared", "Dipping"], name="Analog Name"),
+    )
+
+
+def make_frame():
+    nan = np.nan
+    values = [
+        [0.1, 0.12, 0.15, 0.18, 0.2, 0.22, 0.25, 0.3, 0.31, 0.33, 0.35],
+        [nan, nan, nan, nan, nan, 0.3, 0.32, 0.33, 0.4, nan, nan],
+        [nan] * 11,
+        [0.05, nan, 0.1, 0.12, nan, nan, 0.2, 0.25, 0.3, 0.35, 0.4],
+        [nan, nan, nan, 0.01, 0.02, 0.03, 0.05, 0.07, 0.09, 0.1, 0.11],
+        [nan] * 10 + [0.2],
+    ]
+    index = pd.MultiIndex.from_tuples(
+        [
+            ("PD22", "pathway", "usa", "Forests", "Mha", analog)
+            for analog in [
+                "Rising",
+                "Squared",
+                "Dipping",
+                "Dipping",
+                "Rising",
+                "Squared",
+            ]
+        ],
+        names=["model", "scenario", "region", "variable", "unit"]
+        + ["Analog Name"],
+    )
+    return pd.DataFrame(
+        values,
+        index=index,
+        columns=np.arange(data_start_year, data_start_year + 11),
+    )
+
+
+def splice_rows(df, afolu_analogs):
+    # The row-wise splice of afolu that analogs.splice() replaced
+    def rep(x):
+        x0 = x
+        if x0.isna().all():
+            x0.iloc[-1] = 0
+        x0 = (
+            afolu_analogs.loc[x.name[5]][
+                afolu_analogs.loc[x.name[5]]
+                >= min(max(x0.loc[x0.last_valid_index()], 1e-5), 1)
+            ]
+            .iloc[: proj_end_year - x0.last_valid_index()]
+            .reset_index()
+            .set_index(
+                np.arange(x0.last_valid_index() + 1, proj_end_year + 1, 1)
+            )
+            .drop(columns=["index"])
+            .squeeze()
+            .rename(x.name)
+        )
+
+        x = x.combine_first(x0)
+
+        if x.first_valid_index() > data_start_year:
+            x1 = (
+                afolu_analogs.loc[x.name[5]][
+                    afolu_analogs.loc[x.name[5]]
+                    <= min(max(x.loc[x.first_valid_index()], 1e-5), 1)
+                ]
+                .tail(x.first_valid_index() - x.index[0])
+                .reset_index()
+                .set_index(np.arange(x.index[0], x.first_valid_index(), 1))
+                .drop(columns=["index"])
+                .squeeze()
+                .rename(x.name)
+            )
+            x = x.combine_first(x1)
+
+        return x
+
+    return pd.DataFrame(data=df.apply(rep, axis=1))
+
+
+def test_splice_matches_row_wise():
+    df = make_frame()
+    afolu_analogs = make_analogs()
+
+    spliced = analogs.splice(df, afolu_analogs, data_start_year, proj_end_year)
+
+    pd.testing.assert_frame_equal(
+        spliced, splice_rows(df.copy(), afolu_analogs)
+    )
+
+
+def test_splice_leaves_years_past_the_curve_nan():
+    df = make_frame().iloc[:1]
+    afolu_analogs = make_analogs().iloc[:, :250]
+
+    spliced = analogs.splice(df, afolu_analogs, data_start_year, 2300)
+
+    # Only as many years as the curve has values past the last value, 0.35
+    count = (afolu_analogs.loc["Rising"] >= 0.35).sum()
+    assert spliced.loc[:, 2011 : 2010 + count].notna().all(axis=None)
+    assert spliced.loc[:, 2011 + count :].isna().all(axis=None)
+
+
+def test_splice_raises_for_missing_analogs():
+    df = make_frame().rename(index={"Squared": "Unknown"})
+
+    with pytest.raises(KeyError):
+        analogs.splice(df, make_analogs(), data_start_year, proj_end_year)
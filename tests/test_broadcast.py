@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from podi import broadcast
+
+
+def make_frame(dtype=float):
+    index = pd.MultiIndex.from_product(
+        [["pathway"], ["usa", "chn", "ind"], ["Coal", "Oil", "Gas"]],
+        names=["scenario", "region", "product_long"],
+    )
+    return pd.DataFrame(
+        np.random.default_rng(0).random((len(index), 4)),
+        index=index,
+        columns=[2020, 2021, 2022, 2023],
+    ).astype(dtype)
+
+
+def make_ratios():
+    # Ratios by region and product, with one key missing and one duplicated
+    index = pd.MultiIndex.from_tuples(
+        [
+            ("usa", "Coal"),
+            ("usa", "Oil"),
+            ("usa", "Gas"),
+            ("chn", "Coal"),
+            ("chn", "Oil"),
+            ("chn", "Gas"),
+            ("ind", "Coal"),
+            ("ind", "Oil"),
+            ("ind", "Oil"),
+        ],
+        names=["region", "product_long"],
+    )
+    return pd.DataFrame(
+        np.arange(len(index) * 4, dtype=float).reshape(len(index), 4),
+        index=index,
+        columns=[2020, 2021, 2022, 2023],
+    )
+
+
+def test_align_matches_loc():
+    df = make_frame()
+    ratios = make_ratios()
+
+    aligned = broadcast.align(ratios, df.index, ["region", "product_long"])
+
+    first = ratios[~ratios.index.duplicated()]
+    for (_, region, product), row in aligned.iterrows():
+        if (region, product) in first.index:
+            np.testing.assert_array_equal(row, first.loc[(region, product)])
+        else:
+            assert row.isna().all()
+
+
+def test_multiply_frame_matches_row_wise():
+    df = make_frame()
+    ratios = make_ratios()
+
+    multiplied = broadcast.multiply(df, ratios, ["region", "product_long"])
+
+    first = ratios[~ratios.index.duplicated()]
+    expected = df.apply(
+        lambda x: x
+        * (
+            first.loc[x.name[1:]]
+            if x.name[1:] in first.index
+            else pd.Series(np.nan, index=df.columns)
+        ),
+        axis=1,
+    )
+    pd.testing.assert_frame_equal(multiplied, expected)
+
+
+def test_multiply_series_by_one_level():
+    df = make_frame()
+    ratios = pd.Series(
+        [2.0, 3.0, 4.0], index=pd.Index(["usa", "chn", "ind"], name="region")
+    )
+
+    multiplied = broadcast.multiply(df, ratios, ["region"])
+
+    expected = df.apply(lambda x: x * ratios[x.name[1]], axis=1)
+    pd.testing.assert_frame_equal(multiplied, expected)
+
+
+def test_multiply_keeps_float32():
+    df = make_frame(np.float32)
+    ratios = make_ratios()
+
+    multiplied = broadcast.multiply(df, ratios, ["region", "product_long"])
+
+    assert (multiplied.dtypes == np.float32).all()
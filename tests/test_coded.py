@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from podi import coded
+
+
+def make_frame(dtype=float, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_arrays(
+        [
+            rng.choice(["usa", "chn", "ind"], 60),
+            rng.choice(["Residential", "Commercial", "Industrial"], 60),
+            rng.choice(["CO2", "CH4"], 60),
+        ],
+        names=["region", "sector", "gas"],
+    )
+    values = rng.random((len(index), 3))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    values[:5] = np.nan
+
+    return pd.DataFrame(
+        values, index=index, columns=[2020, 2021, 2022]
+    ).astype(dtype)
+
+
+def test_round_trip_keeps_dtype():
+    for dtype in [np.float32, np.float64]:
+        df = make_frame(dtype)
+
+        pd.testing.assert_frame_equal(
+            coded.CodedFrame.from_frame(df).to_frame(), df
+        )
+
+
+def test_groupby_sum_matches_pandas():
+    df = make_frame()
+
+    for levels in [None, ["region"], ["region", "gas"]]:
+        summed = coded.CodedFrame.from_frame(df).groupby_sum(levels).to_frame()
+        expected = df.groupby(
+            level=levels or df.index.names, observed=True
+        ).sum()
+        # CodedFrames always have a MultiIndex, even of one level
+        if not isinstance(expected.index, pd.MultiIndex):
+            expected.index = pd.MultiIndex.from_arrays([expected.index])
+
+        pd.testing.assert_frame_equal(summed, expected)
+
+
+def test_groupby_sum_of_all_nan_is_zero():
+    df = make_frame().iloc[:2]
+    df[:] = np.nan
+
+    summed = coded.CodedFrame.from_frame(df).groupby_sum(["gas"]).to_frame()
+
+    assert (summed.to_numpy() == 0).all()
+
+
+def test_isin_and_rename_match_pandas():
+    df = make_frame()
+    frame = coded.CodedFrame.from_frame(df)
+
+    mask = frame.isin("sector", ["Residential", "Commercial"])
+    np.testing.assert_array_equal(
+        mask,
+        df.index.get_level_values("sector").isin(
+            ["Residential", "Commercial"]
+        ),
+    )
+
+    mapping = {"Residential": "Buildings", "Commercial": "Buildings"}
+    renamed = frame[mask].rename("sector", mapping).groupby_sum().to_frame()
+    expected = (
+        df[mask]
+        .rename(index=mapping, level="sector")
+        .groupby(level=df.index.names)
+        .sum()
+    )
+
+    pd.testing.assert_frame_equal(renamed, expected)
+
+
+def test_concat_matches_pandas():
+    df = make_frame()
+    first = df.iloc[:30]
+    second = df.iloc[30:].rename(index={"usa": "bra"}, level="region")
+
+    concatenated = coded.concat(
+        [
+            coded.CodedFrame.from_frame(first),
+            coded.CodedFrame.from_frame(second),
+        ]
+    ).to_frame()
+
+    pd.testing.assert_frame_equal(
+        concatenated.sort_index(), pd.concat([first, second]).sort_index()
+    )
@@ -0,0 +1,99 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from podi import double_count, units
+
+energy_flows = [
+    "1A1a_Electricity-public",
+    "1A3b_Road",
+    "1A4b_Residential",
+]
+fao_flows = ["3B_Manure-management", "3E_Enteric-fermentation"]
+
+
+def remove_doublecount(x):
+    # The row-wise removal of emissions that ceds_double_count replaced
+    if x.name[6] in energy_flows and re.sub(r"\s\(.*?\)", "", x.name[4]) in [
+        "CO2"
+    ]:
+        x = x.multiply(0)
+
+    if x.name[6] in fao_flows and re.sub(r"\s\(.*?\)", "", x.name[4]) in [
+        "CO2",
+        "CH4",
+        "N2O",
+    ]:
+        x = x.multiply(0)
+
+    return x
+
+
+def make_frame():
+    index = pd.MultiIndex.from_product(
+        [
+            ["PD22"],
+            ["pathway"],
+            ["usa", "chn"],
+            ["Industrial"],
+            ["CO2", "CH4 (additional emissions)", "N2O", "BC"],
+            ["Mt"],
+            [*energy_flows, *fao_flows, "2A1_Cement-production"],
+        ],
+        names=[
+            "model",
+            "scenario",
+            "region",
+            "sector",
+            "product_long",
+            "unit",
+            "flow_long",
+        ],
+    )
+    return pd.DataFrame(
+        np.random.default_rng(0).random((len(index), 3)),
+        index=index,
+        columns=[2020, 2021, 2022],
+    )
+
+
+def test_remove_matches_row_wise():
+    df = make_frame()
+
+    removed, _ = double_count.remove(df, "ceds_double_count", "AR6GWP100")
+
+    pd.testing.assert_frame_equal(
+        removed, df.apply(remove_doublecount, axis=1)
+    )
+
+
+def test_report_is_removed_emissions_in_co2e():
+    df = make_frame()
+
+    removed, report = double_count.remove(df, "ceds_double_count", "AR6GWP100")
+
+    # The emissions removed from each flow and gas, weighted by GWP
+    dropped = df - removed
+    dropped = dropped[(dropped != 0).any(axis=1)]
+    gases = dropped.index.get_level_values("product_long").map(
+        lambda x: re.sub(r"\s\(.*?\)", "", x)
+    )
+    factors = units.gwp_factors("AR6GWP100")
+    expected = (
+        dropped.multiply(factors.reindex(gases).to_numpy(), axis=0)
+        .groupby([dropped.index.get_level_values("flow_long"), gases])
+        .sum()
+    )
+
+    assert set(report.index.get_level_values("counted_in")) == {
+        "energy",
+        "FAO",
+    }
+    pd.testing.assert_frame_equal(
+        report.droplevel("counted_in").drop(columns="rows").sort_index(),
+        expected.rename_axis(["flow_long", "gas"]).sort_index(),
+        # The column of row counts makes the year columns objects
+        check_column_type=False,
+    )
+    assert report["rows"].sum() == len(dropped)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from podi import executor
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    monkeypatch.setattr(executor, "processes", 2)
+    monkeypatch.setattr(executor, "min_rows", 10)
+    yield
+    executor.shutdown()
+
+
+def make_frame(rows=100):
+    rng = np.random.default_rng(0)
+    index = pd.MultiIndex.from_arrays(
+        [rng.choice(["usa", "chn"], rows), np.arange(rows)],
+        names=["region", "id"],
+    )
+    return pd.DataFrame(
+        {
+            "sector": rng.choice(["Electric Power", "Industrial"], rows),
+            2020: rng.random(rows),
+            2021: rng.random(rows).astype(np.float32),
+            2022: rng.integers(0, 10, rows),
+        },
+        index=index,
+    )
+
+
+def test_apply_matches_pandas(workers):
+    df = make_frame()
+
+    def scale(x):
+        return x[[2020, 2021, 2022]] * (
+            2 if x["sector"] == "Industrial" else 1
+        )
+
+    pd.testing.assert_frame_equal(
+        executor.apply(df, scale, axis=1), df.apply(scale, axis=1)
+    )
+    pd.testing.assert_series_equal(
+        executor.apply(df, lambda x: x.name[0] + "|" + x["sector"], axis=1),
+        df.apply(lambda x: x.name[0] + "|" + x["sector"], axis=1),
+    )
+    assert len(executor.worker_pids()) == 2
+
+
+def test_apply_closures_over_frames(workers):
+    df = make_frame()
+    ratios = pd.Series({"usa": 2.0, "chn": 3.0})
+
+    for year in [2020, 2021, 2022]:
+        # The same closure over changing state, as in a loop over years
+        def ratio(x):
+            return x[year] * ratios[x.name[0]]
+
+        pd.testing.assert_series_equal(
+            executor.apply(df, ratio, axis=1), df.apply(ratio, axis=1)
+        )
+
+
+def test_apply_small_frames_in_process(monkeypatch):
+    monkeypatch.setattr(executor, "processes", 2)
+    df = make_frame(10)
+
+    pd.testing.assert_series_equal(
+        executor.apply(df, lambda x: x[2020] * 2, axis=1),
+        df.apply(lambda x: x[2020] * 2, axis=1),
+    )
+    assert executor.worker_pids() == []
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+from podi import piecewise
+
+columns = [
+    "Model",
+    "Scenario",
+    "Region Group",
+    "ISO",
+    "Region",
+    "Subvertical",
+    "Metric",
+    "Unit",
+    "Value 1",
+    "Duration 1 (Years)",
+    "Value 2",
+    "Duration 2 (Years)",
+    "Value 3",
+    "Duration 3 (Years)",
+]
+
+
+def piecewise_to_continuous(path, variable, scenario, start, end):
+    # The row-wise builder of afolu and emissions that continuous() replaced
+    name = (
+        pd.read_csv(path)
+        .drop(columns=["Region Group", "Region"])
+        .rename(
+            columns={
+                "ISO": "region",
+                "Model": "model",
+                "Scenario": "scenario",
+                "Unit": "unit",
+            }
+        )
+        .replace("Pathway", scenario)
+    )
+    name["variable"] = name.apply(
+        lambda x: "|".join([x["Subvertical"], x["Metric"]]), axis=1
+    )
+    name.drop(columns=["Subvertical", "Metric"], inplace=True)
+    name = name[name["variable"].str.contains(variable)]
+
+    name["Value 1"] = np.where(name["Value 1"].isna(), 0, name["Value 1"])
+    name["Value 2"] = np.where(
+        name["Value 2"].isna(), name["Value 1"], name["Value 2"]
+    )
+    name["Value 3"] = np.where(
+        name["Value 3"].isna(), name["Value 2"], name["Value 3"]
+    )
+    name["Duration 1 (Years)"] = np.where(
+        (
+            (name["Duration 1 (Years)"].isna())
+            | (name["Duration 1 (Years)"] > end - start)
+        ),
+        end - start,
+        name["Duration 1 (Years)"],
+    )
+    name["Duration 2 (Years)"] = np.where(
+        (name["Duration 2 (Years)"].isna()),
+        name["Duration 1 (Years)"],
+        name["Duration 2 (Years)"],
+    )
+    name["Duration 3 (Years)"] = np.where(
+        (name["Duration 3 (Years)"].isna()),
+        name["Duration 2 (Years)"],
+        name["Duration 3 (Years)"],
+    )
+
+    name = pd.DataFrame(
+        index=[
+            name["model"],
+            name["scenario"],
+            name["region"],
+            name["variable"],
+            name["unit"],
+            name["Value 1"],
+            name["Duration 1 (Years)"],
+            name["Value 2"],
+            name["Duration 2 (Years)"],
+            name["Value 3"],
+            name["Duration 3 (Years)"],
+        ],
+        columns=np.arange(start, end + 1, 1),
+        dtype=float,
+    )
+
+    def rep(x):
+        x0 = x
+        x0.loc[start] = x.name[5]
+        x0.loc[start + x.name[6]] = x.name[7]
+        x0.loc[min(start + x.name[6] + x.name[8], end - start)] = x.name[9]
+        x0.interpolate(axis=0, limit_area="inside", inplace=True)
+        x.update(x0)
+        return x
+
+    name.update(name.apply(rep, axis=1))
+
+    return name.droplevel(
+        [
+            "Value 1",
+            "Duration 1 (Years)",
+            "Value 2",
+            "Duration 2 (Years)",
+            "Value 3",
+            "Duration 3 (Years)",
+        ]
+    ).fillna(0)
+
+
+def test_interpolate_matches_pandas():
+    values = np.array([[1.0, 4.0, 2.0], [0.0, 3.0, 3.0], [5.0, 1.0, 0.0]])
+    offsets = np.array([[0, 3, 8], [0, 0, 8], [0, 8, 8]])
+
+    interpolated = piecewise.interpolate(values, offsets, 8)
+
+    for row, offset, result in zip(values, offsets, interpolated):
+        expected = pd.Series(np.nan, index=np.arange(9))
+        for value, year in zip(row, offset):
+            expected[year] = value
+        np.testing.assert_allclose(
+            result, expected.interpolate().to_numpy()[:8]
+        )
+
+
+def test_continuous_matches_row_wise(tmp_path, monkeypatch):
+    monkeypatch.setattr(piecewise, "cache_path", f"{tmp_path}/cache/")
+    path = tmp_path / "flux.csv"
+    pd.DataFrame(
+        [
+            ["PD22", "Pathway", "G", "AFG", "A", "Biochar", "Max extent"]
+            + ["ha", 1.0, 6, 3.0, 20, np.nan, np.nan],
+            ["PD22", "Pathway", "G", "ALB", "B", "Biochar", "Max extent"]
+            + ["ha", np.nan, np.nan, 2.0, np.nan, 5.0, 10],
+            ["PD22", "Pathway", "G", "AFG", "A", "Peat", "Max extent"]
+            + ["ha", 4.0, 0, 1.0, 3, 2.0, 3],
+            ["PD22", "Pathway", "G", "AFG", "A", "Peat", "Max extent"]
+            + ["Mha", 2.0, 40, 6.0, 5, 8.0, 5],
+            ["PD22", "Pathway", "G", "AFG", "A", "Peat", "Flux"]
+            + ["t", 1.0, 2, 2.0, 2, 3.0, 2],
+        ],
+        columns=columns,
+    ).to_csv(path, index=False)
+
+    for _ in range(2):
+        # The second call reads the timeseries from the cache
+        timeseries = piecewise.continuous(
+            str(path), "Max extent", "pathway", 2010, 2030
+        )
+
+        pd.testing.assert_frame_equal(
+            timeseries,
+            piecewise_to_continuous(
+                str(path), "Max extent", "pathway", 2010, 2030
+            ),
+            check_names=False,
+        )
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from podi import projection
+
+
+def make_frame(rows=30, years=range(2000, 2011), nan=0.2, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.random((rows, len(years))) + 0.5
+    values[rng.random(values.shape) < nan] = np.nan
+    return pd.DataFrame(values, columns=list(years))
+
+
+def extrapolate_row(row, proj_end_year):
+    # The row-wise extrapolation that projection.extrapolate replaced in afolu
+    last_valid_idx = row.last_valid_index()
+    penultimate_valid_idx = row.loc[:last_valid_idx].dropna().index[-2]
+
+    slope = (row[last_valid_idx] - row[penultimate_valid_idx]) / (
+        last_valid_idx - penultimate_valid_idx
+    )
+
+    new_index = pd.RangeIndex(start=last_valid_idx, stop=proj_end_year + 1)
+
+    extrapolated_values = pd.Series(
+        data=row[last_valid_idx] + slope * (new_index - last_valid_idx),
+        index=new_index,
+    )
+
+    return row.combine_first(extrapolated_values)
+
+
+def test_last_and_first_valid():
+    df = make_frame(nan=0.5)
+    df.iloc[0] = np.nan
+
+    last = projection.last_valid(df)
+    first = projection.first_valid(df)
+
+    for i, row in df.iloc[1:].iterrows():
+        assert last[i] == row.last_valid_index()
+        assert first[i] == row.first_valid_index()
+
+    # Rows that are all NaN get the last and first column labels
+    assert last[0] == df.columns[-1]
+    assert first[0] == df.columns[0]
+
+
+@pytest.mark.parametrize("mode", ["cumprod", "cumsum"])
+def test_cumulative_matches_pandas(mode):
+    df = make_frame()
+
+    projected = projection.project(df, mode, start=2005)
+    expected = df.apply(
+        lambda x: pd.concat([x.loc[:2004], getattr(x.loc[2005:], mode)()]),
+        axis=1,
+    )
+
+    pd.testing.assert_frame_equal(projected, expected)
+
+
+@pytest.mark.parametrize("mode", ["cumprod", "cumsum"])
+def test_cumulative_start_by_row(mode):
+    df = make_frame()
+    start = np.random.default_rng(1).integers(2000, 2011, len(df))
+
+    projected = projection.project(df, mode, start=start)
+
+    for i, row in df.iterrows():
+        expected = pd.concat(
+            [row.loc[: start[i] - 1], getattr(row.loc[start[i] :], mode)()]
+        )
+        pd.testing.assert_series_equal(
+            projected.iloc[i], expected, check_names=False
+        )
+
+
+def test_linear_matches_row_wise():
+    df = make_frame()
+    df.iloc[:, :2] = 1.0
+
+    projected = projection.project(df, "linear", end=2020)
+    expected = df.apply(extrapolate_row, axis=1, args=(2020,))
+
+    pd.testing.assert_frame_equal(
+        projected, expected.reindex(columns=projected.columns)
+    )
+
+
+def test_linear_raises_for_rows_with_one_valid_value():
+    df = make_frame()
+    df.iloc[:, :2] = 1.0
+    df.iloc[3] = np.nan
+    df.iloc[3, 4] = 1.0
+
+    with pytest.raises(ValueError):
+        projection.project(df, "linear", end=2020)
+
+
+@pytest.mark.parametrize("mode", ["cumprod", "cumsum", "linear"])
+def test_dtype_is_kept(mode):
+    df = make_frame().fillna(1.0).astype("float32")
+
+    assert (
+        projection.project(df, mode, start=2005, end=2020).dtypes == "float32"
+    ).all()
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from podi import tagging
+
+
+def addsector4(x):
+    # The row-wise classifier of results_analysis that climatetrace_sector
+    # replaced
+    if x["sector"] in ["power"]:
+        return "Electric Power"
+    elif x["sector"] in ["transport", "maritime"]:
+        return "Transportation"
+    elif x["sector"] in ["buildings"]:
+        return "Buildings"
+    elif x["sector"] in [
+        "extraction",
+        "manufacturing",
+        "oil and gas",
+        "waste",
+    ]:
+        return "Industrial"
+    elif x["sector"] in ["agriculture"]:
+        return "Agriculture"
+    elif x["sector"] in ["forests"]:
+        return "Forests & Wetlands"
+
+
+def addsector(x):
+    # The row-wise classifier of emissions that emissions_afolu_sector
+    # replaced
+    if x["flow_long"] in [
+        "Enteric Fermentation",
+        "Manure Management",
+        "Rice Cultivation",
+        "Synthetic Fertilizers",
+        "Manure applied to Soils",
+        "Manure left on Pasture",
+        "Crop Residues",
+        "Burning - Crop residues",
+    ]:
+        return "Agriculture"
+    elif x["flow_long"] in [
+        "Net Forest conversion",
+        "Forestland",
+        "Savanna fires",
+        "Fires in humid tropical forests",
+        "Forest fires",
+        "Fires in organic soils",
+        "Drained organic soils (CO2)",
+        "Drained organic soils (N2O)",
+    ]:
+        return "Forests & Wetlands"
+
+
+@pytest.fixture
+def rules(tmp_path):
+    path = tmp_path / "rules.csv"
+    pd.DataFrame(
+        [
+            ["sector", "exact", "power", "Electric Power"],
+            ["sector", "regex", "pow.*", "Power (regex)"],
+            ["sector", "regex", "oil.*", "Industrial"],
+            ["sector", "exact", "oil and gas", "Oil and Gas"],
+            ["gas", "exact", "3B_Manure|CH4", "FAO"],
+            ["gas", "regex", r"1A.*\|CO2", "energy"],
+        ],
+        columns=["rules", "match", "pattern", "value"],
+    ).to_csv(path, index=False)
+    return str(path)
+
+
+def test_first_matching_rule_wins(rules):
+    tagged = tagging.tag(
+        "sector",
+        pd.Series(["power", "powder", "oil and gas", "waste", "power"]),
+        path=rules,
+    )
+
+    # The regex rule before the exact rule for 'oil and gas' matches first
+    assert list(tagged) == [
+        "Electric Power",
+        "Power (regex)",
+        "Industrial",
+        None,
+        "Electric Power",
+    ]
+
+
+def test_keys_of_several_arrays(rules):
+    tagged = tagging.tag(
+        "gas",
+        np.array(["3B_Manure", "3B_Manure", "1A1a_Heat", "1A1a_Heat"]),
+        np.array(["CH4", "CO2", "CO2", "CH4"]),
+        path=rules,
+    )
+
+    assert list(tagged) == ["FAO", None, "energy", None]
+
+
+def test_unknown_rule_set(rules):
+    with pytest.raises(ValueError):
+        tagging.tag("unknown", pd.Series(["power"]), path=rules)
+
+
+def test_climatetrace_sector_matches_row_wise():
+    df = pd.DataFrame(
+        {
+            "sector": [
+                "power",
+                "transport",
+                "maritime",
+                "buildings",
+                "extraction",
+                "manufacturing",
+                "oil and gas",
+                "waste",
+                "agriculture",
+                "forests",
+                "fluorinated gases",
+            ]
+            * 3
+        }
+    )
+
+    assert list(tagging.tag("climatetrace_sector", df["sector"])) == list(
+        df.apply(addsector4, axis=1)
+    )
+
+
+def test_emissions_afolu_sector_matches_row_wise():
+    df = pd.DataFrame(
+        {
+            "flow_long": [
+                "Enteric Fermentation",
+                "Crop Residues",
+                "Forestland",
+                "Drained organic soils (N2O)",
+                "Savanna fires",
+                "Energy",
+            ]
+            * 2
+        }
+    )
+
+    assert list(
+        tagging.tag("emissions_afolu_sector", df["flow_long"])
+    ) == list(df.apply(addsector, axis=1))
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from podi import units
+
+
+def make_frame():
+    index = pd.MultiIndex.from_product(
+        [["usa", "chn"], ["CO2", "CH4", "N2O", "BC", "HFC-134a"]],
+        names=["region", "product_short"],
+    )
+    return pd.DataFrame(
+        np.random.default_rng(0).random((len(index), 3)),
+        index=index,
+        columns=[2020, 2021, 2022],
+    )
+
+
+def test_convert_matches_row_wise():
+    df = make_frame()
+    factors = units.gwp_factors("AR6GWP100")
+
+    converted = units.convert(df, factors)
+
+    pd.testing.assert_frame_equal(
+        converted, df.apply(lambda x: x * factors[x.name[1]], axis=1)
+    )
+
+
+def test_convert_raises_for_missing_factors():
+    with pytest.raises(KeyError):
+        units.convert(make_frame(), pd.Series({"CO2": 1.0}))
+
+
+def test_co2e_stacks_each_version():
+    df = make_frame()
+    versions = ["AR6GWP100", "AR6GWP20"]
+
+    converted = units.co2e(df, versions)
+
+    for version in versions:
+        pd.testing.assert_frame_equal(
+            converted.xs(version, level="metric"),
+            units.convert(df, units.gwp_factors(version)),
+        )
+
+
+def test_gwp_additions_by_version():
+    assert units.gwp_factors("AR6GWP20")["BC"] != (
+        units.gwp_factors("AR6GWP100")["BC"]
+    )
+
+    with pytest.raises(KeyError):
+        units.gwp_factors("AR6GTP100")